@@ -16,6 +16,7 @@ ALLOWED_HOSTS = []
 
 # Application definition
 INSTALLED_APPS = [
+    "daphne",  # runserver serves ASGI, needed for the dashboard event stream
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -55,12 +56,26 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "Traceability.wsgi.application"
+ASGI_APPLICATION = "Traceability.asgi.application"
 
 # Database Configuration
+# Traceability.sqlite_backend applies the pragmas below on every new connection
+# (see its base.py); `python manage.py bench_sqlite` compares it with the defaults.
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "Traceability.sqlite_backend",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            "pragmas": {
+                "journal_mode": "WAL",
+                "synchronous": "NORMAL",
+                "busy_timeout": 5000,
+                "cache_size": -32000,
+                "mmap_size": 268435456,
+            },
+            "checkpoint_interval": 300,
+            "transaction_mode": "IMMEDIATE",
+        },
     }
 }
 
@@ -97,6 +112,68 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / "static"
 
+# PLC poll rates in seconds: "min" right after a scan trigger and while a part
+# is in cycle, backing off by "backoff" per idle poll up to "max". Per-station
+# entries (e.g. "st1") override "default". An idle station sees a trigger up to
+# "max" late, so "max" bounds the worst-case trigger->ack latency: 0.15 keeps it
+# under 200 ms for about 7 reads/s per idle station (0.5 gave ~470 ms p99).
+PLC_POLL_RATES = {
+    "default": {"min": 0.05, "max": 0.15, "backoff": 1.5, "active_hold": 30},
+}
+
+# Batching for the station-result DB writer thread (track.db_writer). Pollers
+# journal results in "journal_dir" (default <BASE_DIR>/journal, one SQLite file
+# per poller process) before acknowledging the PLC and replay them on restart
+DB_WRITER = {"batch_size": 200, "flush_interval": 0.25}
+
+# Production shifts: name and local start time; each runs until the next starts
+# and the overnight shift counts towards the day it started (track.shifts)
+SHIFTS = [("Shift 1", "07:00"), ("Shift 2", "15:30"), ("Shift 3", "23:59")]
+
+# Scan event log (track.models.ScanEvent): days kept by prune_scan_events
+SCAN_EVENTS = {"retention_days": 90}
+
+# search_parts page size: default and the most a `?page_size=` may ask for
+SEARCH_PAGE_SIZE = {"default": 50, "max": 500}
+
+# PLC health prober (track.plc_health): TCP probe every "interval" seconds with
+# a per-probe "timeout"; statuses older than "stale_after" read as disconnected
+PLC_HEALTH = {"interval": 1.0, "timeout": 1.0, "stale_after": 10.0}
+
+# Per-controller circuit breakers (track.plc_breaker), shared by the pollers and
+# the health prober of a process: "failure_threshold" failures in a row open it,
+# then one trial is allowed after "base_delay" seconds, doubling per failed trial
+# up to "max_delay", less up to "jitter" of it at random. Sessions connect with
+# "connect_timeout", separate from their request timeout
+PLC_BREAKER = {
+    "failure_threshold": 3,
+    "base_delay": 1.0,
+    "max_delay": 10.0,
+    "jitter": 0.5,
+    "connect_timeout": 1.0,
+}
+
+# start_modbus (track.poller_supervisor): controllers are sharded over "workers"
+# poller processes (0 polls in-process); a crashed worker is restarted after
+# "restart_delay" seconds, doubling per crash in a row up to "max_restart_delay"
+# and resetting once it has run for "stable_after"; on shutdown workers get
+# "shutdown_timeout" seconds to drain before they are terminated
+POLLER_SUPERVISOR = {
+    "workers": 2,
+    "restart_delay": 1.0,
+    "max_restart_delay": 60.0,
+    "stable_after": 60.0,
+    "shutdown_timeout": 15.0,
+}
+
+# Station/Controller registry (track.station_registry): pollers check for
+# admin edits every "reload_interval" seconds and apply them without a restart
+STATION_REGISTRY = {"reload_interval": 5.0}
+
+# Pipeline metrics (track.metrics): the pollers publish a snapshot every
+# "publish_interval" seconds; /metrics/ ignores snapshots older than "stale_after"
+METRICS = {"publish_interval": 5.0, "stale_after": 60.0}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -111,6 +188,11 @@ LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'handlers': {
+        'console': {
+            'level': 'INFO',
+            'class': 'logging.StreamHandler',
+            'formatter': 'compact',
+        },
         'error_file': {
             'level': 'ERROR',
             'class': 'logging.handlers.TimedRotatingFileHandler',
@@ -136,6 +218,9 @@ LOGGING = {
         'detailed': {
             'format': '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
         },
+        'compact': {
+            '()': 'track.log_pipeline.CompactFormatter',
+        },
     },
     'loggers': {
         'django': {
@@ -153,5 +238,15 @@ LOGGING = {
             'level': 'WARNING',
             'propagate': False,
         },
+        'track': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
+
+# Log handlers run on one listener thread behind a queue of "size" records
+# (track.log_pipeline); the "rate_limited" loggers let "burst" similar records
+# below ERROR through per "period" seconds and summarize the rest
+LOG_QUEUE = {"size": 10000, "burst": 5, "period": 60.0, "rate_limited": ["track", "plc"]}
@@ -0,0 +1,6 @@
+"""
+SQLite backend with connection-start pragmas for the Traceability database.
+
+Use ``"ENGINE": "Traceability.sqlite_backend"`` and configure it through the
+extra ``OPTIONS`` keys handled in ``base.py``.
+"""
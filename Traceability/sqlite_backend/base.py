@@ -0,0 +1,87 @@
+"""
+Drop-in replacement for ``django.db.backends.sqlite3`` that tunes every new
+connection for many concurrent readers and one busy writer.
+
+Extra ``OPTIONS`` understood (everything else is passed to ``sqlite3.connect``):
+
+    "pragmas": {"journal_mode": "WAL", "synchronous": "NORMAL", ...}
+        Applied in order on each new connection; merged over DEFAULT_PRAGMAS.
+    "checkpoint_interval": 300
+        Seconds between ``PRAGMA wal_checkpoint`` runs, issued after a commit
+        once the interval has passed. 0 disables it.
+    "checkpoint_mode": "PASSIVE"
+        PASSIVE, FULL, RESTART or TRUNCATE.
+    "transaction_mode": "IMMEDIATE"
+        Start ``atomic()`` blocks with BEGIN IMMEDIATE so writers queue on
+        busy_timeout instead of failing on a lock upgrade.
+"""
+import logging
+import time
+
+from django.db.backends.sqlite3 import base
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -32000,  # negative = KiB, i.e. ~32 MB of page cache
+    "mmap_size": 268435456,
+    "temp_store": "MEMORY",
+}
+
+EXTRA_OPTIONS = ("pragmas", "checkpoint_interval", "checkpoint_mode", "transaction_mode")
+
+
+def apply_pragmas(conn, pragmas):
+    """Run ``PRAGMA name = value`` for each entry on a raw sqlite3 connection."""
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        options = self.settings_dict.get("OPTIONS", {})
+        self.pragmas = {**DEFAULT_PRAGMAS, **options.get("pragmas", {})}
+        self.checkpoint_interval = options.get("checkpoint_interval", 300)
+        self.checkpoint_mode = options.get("checkpoint_mode", "PASSIVE")
+        self.transaction_mode = options.get("transaction_mode")
+        self._last_checkpoint = time.monotonic()
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for key in EXTRA_OPTIONS:
+            params.pop(key, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        apply_pragmas(conn, self.pragmas)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute(f"BEGIN {self.transaction_mode}")
+        else:
+            super()._start_transaction_under_autocommit()
+
+    def _commit(self):
+        super()._commit()
+        self._maybe_checkpoint()
+
+    def _maybe_checkpoint(self):
+        if not self.checkpoint_interval or self.connection is None:
+            return
+        now = time.monotonic()
+        if now - self._last_checkpoint < self.checkpoint_interval:
+            return
+        self._last_checkpoint = now
+        try:
+            busy, log_frames, checkpointed = self.connection.execute(
+                f"PRAGMA wal_checkpoint({self.checkpoint_mode})"
+            ).fetchone()
+            logger.debug(f"WAL checkpoint: busy={busy} log={log_frames} checkpointed={checkpointed}")
+        except Exception as e:
+            logger.warning(f"WAL checkpoint failed: {e}")
@@ -1,17 +1,100 @@
+import datetime
+from django import forms
 from django.contrib import admin
-from .models import TraceabilityData
+from django.db.models import Exists, OuterRef
+from .models import (
+    LINE_STATIONS,
+    Controller,
+    PLCStatus,
+    ScanEvent,
+    Station,
+    StationResult,
+    TraceabilityData,
+    bump_registry_version,
+)
+from .db_writer import refresh_part_status
+from .part_search import search_part_numbers
+
+
+def station_result_column(station):
+    """List column showing a station's result from the annotated queryset."""
+    def column(obj):
+        return getattr(obj, f"{station}_result", None)
+
+    column.short_description = f"{station} result"
+    column.admin_order_field = f"{station}_result"
+    return column
+
+
+def station_result_filter(station):
+    """Sidebar filter on one station's result, replacing the old per-column list_filter."""
+    class StationResultFilter(admin.SimpleListFilter):
+        title = f"{station} result"
+        parameter_name = f"{station}_result"
+
+        def lookups(self, request, model_admin):
+            return [("OK", "OK"), ("NOT OK", "NOT OK"), ("none", "Empty")]
+
+        def queryset(self, request, queryset):
+            value = self.value()
+            if value is None:
+                return queryset
+            results = StationResult.objects.filter(part=OuterRef("pk"), station=station)
+            if value == "none":
+                return queryset.exclude(Exists(results.exclude(result=None)))
+            return queryset.filter(Exists(results.filter(result=value)))
+
+    return StationResultFilter
+
+
+class StationResultInline(admin.TabularInline):
+    """Station results of a part, editable so operators can correct a result."""
+    model = StationResult
+    fields = ('station', 'result', 'timestamp')
+    ordering = ('station',)
+    extra = 0
+
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        if db_field.name == 'station':
+            return forms.ChoiceField(choices=[(station, station) for station in LINE_STATIONS], label="Station")
+        if db_field.name == 'result':
+            return forms.TypedChoiceField(
+                choices=[("", "-"), ("OK", "OK"), ("NOT OK", "NOT OK")], empty_value=None, required=False,
+                label="Result",
+            )
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
+
 
 class TraceabilityDataAdmin(admin.ModelAdmin):
     list_display = (
         'sr_no', 'part_number', 'date', 'formatted_time', 'shift',
-        'st1_result', 'st2_result', 'st3_result', 'st4_result', 'st5_result',
-        'st6_result', 'st7_result', 'st8_result'
+        *[station_result_column(station) for station in LINE_STATIONS]
     )
-    list_filter = ('date', 'shift', 'st1_result', 'st2_result', 'st3_result', 'st4_result', 
-                   'st5_result', 'st6_result', 'st7_result', 'st8_result')
+    list_filter = ('date', 'shift', *[station_result_filter(station) for station in LINE_STATIONS])
     search_fields = ('part_number', 'date')
     ordering = ('date',)
     list_per_page = 25
+    inlines = [StationResultInline]
+    # Derived from the station results and stamped on save
+    readonly_fields = ('overall_status', 'first_failed_station', 'version')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_station_columns(LINE_STATIONS)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Same transaction as the save() that stamped the new version, so the dashboard sees both
+        refresh_part_status({form.instance.pk})
+
+    def get_search_results(self, request, queryset, search_term):
+        # Part numbers go through the search index instead of an icontains scan
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        try:
+            return queryset.filter(date=datetime.date.fromisoformat(search_term)), False
+        except ValueError:
+            return search_part_numbers(queryset, search_term), False
 
     # ✅ Custom method to format time in HHMMSS
     def formatted_time(self, obj):
@@ -24,3 +107,79 @@ admin.site.site_title = "Traceability Admin Panel"
 admin.site.index_title = "Welcome to the Traceability Dashboard"
 
 admin.site.register(TraceabilityData, TraceabilityDataAdmin)
+
+
+class StationInline(admin.TabularInline):
+    model = Station
+    fields = ('name', 'qr_register', 'result_register', 'scan_trigger_register', 'write_signal_register', 'enabled')
+    extra = 0
+
+
+class ControllerAdmin(admin.ModelAdmin):
+    list_display = ('ip', 'port', 'name', 'station_names', 'enabled', 'updated_at')
+    list_filter = ('enabled',)
+    ordering = ('ip',)
+    inlines = [StationInline]
+
+    def station_names(self, obj):
+        return ", ".join(station.name for station in obj.stations.all())
+
+    station_names.short_description = "Stations"
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('stations')
+
+    # Bulk deletes skip Controller.delete(); the pollers still have to reload
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_registry_version()
+
+admin.site.register(Controller, ControllerAdmin)
+
+
+class StationAdmin(admin.ModelAdmin):
+    list_display = (
+        'name', 'controller', 'qr_register', 'result_register', 'scan_trigger_register', 'write_signal_register',
+        'enabled', 'updated_at',
+    )
+    list_filter = ('enabled', 'controller')
+    ordering = ('controller', 'name')
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_registry_version()
+
+admin.site.register(Station, StationAdmin)
+
+
+class PLCStatusAdmin(admin.ModelAdmin):
+    list_display = ('plc_ip', 'stations', 'state', 'breaker', 'retry_at', 'last_change', 'last_checked', 'rtt_ms', 'error')
+    list_filter = ('state', 'breaker')
+    ordering = ('plc_ip',)
+
+    # Written by the health prober only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+admin.site.register(PLCStatus, PLCStatusAdmin)
+
+
+class ScanEventAdmin(admin.ModelAdmin):
+    list_display = ('timestamp', 'station', 'part_number', 'result_word', 'signal', 'outcome', 'read_ms', 'resolve_ms', 'ack_ms', 'total_ms')
+    list_filter = ('outcome', 'station', 'day')
+    search_fields = ('=part_number',)  # Exact match, served by scanevent_part_ts_idx
+    ordering = ('-timestamp',)
+    show_full_result_count = False
+    list_per_page = 50
+
+    # Append-only log written by the DB writer
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+admin.site.register(ScanEvent, ScanEventAdmin)
@@ -0,0 +1,179 @@
+from collections import namedtuple
+from datetime import date, datetime, time
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Func
+from django.utils import timezone
+
+from track.models import LINE_STATIONS, StationResult
+from track.shifts import shift_calendar
+
+PERCENTILES = (50, 90, 95, 99)
+# Histogram bin edges in seconds, shared by cycle and lead times so charts line up
+HISTOGRAM_BINS = np.array([0, 5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300, 600, 1800, 3600, np.inf])
+MAX_CYCLE_GAP = 30 * 60  # Gaps between parts longer than this are idle time (breaks, stoppages), not cycle time
+CHUNK_ROWS = 50000
+DAY = 86400
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+# Parallel arrays, one element per station result: part id, index into the
+# station list, and UTC epoch seconds
+StationTimes = namedtuple("StationTimes", ["part_ids", "stations", "seconds"])
+# One row as fetched by load_station_times
+ROW_DTYPE = np.dtype([("part_id", np.int64), ("julian_day", float)])
+
+
+class JulianDay(Func):
+    """SQLite julianday() of a timestamp column: fractional days, to the millisecond."""
+
+    function = "julianday"
+    output_field = FloatField()
+
+
+def load_station_times(start, end, stations=LINE_STATIONS, chunk_size=CHUNK_ROWS):
+    """StationResult rows with a timestamp in [start, end) as StationTimes arrays.
+
+    One query per station reads (part id, julian day) pairs straight from
+    stationresult_st_res_ts_pt_idx, so SQLite parses the timestamps, and
+    rows are fetched with a plain cursor in `chunk_size` batches into numpy
+    arrays: no model instance, datetime or string is built per row. Epoch
+    seconds are then computed by numpy, to the millisecond julianday() keeps.
+    """
+    part_ids, station_codes, seconds = [], [], []
+    with connection.cursor() as cursor:
+        for index, station in enumerate(stations):
+            queryset = (
+                StationResult.objects.filter(
+                    station=station, result__in=["OK", "NOT OK"], timestamp__gte=start, timestamp__lt=end
+                )
+                .annotate(julian_day=JulianDay("timestamp"))
+                .values_list("part_id", "julian_day")
+            )
+            cursor.execute(*queryset.query.sql_with_params())
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                rows = np.fromiter(rows, dtype=ROW_DTYPE, count=len(rows))
+                part_ids.append(rows["part_id"])
+                station_codes.append(np.full(len(rows), index, dtype=np.int64))
+                seconds.append(np.round((rows["julian_day"] - UNIX_EPOCH_JULIAN_DAY) * DAY, 3))
+    if not seconds:
+        return StationTimes(np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([], dtype=float))
+    return StationTimes(np.concatenate(part_ids), np.concatenate(station_codes), np.concatenate(seconds))
+
+
+def shift_keys(seconds):
+    """Vectorized ShiftCalendar.shift_at: an integer key per UTC epoch second, see shift_of_key()."""
+    if not len(seconds):
+        return np.array([], dtype=np.int64)
+    utc = pd.to_datetime(seconds, unit="s", utc=True)
+    offsets = (utc.tz_convert(settings.TIME_ZONE).tz_localize(None) - utc.tz_localize(None)).total_seconds()
+    local = seconds + offsets.to_numpy()
+    days = np.floor_divide(local, DAY).astype(np.int64)
+    of_day = local - days * DAY
+    starts = np.array([t.hour * 3600 + t.minute * 60 + t.second for t in shift_calendar.starts])
+    index = np.searchsorted(starts, of_day, side="right") - 1
+    index[index < 0] = len(starts) - 1  # Before the first start: still the overnight shift
+    # The overnight shift belongs to the day it started on
+    days -= of_day < starts[0]
+    return days * len(starts) + index
+
+
+def shift_of_key(key):
+    days, index = divmod(int(key), len(shift_calendar.names))
+    return date.fromordinal(date(1970, 1, 1).toordinal() + days), shift_calendar.names[index]
+
+
+def cycle_times(times, max_gap=MAX_CYCLE_GAP):
+    """Seconds since the previous part at the same station, per result; NaN for idle gaps and first parts."""
+    order = np.lexsort((times.seconds, times.stations))
+    seconds, stations = times.seconds[order], times.stations[order]
+    gaps = np.diff(seconds, prepend=np.nan)
+    gaps[1:][stations[1:] != stations[:-1]] = np.nan  # First part seen at each station
+    gaps[(gaps <= 0) | (gaps > max_gap)] = np.nan
+    cycle = np.empty_like(gaps)
+    cycle[order] = gaps
+    return cycle
+
+
+def lead_times(times, station_count):
+    """Seconds from each station to the next one in line, as a parts x (stations - 1) array.
+
+    StationResult keeps full timestamps, so a part crossing midnight needs
+    no special handling; out-of-order pairs (retests) are dropped.
+    """
+    part_ids, rows = np.unique(times.part_ids, return_inverse=True)
+    grid = np.full((len(part_ids), station_count), np.nan)
+    grid[rows, times.stations] = times.seconds
+    lead = np.diff(grid, axis=1)
+    lead[lead < 0] = np.nan
+    return lead
+
+
+def summarize(values):
+    """Count, mean, percentiles and histogram of an array of durations in seconds."""
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {"count": 0}
+    counts, _ = np.histogram(values, bins=HISTOGRAM_BINS)
+    return {
+        "count": int(len(values)),
+        "mean": round(float(values.mean()), 2),
+        **{f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+        "histogram": counts.tolist(),
+    }
+
+
+def bottlenecks(times, cycle, stations):
+    """Per shift, stations ranked by median cycle time (slowest first)."""
+    timed = ~np.isnan(cycle)
+    if not timed.any():
+        return []
+    medians = (
+        pd.DataFrame({"shift": shift_keys(times.seconds[timed]), "station": times.stations[timed], "cycle": cycle[timed]})
+        .groupby(["shift", "station"])["cycle"]
+        .agg(["median", "count"])
+        .reset_index()
+        .sort_values(["shift", "median"], ascending=[True, False])
+    )
+    ranking = []
+    for key, group in medians.groupby("shift", sort=True):
+        shift_date, shift = shift_of_key(key)
+        ranking.append({
+            "shift_date": shift_date.isoformat(),
+            "shift": shift,
+            "stations": [
+                {"station": stations[station], "median_cycle": round(float(median), 2), "count": int(count)}
+                for station, median, count in zip(group["station"], group["median"], group["count"])
+            ],
+        })
+    return ranking
+
+
+def local_midnight(day):
+    """Aware datetime of the start of `day` in the project time zone."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def station_analytics(start, end, stations=LINE_STATIONS, max_gap=MAX_CYCLE_GAP):
+    """Cycle time and station-to-station lead time statistics for results in [start, end)."""
+    stations = list(stations)
+    times = load_station_times(start, end, stations)
+    cycle = cycle_times(times, max_gap)
+    lead = lead_times(times, len(stations))
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "results": int(len(times.seconds)),
+        "parts": int(lead.shape[0]),
+        "histogram_bins": [float(edge) for edge in HISTOGRAM_BINS[:-1]],
+        "cycle_time": {station: summarize(cycle[times.stations == i]) for i, station in enumerate(stations)},
+        "lead_time": {
+            f"{a}->{b}": summarize(lead[:, i]) for i, (a, b) in enumerate(zip(stations, stations[1:]))
+        },
+        "bottlenecks": bottlenecks(times, cycle, stations),
+    }
@@ -1,5 +1,7 @@
 from django.apps import AppConfig
+from django.conf import settings
 import logging
+from track.log_pipeline import DEFAULT_LOG_QUEUE, install_log_queue
 
 logger = logging.getLogger(__name__)
 
@@ -7,4 +9,5 @@ class TrackConfig(AppConfig):
     name = 'track'
 
     def ready(self):
-        logger.info("Track app is ready. Use 'python manage.py start_modbus' to run the Modbus task.")
+        install_log_queue(**{**DEFAULT_LOG_QUEUE, **getattr(settings, "LOG_QUEUE", {})})
+        logger.debug("Track app is ready. Use 'python manage.py start_modbus' to run the Modbus task.")
@@ -0,0 +1,382 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime
+from datetime import time as dt_time
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, transaction
+from django.utils import timezone
+
+from track.metrics import DB_WRITE_DROPPED, DB_WRITE_ITEMS, DB_WRITE_RETRIES, DB_WRITE_SECONDS
+from track.models import (
+    STATUS_COMPLETE,
+    STATUS_FAILED,
+    ScanEvent,
+    StationResult,
+    TraceabilityData,
+    compute_part_status,
+    next_change_version,
+)
+from track.part_search import index_part_numbers
+from track.rollups import record_part_events, record_station_results
+
+logger = logging.getLogger(__name__)
+
+PartCreate = namedtuple("PartCreate", ["part_number", "date", "time", "shift"])
+StationUpdate = namedtuple("StationUpdate", ["part_number", "station", "result", "timestamp"])
+ScanLog = namedtuple(
+    "ScanLog",
+    ["timestamp", "station", "part_number", "result_word", "signal", "outcome", "read_ms", "resolve_ms", "ack_ms", "total_ms"],
+)
+
+DEFAULT_WRITER_OPTIONS = {
+    "batch_size": 200,
+    "flush_interval": 0.25,
+    "max_retries": 5,  # lock-error retries before the writer logs that it is stuck (it keeps retrying)
+    "journal_dir": None,  # default: <BASE_DIR>/journal
+    "journal_sync": "FULL",  # SQLite synchronous level of the journal; FULL survives power loss
+}
+
+# Items the PLC has been told are saved; journaled before the ack. ScanLog is telemetry and is not
+JOURNALED_TYPES = {"PartCreate": PartCreate, "StationUpdate": StationUpdate}
+_FIELD_PARSERS = {"date": date.fromisoformat, "time": dt_time.fromisoformat, "timestamp": datetime.fromisoformat}
+
+
+def encode_item(item):
+    fields = {
+        name: value.isoformat() if name in _FIELD_PARSERS and value is not None else value
+        for name, value in item._asdict().items()
+    }
+    return json.dumps([type(item).__name__, fields])
+
+
+def decode_item(text):
+    kind, fields = json.loads(text)
+    return JOURNALED_TYPES[kind](**{
+        name: _FIELD_PARSERS[name](value) if name in _FIELD_PARSERS and value is not None else value
+        for name, value in fields.items()
+    })
+
+
+def is_lock_error(error):
+    """True for SQLite lock/busy errors, which clear on their own and are worth retrying."""
+    if not isinstance(error, OperationalError):
+        return False
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+class WriteJournal:
+    """Local SQLite file holding journaled items until the DB writer has committed them.
+
+    An append is committed before it returns, so a result survives a crash
+    or kill of the poller from the moment the PLC is acknowledged. Items are
+    removed once applied; a crash between the two replays them, which the
+    upserts make harmless.
+    """
+
+    def __init__(self, path, synchronous="FULL"):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending (id INTEGER PRIMARY KEY AUTOINCREMENT, item TEXT NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def append(self, item):
+        """Journal `item`; returns its journal id."""
+        with self._lock:
+            return self._conn.execute("INSERT INTO pending (item) VALUES (?)", [encode_item(item)]).lastrowid
+
+    def remove(self, ids):
+        if not ids:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM pending WHERE id = ?", [[journal_id] for journal_id in ids])
+
+    def pending(self):
+        """[(journal id, item)] of everything not yet removed, oldest first."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, item FROM pending ORDER BY id").fetchall()
+        return [(journal_id, decode_item(text)) for journal_id, text in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class StationResultWriter:
+    """Single thread that applies queued station results in batched transactions.
+
+    Pollers only enqueue, so a slow or locked database never delays a PLC
+    handshake. Each batch is committed once, with all station results upserted
+    in a single statement. Once `open_journal()` has been called, part and
+    station results are journaled on disk before `submit()` returns and are
+    only forgotten once committed: lock/busy errors are retried until they
+    clear, and a batch that fails for any other reason (including other
+    OperationalErrors, such as a missing table) is applied item by item so
+    only the offending items are dropped.
+    """
+
+    def __init__(self, batch_size=200, flush_interval=0.25, max_retries=5, journal_dir=None, journal_sync="FULL"):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.journal_dir = journal_dir
+        self.journal_sync = journal_sync
+        self.journal = None
+        self._queue = queue.Queue()  # (journal id or None, item)
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats = {"queued": 0, "written": 0, "batches": 0, "retries": 0, "dropped": 0, "replayed": 0}
+
+    def open_journal(self, name):
+        """Journal results in <journal_dir>/<name>.sqlite3 and queue what an earlier run left there.
+
+        `name` must be unique among the processes running pollers at the same
+        time (the worker name), so a restarted worker replays its own journal.
+        """
+        self.journal = WriteJournal(os.path.join(self.journal_dir, f"{name}.sqlite3"), self.journal_sync)
+        pending = self.journal.pending()
+        if pending:
+            logger.warning(f"♻️ DB writer replaying {len(pending)} journaled updates from {self.journal.path}")
+            self._ensure_started()
+            for entry in pending:
+                self._queue.put(entry)
+            self._stats["replayed"] += len(pending)
+
+    def submit(self, item):
+        journal_id = None
+        if self.journal is not None and type(item).__name__ in JOURNALED_TYPES:
+            journal_id = self.journal.append(item)
+        self._ensure_started()
+        self._queue.put((journal_id, item))
+        self._stats["queued"] += 1
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+        close_old_connections()
+
+    def _collect(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        entries = batch
+        attempt = 0
+        while entries:
+            try:
+                self._apply(entries)
+                entries = []
+            except Exception as e:
+                if not is_lock_error(e):
+                    logger.error(f"❌ DB writer failed to apply {len(entries)} updates, applying them one by one: {e}")
+                    entries = self._apply_each(entries)
+                    continue
+                attempt += 1
+                if self._stop.is_set() and attempt > self.max_retries:
+                    logger.error(f"❌ DB writer stopping with {len(entries)} updates unwritten, journal kept: {e}")
+                    break
+                if attempt == self.max_retries:
+                    logger.error(f"❌ DB writer still failing after {attempt} retries, retrying: {e}")
+                self._stats["retries"] += 1
+                DB_WRITE_RETRIES.inc()
+                time.sleep(min(0.05 * 2 ** attempt, 2))
+        for _ in batch:
+            self._queue.task_done()
+
+    def _apply(self, entries):
+        """Commit `entries` in one transaction and remove them from the journal."""
+        with DB_WRITE_SECONDS.time(), transaction.atomic():
+            apply_batch([item for _, item in entries])
+        if self.journal is not None:
+            self.journal.remove([journal_id for journal_id, _ in entries if journal_id is not None])
+        self._stats["written"] += len(entries)
+        self._stats["batches"] += 1
+        DB_WRITE_ITEMS.inc(len(entries))
+
+    def _apply_each(self, entries):
+        """Apply entries one per transaction, dropping those that fail; returns the rest after a lock error."""
+        for i, entry in enumerate(entries):
+            try:
+                self._apply([entry])
+            except Exception as e:
+                if is_lock_error(e):
+                    return entries[i:]
+                self._drop(entry, e)
+        return []
+
+    def _drop(self, entry, error):
+        from track.part_cache import part_cache
+
+        journal_id, item = entry
+        logger.error(f"❌ DB writer dropped {item!r}: {error}", exc_info=True)
+        if self.journal is not None and journal_id is not None:
+            self.journal.remove([journal_id])
+        self._stats["dropped"] += 1
+        DB_WRITE_DROPPED.inc()
+        # The cache may report a result that never reached the database
+        part_cache.invalidate(item.part_number)
+
+    def flush(self):
+        """Block until everything queued so far has been written."""
+        if self._thread and self._thread.is_alive():
+            self._queue.join()
+
+    def stop(self, timeout=None):
+        """Write out what is queued and stop the thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self.journal is not None and not (self._thread and self._thread.is_alive()):
+            self.journal.close()
+            self.journal = None
+
+    def stats(self):
+        return {**self._stats, "pending": self._queue.qsize()}
+
+
+def apply_batch(batch):
+    """Apply a batch of PartCreate / StationUpdate / ScanLog items inside the caller's transaction.
+
+    Every part touched by the batch is stamped with one new change version.
+    """
+    events = [item for item in batch if isinstance(item, ScanLog)]
+    if events:
+        ScanEvent.objects.bulk_create(
+            [ScanEvent(day=timezone.localdate(item.timestamp), **item._asdict()) for item in events]
+        )
+        if len(events) == len(batch):
+            return
+
+    version = next_change_version()
+    creates = [item for item in batch if isinstance(item, PartCreate)]
+    if creates:
+        existing_parts = set(
+            TraceabilityData.objects.filter(part_number__in=[item.part_number for item in creates]).values_list(
+                "part_number", flat=True
+            )
+        )
+        record_part_events(
+            (datetime.combine(item.date, item.time), "parts_started")
+            for item in {item.part_number: item for item in creates}.values()
+            if item.part_number not in existing_parts
+        )
+        TraceabilityData.objects.bulk_create(
+            [
+                TraceabilityData(
+                    part_number=item.part_number, date=item.date, time=item.time, shift=item.shift, version=version
+                )
+                for item in creates
+            ],
+            ignore_conflicts=True,
+        )
+        index_part_numbers([item.part_number for item in creates])
+
+    latest = {}
+    for item in batch:
+        if isinstance(item, StationUpdate):
+            latest[(item.part_number, item.station)] = item
+    if not latest:
+        return
+    part_ids = dict(
+        TraceabilityData.objects.filter(part_number__in={part for part, _ in latest}).values_list("part_number", "sr_no")
+    )
+    seen = set(
+        StationResult.objects.filter(part_id__in=part_ids.values()).values_list("part_id", "station")
+    )
+    results = []
+    rollup = []
+    for (part_number, station), item in latest.items():
+        if part_number not in part_ids:
+            logger.error(f"❌ DB writer: no record for {part_number}, dropping {station} result")
+            continue
+        results.append(StationResult(part_id=part_ids[part_number], station=station, result=item.result, timestamp=item.timestamp))
+        rollup.append((item.timestamp, station, item.result, (part_ids[part_number], station) not in seen))
+    StationResult.objects.bulk_create(
+        results,
+        update_conflicts=True,
+        unique_fields=["part", "station"],
+        update_fields=["result", "timestamp"],
+    )
+    TraceabilityData.objects.filter(pk__in=part_ids.values()).update(version=version)
+    record_station_results(rollup)
+    changed = refresh_part_status(set(part_ids.values()))
+    now = timezone.now()
+    finished = {STATUS_COMPLETE: "parts_completed", STATUS_FAILED: "parts_failed"}
+    record_part_events(
+        (now, finished[status]) for (status, _), ids in changed.items() if status in finished for _ in ids
+    )
+
+
+def refresh_part_status(part_ids):
+    """Recompute overall_status / first_failed_station for `part_ids`, updating only those that changed.
+
+    Returns the changes as {(status, first_failed_station): [part ids]}.
+    """
+    results = {part_id: {} for part_id in part_ids}
+    for part_id, station, result in StationResult.objects.filter(part_id__in=part_ids).values_list(
+        "part_id", "station", "result"
+    ):
+        results[part_id][station] = result
+    current = dict(
+        (pk, (status, failed))
+        for pk, status, failed in TraceabilityData.objects.filter(pk__in=part_ids).values_list(
+            "pk", "overall_status", "first_failed_station"
+        )
+    )
+    changed = {}
+    for part_id, by_station in results.items():
+        status = compute_part_status(by_station)
+        if current.get(part_id) != status:
+            changed.setdefault(status, []).append(part_id)
+    for (status, failed), ids in changed.items():
+        TraceabilityData.objects.filter(pk__in=ids).update(overall_status=status, first_failed_station=failed)
+    return changed
+
+
+def build_writer():
+    options = {**DEFAULT_WRITER_OPTIONS, **getattr(settings, "DB_WRITER", {})}
+    options["journal_dir"] = options["journal_dir"] or os.path.join(settings.BASE_DIR, "journal")
+    return StationResultWriter(**options)
+
+
+# Shared by every poller in this process
+db_writer = build_writer()
+atexit.register(db_writer.stop, 10)
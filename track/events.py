@@ -0,0 +1,77 @@
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+
+logger = logging.getLogger(__name__)
+
+
+def sse_event(event, data):
+    """Encode one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class DashboardHub:
+    """Watches for dashboard changes once per process and fans them out to every connected client.
+
+    A single task checks the change counter and the PLC statuses every
+    `interval` seconds while at least one client is subscribed, so the
+    database cost does not grow with the number of screens. Each subscriber
+    gets its own bounded queue; a client that falls that far behind is
+    disconnected and resyncs from a fresh snapshot when it reconnects.
+    """
+
+    def __init__(self, get_version, get_changes, get_plc_status, interval=0.5, queue_size=256):
+        self.get_version = get_version
+        self.get_changes = get_changes
+        self.get_plc_status = get_plc_status
+        self.interval = interval
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(self.queue_size)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, event, data):
+        message = sse_event(event, data)
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                logger.warning("⚠️ Dashboard client fell behind, disconnecting it")
+                self._subscribers.discard(queue)
+                # Make room for the sentinel that ends the client's stream
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def _watch(self):
+        version = await sync_to_async(self.get_version)()
+        plc_status = await sync_to_async(self.get_plc_status)()
+        while self._subscribers:
+            await asyncio.sleep(self.interval)
+            try:
+                current = await sync_to_async(self.get_version)()
+                if current != version:
+                    changes = await sync_to_async(self.get_changes)(version)
+                    version = changes["version"]
+                    if changes["rows"]:
+                        self.publish("rows", changes)
+                status = await sync_to_async(self.get_plc_status)()
+                if status != plc_status:
+                    plc_status = status
+                    self.publish("plc", status)
+            except Exception as e:
+                logger.error(f"❌ Dashboard event watcher failed: {e}", exc_info=True)
+        self._task = None
+
+    def stats(self):
+        return {"subscribers": len(self._subscribers), "running": self._task is not None}
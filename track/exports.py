@@ -0,0 +1,86 @@
+import csv
+import os
+import tempfile
+import zlib
+
+from openpyxl import Workbook
+
+from track.models import STATIONS
+
+EXPORT_COLUMNS = ["sr_no", "part_number", "date", "time", "shift", *[f"{station}_result" for station in STATIONS]]
+EXPORT_FORMATS = {
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "csv": ("text/csv", "csv"),
+}
+CHUNK_ROWS = 2000  # rows fetched per database round trip
+CHUNK_BYTES = 64 * 1024  # size of the pieces handed to the response
+
+
+def export_rows(queryset, chunk_size=CHUNK_ROWS):
+    """Yield EXPORT_COLUMNS tuples without loading the queryset into memory."""
+    return queryset.order_by("sr_no").values_list(*EXPORT_COLUMNS).iterator(chunk_size=chunk_size)
+
+
+class _LineBuffer:
+    """File-like target for csv.writer that just hands back what was written."""
+
+    def write(self, value):
+        return value
+
+
+def csv_chunks(rows):
+    writer = csv.writer(_LineBuffer())
+    pending = [writer.writerow(EXPORT_COLUMNS)]
+    size = 0
+    for row in rows:
+        line = writer.writerow(["" if value is None else value for value in row])
+        pending.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(pending).encode("utf-8")
+            pending, size = [], 0
+    yield "".join(pending).encode("utf-8")
+
+
+def xlsx_chunks(rows):
+    """Write rows with openpyxl's write-only workbook on disk, then stream the file.
+
+    The workbook only keeps the current row in memory; the finished file is
+    read back in CHUNK_BYTES pieces and removed once sent.
+    """
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Traceability")
+        sheet.append(EXPORT_COLUMNS)
+        for row in rows:
+            sheet.append(row)
+        workbook.save(path)
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(queryset, export_format="xlsx", compress=False):
+    """Return (chunk iterator, content type, file extension) for the export of `queryset`."""
+    content_type, extension = EXPORT_FORMATS[export_format]
+    rows = export_rows(queryset)
+    chunks = csv_chunks(rows) if export_format == "csv" else xlsx_chunks(rows)
+    if compress:
+        return gzip_chunks(chunks), "application/gzip", f"{extension}.gz"
+    return chunks, content_type, extension
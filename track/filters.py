@@ -1,5 +1,6 @@
 import django_filters
 from .models import TraceabilityData
+from .part_search import search_part_numbers
 
 SHIFT_CHOICES = [
     ("Shift 1", "Shift 1"),
@@ -8,10 +9,16 @@ SHIFT_CHOICES = [
 ]
 
 class TraceabilityDataFilter(django_filters.FilterSet):
+    # Full QR code, a leading part (family/model) or any 3+ character piece (date, serial)
+    part_number = django_filters.CharFilter(method='filter_part_number', label='Part Number')
     start_date = django_filters.DateFilter(field_name='date', lookup_expr='gte', label='Start Date')
     end_date = django_filters.DateFilter(field_name='date', lookup_expr='lte', label='End Date')
+    code_date = django_filters.DateFilter(field_name='number_index__code_date', label='QR Date')
     shift = django_filters.ChoiceFilter(choices=SHIFT_CHOICES, label="Shift")
 
     class Meta:
         model = TraceabilityData
-        fields = ['part_number', 'shift', 'start_date', 'end_date']
+        fields = ['part_number', 'shift', 'start_date', 'end_date', 'code_date']
+
+    def filter_part_number(self, queryset, name, value):
+        return search_part_numbers(queryset, value)
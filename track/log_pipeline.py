@@ -0,0 +1,216 @@
+import atexit
+import logging
+import queue
+import re
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# Record attributes (passed with `extra=`) printed as key=value by CompactFormatter
+# and used to keep rate limits per station/controller; poller workers tag their records with "worker"
+CONTEXT_FIELDS = ("worker", "station", "plc")
+# Only the PLC/poller loggers are rate-limited, and never at ERROR and above
+DEFAULT_LOG_QUEUE = {"size": 10000, "burst": 5, "period": 60.0, "rate_limited": ("track", "plc")}
+
+_NUMBERS = re.compile(r"\d+")
+
+
+class CompactFormatter(logging.Formatter):
+    """One line per record: time, level initial, logger, context fields, message.
+
+        2025-05-01 07:00:01.123 W track.plc_utils station=st3 🚫 Invalid QR format - 'X'
+    """
+
+    default_msec_format = "%s.%03d"
+
+    def format(self, record):
+        context = "".join(
+            f" {field}={getattr(record, field)}" for field in CONTEXT_FIELDS if getattr(record, field, None)
+        )
+        line = f"{self.formatTime(record)} {record.levelname[0]} {record.name}{context} {record.getMessage()}"
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line = f"{line}\n{record.exc_text}"
+        return line
+
+
+class RateLimiter:
+    """Let through `burst` similar records per `period` seconds and count the rest.
+
+    Records are similar when they share logger, level, context fields and
+    message with numbers masked, so a controller that fails every poll logs a
+    handful of lines a minute instead of one per poll. The count is reported
+    by the next similar record let through, or by `expired()` once the window
+    has closed without one.
+    """
+
+    max_keys = 2000
+
+    def __init__(self, burst=5, period=60.0):
+        self.burst = burst
+        self.period = period
+        # key -> [window start, records seen in the window, suppressed since last pass, last suppressed record]
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def check(self, record):
+        """(allowed, number of similar records suppressed since the last one allowed)."""
+        key = (
+            record.name,
+            record.levelno,
+            *(getattr(record, field, None) for field in CONTEXT_FIELDS),
+            _NUMBERS.sub("#", str(record.msg)),
+        )
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.period:
+                suppressed = window[2] if window else 0
+                if window is None and len(self._windows) >= self.max_keys:
+                    self._prune(now)
+                window = self._windows[key] = [now, 0, suppressed, None]
+            window[1] += 1
+            if window[1] > self.burst:
+                window[2] += 1
+                window[3] = record
+                return False, 0
+            suppressed, window[2] = window[2], 0
+            return True, suppressed
+
+    def expired(self):
+        """[(last suppressed record, count)] of closed windows that suppressed records; forgets every closed window."""
+        now = time.monotonic()
+        summaries = []
+        with self._lock:
+            for key in [key for key, window in self._windows.items() if now - window[0] >= self.period]:
+                window = self._windows.pop(key)
+                if window[2]:
+                    summaries.append((window[3], window[2]))
+        return summaries
+
+    def _prune(self, now):
+        for key in [key for key, window in self._windows.items() if now - window[0] >= self.period]:
+            del self._windows[key]
+
+
+class RoutedQueueHandler(QueueHandler):
+    """Puts records on the shared log queue, tagged with the logger whose handlers should write them.
+
+    Never blocks: records over the rate limit are dropped before formatting,
+    and when the queue is full the record is counted and dropped.
+    """
+
+    def __init__(self, log_queue, route, rate_limiter=None):
+        super().__init__(log_queue)
+        self.route = route
+        self.rate_limiter = rate_limiter
+        self.dropped = 0
+
+    def emit(self, record):
+        suppressed = 0
+        if self.rate_limiter and record.levelno < logging.ERROR:
+            allowed, suppressed = self.rate_limiter.check(record)
+            if not allowed:
+                return
+        try:
+            record = self.prepare(record)
+            record.route = self.route
+            if suppressed:
+                record.msg = f"{record.msg} (suppressed {suppressed} similar)"
+            self.enqueue(record)
+        except Exception:
+            self.handleError(record)
+
+    def summarize(self):
+        """Queue one line per closed rate-limit window that suppressed records."""
+        if not self.rate_limiter:
+            return
+        for sample, count in self.rate_limiter.expired():
+            record = logging.makeLogRecord(sample.__dict__)
+            record.msg = (
+                f"{count} similar messages suppressed in the last {self.rate_limiter.period:.0f}s,"
+                f" last: {sample.getMessage()}"
+            )
+            record.args = None
+            record.exc_info = record.exc_text = None
+            record.route = self.route
+            self.enqueue(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RoutingQueueListener(QueueListener):
+    """Single thread that writes queued records with the handlers of the logger they came from."""
+
+    def __init__(self, log_queue, routes):
+        super().__init__(log_queue, respect_handler_level=True)
+        self.routes = routes  # logger name -> its original handlers
+
+    def handle(self, record):
+        for handler in self.routes.get(record.route, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+class SummaryThread(threading.Thread):
+    """Has the queue handlers report suppressed records every `interval` seconds, without waiting for a new one."""
+
+    def __init__(self, handlers, interval):
+        super().__init__(name="log-summary", daemon=True)
+        self.handlers = handlers
+        self.interval = interval
+        self._finished = threading.Event()  # Thread has a _stop() method of its own
+
+    def run(self):
+        while not self._finished.wait(self.interval):
+            for handler in self.handlers:
+                handler.summarize()
+
+    def stop(self):
+        self._finished.set()
+        self.join(self.interval)
+
+
+def install_log_queue(size=10000, burst=5, period=60.0, rate_limited=("track", "plc")):
+    """Move the handlers of every configured logger behind one queue and listener thread.
+
+    Call after logging is configured. Logging calls then only format the
+    message and enqueue it; file and console I/O happen on the listener
+    thread. Each logger keeps its own handlers and levels. The loggers named
+    in `rate_limited` (and their children) also get their own rate limiter
+    for records below ERROR, whose suppressed counts are reported once per
+    closed window. Returns the listener, which is stopped (and drained) at exit.
+    """
+    log_queue = queue.Queue(size)
+    loggers = [logging.getLogger()] + [
+        logger for logger in logging.Logger.manager.loggerDict.values() if isinstance(logger, logging.Logger)
+    ]
+    routes = {}
+    limited = []
+    for logger in loggers:
+        handlers = [handler for handler in logger.handlers if not isinstance(handler, QueueHandler)]
+        if not handlers:
+            continue
+        routes[logger.name] = handlers
+        rate_limiter = None
+        if any(logger.name == name or logger.name.startswith(f"{name}.") for name in rate_limited):
+            rate_limiter = RateLimiter(burst, period)
+        queue_handler = RoutedQueueHandler(log_queue, logger.name, rate_limiter)
+        if rate_limiter:
+            limited.append(queue_handler)
+        for handler in handlers:
+            logger.removeHandler(handler)
+        logger.addHandler(queue_handler)
+    listener = RoutingQueueListener(log_queue, routes)
+    listener.start()
+    atexit.register(listener.stop)
+    if limited:
+        summaries = SummaryThread(limited, max(period / 4, 1.0))
+        summaries.start()
+        atexit.register(summaries.stop)  # Runs before listener.stop
+    return listener
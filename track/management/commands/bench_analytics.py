@@ -0,0 +1,57 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from track.analytics import load_station_times, local_midnight, station_analytics
+from track.models import LINE_STATIONS, StationResult, TraceabilityData
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Time station_analytics over seeded station results; the seeded rows are rolled back afterwards"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=800000, help="Station results to seed (8 per part)")
+        parser.add_argument("--repeat", type=int, default=3, help="Timed runs of each step")
+
+    def handle(self, *args, **options):
+        day = date(1999, 1, 1)  # Far from real data, so the window only sees the seeded rows
+        start, end = local_midnight(day), local_midnight(day + timedelta(days=31))
+        try:
+            with transaction.atomic():
+                seeded = self.seed(start, options["rows"])
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{seeded} station results seeded"))
+                for name, step in (
+                    ("load_station_times", lambda: load_station_times(start, end)),
+                    ("station_analytics", lambda: station_analytics(start, end)),
+                ):
+                    self.stdout.write(f"  {name:20} {self.timing(step, options['repeat'])}")
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, start, rows):
+        parts = TraceabilityData.objects.bulk_create([
+            TraceabilityData(part_number=f"BENCH-{n:09}", date=start.date(), time=start.time(), shift="Shift 1")
+            for n in range(rows // len(LINE_STATIONS))
+        ], batch_size=5000)
+        StationResult.objects.bulk_create((
+            StationResult(part=part, station=station, result="OK" if n % 50 else "NOT OK",
+                          timestamp=start + timedelta(seconds=n * 20 + i * 15))
+            for n, part in enumerate(parts) for i, station in enumerate(LINE_STATIONS)
+        ), batch_size=5000)
+        return len(parts) * len(LINE_STATIONS)
+
+    def timing(self, step, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            step()
+            samples.append(time.perf_counter() - started)
+        return f"best {min(samples):6.3f}s  median {statistics.median(samples):6.3f}s  max {max(samples):6.3f}s"
@@ -0,0 +1,131 @@
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from track.db_writer import db_writer
+from track.models import LINE_STATIONS, Controller, ScanEvent, Station, StationResult, TraceabilityData
+from track.plc_engine import PollingEngine
+from track.plc_simulator import DEFAULT_PROFILE, LineSimulator
+from track.plc_utils import controller_groups
+from track.station_registry import current_registry, reload_registry
+
+SIGNAL_NAMES = {0: "cleared", 1: "not_ok", 2: "already_ok", 3: "invalid_qr", 4: "ok", 5: "interlock"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the PLC polling engine against simulated MC protocol controllers and report handshake "
+        "latency, scan rate and DB write rate. Runs on a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stations", type=int, default=len(LINE_STATIONS), help="Number of line stations to simulate, from st1")
+        parser.add_argument("--duration", type=float, default=30.0, help="Seconds to feed parts")
+        parser.add_argument("--rate", type=float, default=DEFAULT_PROFILE["rate"], help="Parts per second entering the line")
+        parser.add_argument("--ok-ratio", type=float, default=DEFAULT_PROFILE["ok_ratio"], help="Share of scans reported OK")
+        parser.add_argument("--invalid-ratio", type=float, default=DEFAULT_PROFILE["invalid_ratio"], help="Share of unreadable QR scans")
+        parser.add_argument("--drop-interval", type=float, help="Mean seconds between link drops per controller (default: no drops)")
+        parser.add_argument("--drop-duration", type=float, default=DEFAULT_PROFILE["drop_duration"], help="Seconds a dropped link stays down")
+        parser.add_argument("--port", type=int, default=15007, help="Port the simulated controllers listen on")
+        parser.add_argument("--seed", type=int, help="Random seed for a repeatable run")
+
+    def handle(self, *args, **options):
+        if not 1 <= options["stations"] <= len(LINE_STATIONS):
+            raise CommandError(f"--stations must be between 1 and {len(LINE_STATIONS)}")
+        stations = LINE_STATIONS[: options["stations"]]
+        if options["verbosity"] < 2:
+            logging.getLogger("track").setLevel(logging.WARNING)
+
+        fd, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = path
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            addresses = self.simulate_controllers(stations, options["port"])
+            report = self.run_bench(stations, addresses, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        for line in report:
+            self.stdout.write(line)
+
+    def simulate_controllers(self, stations, port):
+        """Point the throwaway registry (seeded with the line layout) at simulated controllers.
+
+        Each controller gets its own loopback address so the engine, pool and
+        grouping see the same controller layout as the line. Returns the
+        simulator's {stations: (host, port)} map.
+        """
+        Station.objects.exclude(name__in=stations).update(enabled=False)
+        controllers = Controller.objects.filter(stations__name__in=stations).distinct().order_by("pk")
+        for i, controller in enumerate(controllers, start=2):
+            controller.ip, controller.port = f"127.0.0.{i}", port
+            controller.save()
+        reload_registry()
+        registry = current_registry()
+        return {tuple(group): (plc_ip, registry.port(plc_ip)) for plc_ip, group in registry.groups(stations).items()}
+
+    def run_bench(self, stations, addresses, options):
+        profile = {
+            "rate": options["rate"],
+            "ok_ratio": options["ok_ratio"],
+            "invalid_ratio": options["invalid_ratio"],
+            "drop_interval": options["drop_interval"],
+            "drop_duration": options["drop_duration"],
+        }
+        simulator = LineSimulator(addresses, stations, profile, seed=options["seed"])
+        try:
+            simulator.start()
+        except OSError as e:
+            raise CommandError(f"Cannot start the simulated controllers: {e}")
+        engine = PollingEngine(controller_groups(stations))
+        engine.start()
+        started = time.monotonic()
+        time.sleep(options["duration"])
+        simulator.stop(10)
+        engine.stop(30)  # Also drains the DB writer
+        elapsed = time.monotonic() - started
+
+        sim = simulator.stats()
+        writer = db_writer.stats()
+        latencies = [s for station in sim["stations"].values() for s in station["latencies"]]
+        lines = [
+            self.style.MIGRATE_HEADING(
+                f"{len(stations)} stations on {len(addresses)} controllers, {options['rate']} parts/s for {elapsed:.1f}s"
+            ),
+            f"  parts entered: {sim['parts_entered']}  link drops: {sim['drops']}",
+            f"  handshakes: {len(latencies)} ({len(latencies) / elapsed:.1f}/s)  trigger->ack {self.latency(latencies)}",
+        ]
+        for station, result in sim["stations"].items():
+            signals = ", ".join(f"{SIGNAL_NAMES.get(signal, signal)} {n}" for signal, n in sorted(result["signals"].items()))
+            lines.append(
+                f"    {station}: {self.latency(result['latencies'])}  [{signals or 'no scans'}]"
+                f"  timeouts {result['timeouts']}  queued {result['waiting']}"
+            )
+        total_ms = sorted(ScanEvent.objects.exclude(total_ms=None).values_list("total_ms", flat=True))
+        lines += [
+            f"  poller handling (ScanEvent.total_ms): {self.latency([ms / 1000 for ms in total_ms])}",
+            f"  DB writer: {writer['written']} items in {writer['batches']} batches ({writer['written'] / elapsed:.1f}/s), "
+            f"{writer['retries']} retries, {writer['dropped']} dropped",
+            f"  rows: {TraceabilityData.objects.count()} parts, {StationResult.objects.count()} station results, "
+            f"{ScanEvent.objects.count()} scan events",
+        ]
+        return lines
+
+    def latency(self, samples):
+        if not samples:
+            return "no samples"
+        if len(samples) < 2:
+            return f"p50 {samples[0] * 1000:7.2f} ms"
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+        return (
+            f"p50 {cuts[49] * 1000:7.2f} ms  p90 {cuts[89] * 1000:7.2f} ms  "
+            f"p99 {cuts[98] * 1000:7.2f} ms  max {max(samples) * 1000:7.2f} ms"
+        )
@@ -0,0 +1,139 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from Traceability.sqlite_backend.base import DEFAULT_PRAGMAS, apply_pragmas
+
+SCHEMA = """
+CREATE TABLE parts (
+    sr_no INTEGER PRIMARY KEY,
+    part_number TEXT UNIQUE,
+    date TEXT,
+    time TEXT,
+    st1_result TEXT, st2_result TEXT, st3_result TEXT, st4_result TEXT,
+    st5_result TEXT, st6_result TEXT, st7_result TEXT, st8_result TEXT
+)
+"""
+
+DASHBOARD_QUERY = """
+SELECT * FROM parts
+WHERE date = ? OR st1_result IS NULL OR st8_result IS NULL OR st4_result = 'NOT OK'
+ORDER BY date DESC, time DESC
+"""
+
+
+class Command(BaseCommand):
+    help = "Compare SQLite reader/writer concurrency with default settings and with the tuned pragmas"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20000, help="Rows to seed the table with")
+        parser.add_argument("--writers", type=int, default=8, help="Concurrent writer threads (pollers)")
+        parser.add_argument("--readers", type=int, default=4, help="Concurrent reader threads (dashboards)")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run each profile")
+
+    def handle(self, *args, **options):
+        tuned = {**DEFAULT_PRAGMAS, **settings.DATABASES["default"].get("OPTIONS", {}).get("pragmas", {})}
+        profiles = [
+            ("default", {}),
+            ("tuned", tuned),
+        ]
+        for name, pragmas in profiles:
+            result = self.run_profile(pragmas, options)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name}: {pragmas or 'sqlite3 defaults'}"))
+            for line in result:
+                self.stdout.write(f"  {line}")
+
+    def run_profile(self, pragmas, options):
+        fd, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        try:
+            self.seed(path, pragmas, options["rows"])
+            stop = threading.Event()
+            stats = {"write": [], "read": [], "errors": 0}
+            lock = threading.Lock()
+
+            def connect():
+                conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+                apply_pragmas(conn, pragmas)
+                return conn
+
+            def writer():
+                conn = connect()
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    try:
+                        conn.execute("BEGIN IMMEDIATE" if pragmas else "BEGIN")
+                        conn.execute(
+                            f"UPDATE parts SET st{random.randint(1, 8)}_result = ?, time = ? WHERE sr_no = ?",
+                            (random.choice(["OK", "NOT OK"]), time.strftime("%H:%M:%S"), random.randint(1, options["rows"])),
+                        )
+                        conn.execute("COMMIT")
+                        with lock:
+                            stats["write"].append(time.perf_counter() - started)
+                    except sqlite3.OperationalError:
+                        if conn.in_transaction:
+                            conn.execute("ROLLBACK")
+                        with lock:
+                            stats["errors"] += 1
+                    time.sleep(0.005)
+                conn.close()
+
+            def reader():
+                conn = connect()
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    try:
+                        conn.execute(DASHBOARD_QUERY, (time.strftime("%Y-%m-%d"),)).fetchall()
+                        with lock:
+                            stats["read"].append(time.perf_counter() - started)
+                    except sqlite3.OperationalError:
+                        with lock:
+                            stats["errors"] += 1
+                conn.close()
+
+            threads = [threading.Thread(target=writer) for _ in range(options["writers"])]
+            threads += [threading.Thread(target=reader) for _ in range(options["readers"])]
+            for t in threads:
+                t.start()
+            time.sleep(options["duration"])
+            stop.set()
+            for t in threads:
+                t.join()
+
+            duration = options["duration"]
+            return [
+                f"writes: {len(stats['write']) / duration:8.1f}/s  {self.latency(stats['write'])}",
+                f"reads:  {len(stats['read']) / duration:8.1f}/s  {self.latency(stats['read'])}",
+                f"lock errors: {stats['errors']}",
+            ]
+        finally:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    def seed(self, path, pragmas, rows):
+        conn = sqlite3.connect(path)
+        apply_pragmas(conn, pragmas)
+        conn.execute(SCHEMA)
+        today = time.strftime("%Y-%m-%d")
+        conn.executemany(
+            "INSERT INTO parts (part_number, date, time, st1_result, st8_result) VALUES (?, ?, ?, 'OK', ?)",
+            ((f"PDU-S-10594-1-{i:011d}", today if i > rows - 500 else "2025-01-01", "07:00:00",
+              None if i % 50 == 0 else "OK") for i in range(1, rows + 1)),
+        )
+        conn.commit()
+        conn.close()
+
+    def latency(self, samples):
+        if not samples:
+            return "no samples"
+        samples = sorted(samples)
+        p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) >= 20 else samples[-1]
+        return f"p50 {statistics.median(samples) * 1000:7.2f} ms  p95 {p95 * 1000:7.2f} ms  max {samples[-1] * 1000:7.2f} ms"
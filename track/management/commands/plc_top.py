@@ -0,0 +1,144 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from track.metrics import histogram_quantile, merge_metrics, metrics_options, published_metrics
+
+CLEAR_SCREEN = "\x1b[2J\x1b[H"
+STAGES = ("read", "decode", "resolve", "ack", "total")
+
+
+def series(dump, name):
+    """{label values tuple: value} of one metric in a registry dump."""
+    metric = dump.get(name)
+    return {tuple(key): value for key, value in metric["values"]} if metric else {}
+
+
+def delta(current, previous):
+    """Difference of two counter or histogram values; `previous` may be None."""
+    if previous is None:
+        return current
+    if isinstance(current, list):
+        return [[a - b for a, b in zip(current[0], previous[0])], current[1] - previous[1], current[2] - previous[2]]
+    return current - previous
+
+
+def ms(seconds):
+    return f"{seconds * 1000:.1f}" if seconds is not None else "-"
+
+
+class Command(BaseCommand):
+    help = "Live top-style view of the PLC pipeline metrics published by the pollers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, help="Seconds between refreshes (default: the publish interval)")
+        parser.add_argument("--once", action="store_true", help="Print one screen of totals and exit")
+
+    def handle(self, *args, **options):
+        interval = options["interval"] or metrics_options()["publish_interval"]
+        baseline = latest = None  # (published at, merged dump) of the last two distinct snapshots
+        try:
+            while True:
+                snapshots = published_metrics()
+                if snapshots:
+                    stamp = max(snapshot.updated_at for snapshot in snapshots.values())
+                    if latest is None or stamp != latest[0]:
+                        baseline, latest = latest, (stamp, merge_metrics(s.data for s in snapshots.values()))
+                    screen = self.render(snapshots, latest, None if options["once"] else baseline)
+                else:
+                    screen = "No metrics published recently; is start_modbus running?\n"
+                if options["once"]:
+                    self.stdout.write(screen, ending="")
+                    return
+                self.stdout.write(CLEAR_SCREEN + screen, ending="")
+                self.stdout.flush()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+    def render(self, snapshots, latest, baseline):
+        """One screen: rates and latency percentiles over the last publish interval, or totals without a baseline."""
+        stamp, dump = latest
+        previous = baseline[1] if baseline else {}
+        window = (stamp - baseline[0]).total_seconds() if baseline else None
+        age = (timezone.now() - stamp).total_seconds()
+        buckets = {name: metric.get("buckets") for name, metric in dump.items()}
+
+        def changes(name):
+            before = series(previous, name)
+            return {key: delta(value, before.get(key)) for key, value in series(dump, name).items()}
+
+        scans, rejects, stages = changes("plc_scans_total"), changes("plc_rejects_total"), changes("plc_stage_seconds")
+        stations = sorted({key[0] for key in scans} | {key[0] for key in stages}, key=lambda s: (len(s), s))
+        lines = [
+            f"PLC pipeline  sources: {', '.join(snapshots)}  published {age:.1f}s ago  "
+            + (f"rates over {window:.1f}s" if window else "totals since start"),
+            "",
+            f"{'station':8} {'scans/s' if window else 'scans':>8} {'ok':>6} {'rejects':>8}"
+            f" {'no read':>8} {'timeout':>8}"
+            + "".join(f" {stage + ' p95':>12}" for stage in STAGES)
+            + f" {'total p50':>10}",
+        ]
+        for station in stations:
+            outcomes = {key[1]: value for key, value in scans.items() if key[0] == station}
+            count = sum(outcomes.values())
+            timing = {key[1]: value for key, value in stages.items() if key[0] == station}
+
+            def p(q, stage):
+                value = timing.get(stage)
+                return ms(histogram_quantile(q, buckets["plc_stage_seconds"], value[0])) if value else "-"
+
+            lines.append(
+                f"{station:8} {(f'{count / window:.2f}' if window else str(count)):>8} {outcomes.get('ok', 0):>6}"
+                f" {sum(v for k, v in rejects.items() if k[0] == station):>8}"
+                f" {outcomes.get('no_read', 0):>8} {outcomes.get('timeout', 0):>8}"
+                + "".join(f" {p(0.95, stage):>12}" for stage in STAGES)
+                + f" {p(0.5, 'total'):>10}"
+            )
+
+        connects, trigger_reads = changes("plc_connect_seconds"), changes("plc_trigger_read_seconds")
+        failures, reconnects, read_errors = (
+            changes("plc_connect_failures_total"), changes("plc_reconnects_total"), changes("plc_read_errors_total")
+        )
+        breaker_open, breaker_opens = series(dump, "plc_breaker_open"), changes("plc_breaker_opens_total")
+        plcs = sorted({key[0] for metric in (trigger_reads, failures, breaker_open) for key in metric})
+        lines += [
+            "",
+            f"{'controller':16} {'polls':>8} {'poll p95':>9} {'connects':>9} {'failed':>7} {'reconn':>7} {'read err':>9}"
+            f" {'breaker':>8} {'trips':>6}",
+        ]
+        for plc in plcs:
+            polls = trigger_reads.get((plc,))
+            lines.append(
+                f"{plc:16} {polls[2] if polls else 0:>8}"
+                f" {ms(histogram_quantile(0.95, buckets['plc_trigger_read_seconds'], polls[0])) if polls else '-':>9}"
+                f" {connects[(plc,)][2] if (plc,) in connects else 0:>9} {failures.get((plc,), 0):>7}"
+                f" {reconnects.get((plc,), 0):>7} {read_errors.get((plc,), 0):>9}"
+                f" {'OPEN' if breaker_open.get((plc,)) else 'closed':>8} {breaker_opens.get((plc,), 0):>6}"
+            )
+
+        batches = changes("db_write_batch_seconds").get(())
+        items = changes("db_write_items_total").get((), 0)
+        pending = sum(series(dump, "db_writer_pending").values())
+        lines += [
+            "",
+            f"DB writer: {f'{items / window:.1f} items/s' if window else f'{items} items'}"
+            f" in {batches[2] if batches else 0} batches, batch p95"
+            f" {ms(histogram_quantile(0.95, buckets['db_write_batch_seconds'], batches[0])) if batches else '-'} ms,"
+            f" {pending} pending, {changes('db_write_retries_total').get((), 0)} retries,"
+            f" {changes('db_write_dropped_total').get((), 0)} dropped",
+        ]
+        up = series(dump, "poller_worker_up")
+        if up:
+            restarts, worker_stations = series(dump, "poller_worker_restarts_total"), series(dump, "poller_worker_stations")
+            lines.append(
+                "Workers: "
+                + "  ".join(
+                    f"{key[0]} {'up' if value else 'DOWN'} ({worker_stations.get(key, 0)} stations,"
+                    f" {restarts.get(key, 0)} restarts)"
+                    for key, value in sorted(up.items())
+                )
+            )
+        lines.append("")
+        return "\n".join(lines)
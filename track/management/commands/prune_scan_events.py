@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from track.models import ScanEvent
+
+
+class Command(BaseCommand):
+    help = "Delete scan events older than the retention period, one day at a time"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=getattr(settings, "SCAN_EVENTS", {}).get("retention_days", 90),
+            help="Days of scan events to keep (default: SCAN_EVENTS['retention_days'])",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.localdate() - timedelta(days=options["days"])
+        days = list(ScanEvent.objects.filter(day__lt=cutoff).values_list("day", flat=True).distinct().order_by("day"))
+        total = 0
+        for day in days:
+            # Each day goes in its own short transaction so the pollers' writes are not held up
+            if options["dry_run"]:
+                deleted = ScanEvent.objects.filter(day=day).count()
+            else:
+                with transaction.atomic():
+                    deleted, _ = ScanEvent.objects.filter(day=day).delete()
+            total += deleted
+            self.stdout.write(f"{day}: {deleted} events")
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total} scan events older than {cutoff}"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from track.models import PartNumberIndex, PartNumberTrigram, TraceabilityData
+from track.part_search import index_parts
+
+
+class Command(BaseCommand):
+    help = "Rebuild the part-number search index (QR components and trigrams) from TraceabilityData"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000, help="Parts indexed per transaction")
+
+    def handle(self, *args, **options):
+        PartNumberIndex.objects.all().delete()
+        PartNumberTrigram.objects.all().delete()
+        batch, total = [], 0
+        for part in TraceabilityData.objects.values_list("pk", "part_number").iterator(chunk_size=options["batch_size"]):
+            batch.append(part)
+            if len(batch) >= options["batch_size"]:
+                total += self.flush(batch)
+                batch = []
+        total += self.flush(batch)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} part numbers"))
+
+    def flush(self, batch):
+        with transaction.atomic():
+            index_parts(batch)
+        return len(batch)
@@ -0,0 +1,24 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from track.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the shift rollup tables from TraceabilityData / StationResult (backfill or repair)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First shift date to rebuild (YYYY-MM-DD); default: all")
+        parser.add_argument("--end", help="Last shift date to rebuild (YYYY-MM-DD); default: all")
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options["start"]) if options["start"] else None
+            end = date.fromisoformat(options["end"]) if options["end"] else None
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+        with transaction.atomic():
+            rows = rebuild_rollups(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} rollup rows"))
@@ -1,24 +1,75 @@
+import signal
 import time
 import logging
-from threading import Thread
-from django.core.management.base import BaseCommand
-from track.plc_utils import update_traceability_data
+from django.core.management.base import BaseCommand, CommandError
+from track.db_writer import db_writer
+from track.metrics import start_metrics_publisher
+from track.plc_health import start_health_prober
+from track.plc_utils import controller_groups, start_plc_monitoring
+from track.poller_supervisor import PollerSupervisor, supervisor_options
+from track.station_registry import RegistryError, current_registry, start_registry_watcher
 
 logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
-    help = "Start Modbus data fetching task"
+    help = (
+        "Start the PLC pollers, the PLC health prober and the metrics publisher. The controllers are "
+        "sharded over --workers poller processes, restarted if they crash, each probing its own "
+        "controllers; 0 polls and probes in this process."
+    )
 
-    def handle(self, *args, **kwargs):
-        def run_task():
-            try:
-                logger.info("Starting Modbus data fetching task.")
-                update_traceability_data()
-            except Exception as e:
-                logger.error(f"Error in Modbus data fetching task: {e}")
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help=f"Poller worker processes (default: POLLER_SUPERVISOR['workers'], {supervisor_options()['workers']})",
+        )
 
-        thread = Thread(target=run_task, daemon=True)
-        thread.start()
+    def handle(self, *args, **options):
+        supervisor_settings = supervisor_options()
+        workers = supervisor_settings.pop("workers")
+        if options["workers"] is not None:
+            workers = options["workers"]
+        try:
+            current_registry()
+        except RegistryError as e:
+            raise CommandError(f"Invalid station registry: {e}")
+        if workers <= 0:
+            self.run_in_process()
+            return
 
-        while True:
-            time.sleep(10)
+        supervisor = PollerSupervisor(controller_groups(), workers, **supervisor_settings)
+        logger.info(f"Starting {len(supervisor.workers)} PLC poller workers; each health-probes its controllers.")
+        publisher = start_metrics_publisher("supervisor", collect=[supervisor.collect])
+        watcher = start_registry_watcher([lambda registry: supervisor.update(registry.groups())])
+        # Stop cleanly on a service manager's SIGTERM as well as on Ctrl+C
+        signal.signal(signal.SIGTERM, lambda signum, frame: supervisor.stop())
+        try:
+            supervisor.run()  # Shuts the workers down on the way out
+        except KeyboardInterrupt:
+            logger.info("Stopping PLC poller workers.")
+        finally:
+            watcher.stop(5)
+            publisher.stop(5)
+
+    def run_in_process(self):
+        logger.info("Starting PLC polling engine and health prober.")
+        db_writer.open_journal("poller")
+        engine = start_plc_monitoring()
+        prober = start_health_prober()
+        publisher = start_metrics_publisher()
+        watcher = start_registry_watcher([
+            lambda registry: engine.update(registry.groups()),
+            lambda registry: prober.update(registry.groups()),
+        ])
+
+        try:
+            while engine.is_alive():
+                time.sleep(10)
+        except KeyboardInterrupt:
+            logger.info("Stopping PLC polling engine and health prober.")
+        finally:
+            watcher.stop(5)
+            prober.stop(5)
+            engine.stop(10)
+            publisher.stop(5)
@@ -0,0 +1,51 @@
+import json
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from track.analytics import PERCENTILES, local_midnight, station_analytics
+from track.models import LINE_STATIONS
+
+
+class Command(BaseCommand):
+    help = "Cycle time, station-to-station lead time and bottleneck ranking per shift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First day (YYYY-MM-DD); default: 30 days before --end")
+        parser.add_argument("--end", help="Last day, inclusive (YYYY-MM-DD); default: today")
+        parser.add_argument("--station", action="append", help="Limit to these stations (repeatable)")
+        parser.add_argument("--json", action="store_true", help="Print the full result as JSON")
+
+    def handle(self, *args, **options):
+        try:
+            end = date.fromisoformat(options["end"]) if options["end"] else date.today()
+            start = date.fromisoformat(options["start"]) if options["start"] else end - timedelta(days=29)
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+
+        started = time.perf_counter()
+        result = station_analytics(local_midnight(start), local_midnight(end + timedelta(days=1)), options["station"] or LINE_STATIONS)
+        elapsed = time.perf_counter() - started
+        if options["json"]:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{start} .. {end}: {result['parts']} parts, {result['results']} results in {elapsed:.2f}s"
+        ))
+        for title, stats in (("Cycle time (s)", result["cycle_time"]), ("Lead time (s)", result["lead_time"])):
+            self.stdout.write(self.style.MIGRATE_LABEL(title))
+            self.stdout.write(f"  {'':10} {'count':>8} {'mean':>8}" + "".join(f" {f'p{p}':>8}" for p in PERCENTILES))
+            for name, summary in stats.items():
+                if not summary["count"]:
+                    self.stdout.write(f"  {name:10} {0:>8}")
+                    continue
+                self.stdout.write(
+                    f"  {name:10} {summary['count']:>8} {summary['mean']:>8}"
+                    + "".join(f" {summary[f'p{p}']:>8}" for p in PERCENTILES)
+                )
+        self.stdout.write(self.style.MIGRATE_LABEL("Bottleneck per shift (slowest median cycle)"))
+        for shift in result["bottlenecks"]:
+            slowest = shift["stations"][0]
+            self.stdout.write(f"  {shift['shift_date']} {shift['shift']:8} {slowest['station']:5} {slowest['median_cycle']:>8}s")
@@ -0,0 +1,341 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, from a LAN round trip up to a hung socket
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_METRICS_OPTIONS = {"publish_interval": 5.0, "stale_after": 60.0}
+
+
+def metrics_options():
+    return {**DEFAULT_METRICS_OPTIONS, **getattr(settings, "METRICS", {})}
+
+
+class Metric:
+    """A named metric with fixed label names; values are kept per label-value tuple."""
+
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def dump(self):
+        with self._lock:
+            values = [[list(key), value] for key, value in self._values.items()]
+        return {"type": self.kind, "help": self.help, "labels": list(self.label_names), "values": values}
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """Bucketed observations; each value is [per-bucket counts (last is +Inf), sum, count]."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def dump(self):
+        with self._lock:
+            values = [[list(key), [list(counts), total, count]] for key, (counts, total, count) in self._values.items()]
+        return {
+            "type": self.kind,
+            "help": self.help,
+            "labels": list(self.label_names),
+            "buckets": list(self.buckets),
+            "values": values,
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self._register(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help, labels, buckets)
+
+    def dump(self):
+        """JSON-ready state of every metric, as stored in MetricsSnapshot.data."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.dump() for metric in metrics}
+
+
+# Shared by everything in this process
+registry = MetricsRegistry()
+
+PLC_CONNECT_SECONDS = registry.histogram("plc_connect_seconds", "Time to open an MC protocol session.", ["plc"])
+PLC_CONNECT_FAILURES = registry.counter(
+    "plc_connect_failures_total", "Failed MC protocol connection attempts.", ["plc"]
+)
+PLC_RECONNECTS = registry.counter(
+    "plc_reconnects_total", "Pooled sessions replaced after failing a health check.", ["plc"]
+)
+PLC_READ_ERRORS = registry.counter("plc_read_errors_total", "Trigger or station block reads that failed.", ["plc"])
+PLC_TRIGGER_READ_SECONDS = registry.histogram(
+    "plc_trigger_read_seconds", "Time to read the scan trigger words of one controller.", ["plc"]
+)
+PLC_STAGE_SECONDS = registry.histogram(
+    "plc_stage_seconds",
+    "Time spent per handshake stage: read (QR/result block), decode, resolve (cache/DB lookup), ack, total.",
+    ["station", "stage"],
+)
+PLC_SCANS = registry.counter("plc_scans_total", "Handshakes by outcome.", ["station", "outcome"])
+PLC_REJECTS = registry.counter(
+    "plc_rejects_total", "Handshakes answered with a signal other than 4 (OK saved).", ["station", "signal"]
+)
+DB_WRITE_SECONDS = registry.histogram("db_write_batch_seconds", "Time to apply one DB writer batch.")
+DB_WRITE_ITEMS = registry.counter("db_write_items_total", "Items applied by the DB writer.")
+DB_WRITE_RETRIES = registry.counter("db_write_retries_total", "DB writer batches retried after a lock error.")
+DB_WRITE_DROPPED = registry.counter("db_write_dropped_total", "Items the DB writer gave up on.")
+DB_WRITER_PENDING = registry.gauge("db_writer_pending", "Items queued for the DB writer.")
+PLC_BREAKER_OPEN = registry.gauge(
+    "plc_breaker_open", "1 while the controller's circuit breaker is open or half-open in this process.", ["plc"]
+)
+PLC_BREAKER_OPENS = registry.counter(
+    "plc_breaker_opens_total", "Times the controller's circuit breaker opened, including failed trials.", ["plc"]
+)
+POLLER_WORKER_UP = registry.gauge("poller_worker_up", "1 while the poller worker process is running.", ["worker"])
+POLLER_WORKER_RESTARTS = registry.counter(
+    "poller_worker_restarts_total", "Poller worker processes restarted after exiting.", ["worker"]
+)
+POLLER_WORKER_STATIONS = registry.gauge("poller_worker_stations", "Stations polled by the worker.", ["worker"])
+
+
+def observe_scan(station, outcome, signal, timings, total_ms):
+    """Record one handshake's outcome, reject signal and stage times (`timings` maps "<stage>_ms" to ms or None)."""
+    PLC_SCANS.inc(station=station, outcome=outcome)
+    if signal is not None and signal != 4:
+        PLC_REJECTS.inc(station=station, signal=signal)
+    for name, ms in timings.items():
+        if ms is not None:
+            PLC_STAGE_SECONDS.observe(ms / 1000, station=station, stage=name[:-3])
+    PLC_STAGE_SECONDS.observe(total_ms / 1000, station=station, stage="total")
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(str(value))}"' for name, value in pairs) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics(sources):
+    """Prometheus text exposition of several registry dumps.
+
+    `sources` maps a source name (process role) to a MetricsRegistry.dump();
+    every sample gets a `source` label so the same metric from two processes
+    stays apart.
+    """
+    families = {}
+    for source, dump in sources.items():
+        for name, metric in dump.items():
+            families.setdefault(name, []).append((source, metric))
+
+    lines = []
+    for name in sorted(families):
+        first = families[name][0][1]
+        lines.append(f"# HELP {name} {first['help']}")
+        lines.append(f"# TYPE {name} {first['type']}")
+        for source, metric in families[name]:
+            extra = [("source", source)]
+            for key, value in metric["values"]:
+                if metric["type"] != "histogram":
+                    lines.append(f"{name}{format_labels(metric['labels'], key, extra)} {format_value(value)}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, n in zip([*metric["buckets"], float("inf")], counts):
+                    cumulative += n
+                    labels = format_labels(metric["labels"], key, [*extra, ("le", format_value(float(bound)))])
+                    lines.append(f"{name}_bucket{labels} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(metric['labels'], key, extra)} {format_value(float(total))}")
+                lines.append(f"{name}_count{format_labels(metric['labels'], key, extra)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def histogram_quantile(q, buckets, counts):
+    """Estimate quantile `q` from bucket counts (last one +Inf), interpolating inside the bucket like Prometheus."""
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for i, n in enumerate(counts):
+        if seen + n >= rank and n:
+            if i == len(buckets):
+                return buckets[-1]  # Beyond the last bound: report the bound
+            lower = buckets[i - 1] if i else 0.0
+            return lower + (buckets[i] - lower) * (rank - seen) / n
+        seen += n
+    return buckets[-1]
+
+
+def merge_metrics(dumps):
+    """Add up several registry dumps (e.g. one per poller process) into one."""
+    merged = {}
+    for dump in dumps:
+        for name, metric in dump.items():
+            target = merged.setdefault(name, {**metric, "values": {}})
+            for key, value in metric["values"]:
+                key = tuple(key)
+                current = target["values"].get(key)
+                if current is None:
+                    target["values"][key] = value
+                elif metric["type"] == "histogram":
+                    target["values"][key] = [
+                        [a + b for a, b in zip(current[0], value[0])], current[1] + value[1], current[2] + value[2]
+                    ]
+                else:
+                    target["values"][key] = current + value
+    for metric in merged.values():
+        metric["values"] = [[list(key), value] for key, value in metric["values"].items()]
+    return merged
+
+
+def published_metrics(max_age=None):
+    """{source: MetricsSnapshot} of the snapshots published within `max_age` seconds (stale_after by default)."""
+    from track.models import MetricsSnapshot
+
+    max_age = metrics_options()["stale_after"] if max_age is None else max_age
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    return {row.source: row for row in MetricsSnapshot.objects.filter(updated_at__gte=cutoff).order_by("source")}
+
+
+class MetricsPublisher:
+    """Copies this process's registry to its MetricsSnapshot row every `interval` seconds.
+
+    The pollers run outside the web server, so this is how their numbers
+    reach the metrics endpoint and the plc_top command. `collect` callables
+    run before each copy to refresh gauges.
+    """
+
+    def __init__(self, source, interval=5.0, collect=()):
+        self.source = source
+        self.interval = interval
+        self.collect = list(collect)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def publish(self):
+        from track.models import MetricsSnapshot
+
+        for collect in self.collect:
+            collect()
+        MetricsSnapshot.objects.update_or_create(
+            source=self.source, defaults={"updated_at": timezone.now(), "data": registry.dump()}
+        )
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.publish()
+            except Exception as e:
+                logger.error(f"❌ Publishing metrics failed: {e}")
+            finally:
+                close_old_connections()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="metrics-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        try:
+            self.publish()  # Final numbers
+        except Exception as e:
+            logger.error(f"❌ Publishing metrics failed: {e}")
+
+
+def start_metrics_publisher(source="poller", collect=()):
+    from track.db_writer import db_writer
+
+    def collect_writer():
+        DB_WRITER_PENDING.set(db_writer.stats()["pending"])
+
+    publisher = MetricsPublisher(source, metrics_options()["publish_interval"], collect=[collect_writer, *collect])
+    publisher.start()
+    logger.info(f"📈 Publishing {source} metrics every {publisher.interval}s.")
+    return publisher
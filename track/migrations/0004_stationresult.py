@@ -0,0 +1,105 @@
+# Generated by Django 4.2.18 on 2026-10-17 12:11
+
+import datetime
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+STATION_COUNT = 10
+
+
+def combine(day, moment, started):
+    """Timestamp for a wide-column station time; stN_time has no date, so a time
+    earlier than the part's creation time is taken to be after midnight."""
+    stamp = datetime.datetime.combine(day, moment or started)
+    if moment and started and moment < started:
+        stamp += datetime.timedelta(days=1)
+    return timezone.make_aware(stamp) if timezone.is_naive(stamp) else stamp
+
+
+def copy_wide_columns(apps, schema_editor):
+    TraceabilityData = apps.get_model("track", "TraceabilityData")
+    StationResult = apps.get_model("track", "StationResult")
+    batch = []
+    for part in TraceabilityData.objects.iterator(chunk_size=2000):
+        for n in range(1, STATION_COUNT + 1):
+            result = getattr(part, f"st{n}_result")
+            moment = getattr(part, f"st{n}_time")
+            if result in (None, "") and moment is None:
+                continue
+            batch.append(
+                StationResult(
+                    part_id=part.sr_no,
+                    station=f"st{n}",
+                    result=result or None,
+                    timestamp=combine(part.date, moment, part.time),
+                )
+            )
+        if len(batch) >= 5000:
+            StationResult.objects.bulk_create(batch)
+            batch = []
+    StationResult.objects.bulk_create(batch)
+
+
+def restore_wide_columns(apps, schema_editor):
+    TraceabilityData = apps.get_model("track", "TraceabilityData")
+    StationResult = apps.get_model("track", "StationResult")
+    for row in StationResult.objects.iterator(chunk_size=2000):
+        stamp = (
+            timezone.localtime(row.timestamp)
+            if timezone.is_aware(row.timestamp)
+            else row.timestamp
+        )
+        TraceabilityData.objects.filter(sr_no=row.part_id).update(
+            **{f"{row.station}_result": row.result, f"{row.station}_time": stamp.time()}
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("track", "0003_traceabilitydata_st10_result_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StationResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("station", models.CharField(max_length=10)),
+                ("result", models.CharField(blank=True, max_length=10, null=True)),
+                ("timestamp", models.DateTimeField()),
+                (
+                    "part",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="station_results",
+                        to="track.traceabilitydata",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["station", "result", "timestamp"],
+                        name="stationresult_st_res_ts_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="stationresult",
+            constraint=models.UniqueConstraint(
+                fields=("part", "station"), name="stationresult_part_station_uniq"
+            ),
+        ),
+        migrations.RunPython(copy_wide_columns, restore_wide_columns),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.18 on 2026-10-17 12:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("track", "0004_stationresult"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st10_result",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st10_time",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st1_result",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st1_time",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st2_result",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st2_time",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st3_result",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st3_time",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st4_result",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st4_time",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st5_result",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st5_time",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st6_result",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st6_time",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st7_result",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st7_time",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st8_result",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st8_time",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st9_result",
+        ),
+        migrations.RemoveField(
+            model_name="traceabilitydata",
+            name="st9_time",
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.18 on 2026-10-17 12:13
+
+from django.db import migrations, models
+
+LINE_STATIONS = [f"st{n}" for n in range(1, 9)]
+
+
+def backfill_status(apps, schema_editor):
+    TraceabilityData = apps.get_model("track", "TraceabilityData")
+    StationResult = apps.get_model("track", "StationResult")
+    results = {}
+    for part_id, station, result in StationResult.objects.values_list(
+        "part_id", "station", "result"
+    ).iterator():
+        results.setdefault(part_id, {})[station] = result
+    for part_id, by_station in results.items():
+        failed = next(
+            (st for st in LINE_STATIONS if by_station.get(st) == "NOT OK"), None
+        )
+        if failed:
+            status = "failed"
+        elif all(by_station.get(st) == "OK" for st in LINE_STATIONS):
+            status = "complete"
+        else:
+            continue
+        TraceabilityData.objects.filter(pk=part_id).update(
+            overall_status=status, first_failed_station=failed
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("track", "0005_remove_wide_station_columns"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="traceabilitydata",
+            name="first_failed_station",
+            field=models.CharField(blank=True, max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name="traceabilitydata",
+            name="overall_status",
+            field=models.CharField(
+                choices=[
+                    ("in_progress", "In progress"),
+                    ("complete", "Complete"),
+                    ("failed", "Failed"),
+                ],
+                default="in_progress",
+                max_length=12,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="traceabilitydata",
+            index=models.Index(
+                fields=["overall_status", "date"], name="traceability_status_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="traceabilitydata",
+            index=models.Index(
+                fields=["date", "time"], name="traceability_date_time_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_status, migrations.RunPython.noop),
+    ]
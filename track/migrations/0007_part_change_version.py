@@ -0,0 +1,34 @@
+# Generated by Django 4.2.18 on 2026-10-17 12:14
+
+from django.db import migrations, models
+
+
+def seed_counter(apps, schema_editor):
+    # Start at 1 so a client holding version 0 always means "no snapshot yet"
+    ChangeSequence = apps.get_model("track", "ChangeSequence")
+    ChangeSequence.objects.get_or_create(name="parts", defaults={"value": 1})
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("track", "0006_part_overall_status"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeSequence",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=30, primary_key=True, serialize=False),
+                ),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="traceabilitydata",
+            name="version",
+            field=models.BigIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(seed_counter, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.18 on 2026-10-17 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("track", "0007_part_change_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PLCStatus",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("plc_ip", models.CharField(max_length=45, unique=True)),
+                ("stations", models.CharField(max_length=100)),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[
+                            ("connected", "Connected"),
+                            ("disconnected", "Disconnected"),
+                        ],
+                        default="disconnected",
+                        max_length=12,
+                    ),
+                ),
+                ("last_change", models.DateTimeField()),
+                ("last_checked", models.DateTimeField()),
+                ("rtt_ms", models.FloatField(blank=True, null=True)),
+                ("error", models.CharField(blank=True, default="", max_length=200)),
+            ],
+        ),
+    ]
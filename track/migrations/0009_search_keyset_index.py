@@ -0,0 +1,22 @@
+# Generated by Django 4.2.18 on 2026-10-17 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("track", "0008_plcstatus"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="traceabilitydata",
+            name="traceability_date_time_idx",
+        ),
+        migrations.AddIndex(
+            model_name="traceabilitydata",
+            index=models.Index(
+                fields=["date", "time", "sr_no"], name="traceability_date_time_sr_idx"
+            ),
+        ),
+    ]
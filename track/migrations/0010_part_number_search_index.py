@@ -0,0 +1,113 @@
+# Generated by Django 4.2.18 on 2026-10-17 12:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+from datetime import datetime
+
+QR_COMPONENTS = re.compile(
+    r"^(?P<prefix>(?P<family>[A-Z]+)-S-(?P<model_number>\d+)-(?P<revision>\d+))-(?P<code_date>\d{6})(?P<serial>\d{5})$"
+)
+
+
+def build_index(apps, schema_editor):
+    TraceabilityData = apps.get_model("track", "TraceabilityData")
+    PartNumberIndex = apps.get_model("track", "PartNumberIndex")
+    PartNumberTrigram = apps.get_model("track", "PartNumberTrigram")
+    components, grams = [], []
+    for pk, part_number in TraceabilityData.objects.values_list(
+        "pk", "part_number"
+    ).iterator():
+        match = QR_COMPONENTS.match(part_number)
+        if match:
+            parsed = match.groupdict()
+            try:
+                parsed["code_date"] = datetime.strptime(
+                    parsed["code_date"], "%d%m%y"
+                ).date()
+            except ValueError:
+                parsed["code_date"] = None
+            components.append(PartNumberIndex(part_id=pk, **parsed))
+        text = part_number.upper()
+        grams.extend(
+            PartNumberTrigram(part_id=pk, trigram=gram)
+            for gram in {text[i : i + 3] for i in range(len(text) - 2)}
+        )
+        if len(grams) >= 5000:
+            PartNumberIndex.objects.bulk_create(components, ignore_conflicts=True)
+            PartNumberTrigram.objects.bulk_create(grams, ignore_conflicts=True)
+            components, grams = [], []
+    PartNumberIndex.objects.bulk_create(components, ignore_conflicts=True)
+    PartNumberTrigram.objects.bulk_create(grams, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("track", "0009_search_keyset_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PartNumberTrigram",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("trigram", models.CharField(max_length=3)),
+                (
+                    "part",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="number_trigrams",
+                        to="track.traceabilitydata",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="PartNumberIndex",
+            fields=[
+                (
+                    "part",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="number_index",
+                        serialize=False,
+                        to="track.traceabilitydata",
+                    ),
+                ),
+                ("prefix", models.CharField(db_index=True, max_length=60)),
+                ("family", models.CharField(max_length=10)),
+                ("model_number", models.CharField(max_length=20)),
+                ("revision", models.CharField(max_length=10)),
+                ("code_date", models.DateField(blank=True, null=True)),
+                ("serial", models.CharField(max_length=10)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["family", "model_number", "revision"],
+                        name="partindex_model_idx",
+                    ),
+                    models.Index(
+                        fields=["code_date", "serial"], name="partindex_date_serial_idx"
+                    ),
+                    models.Index(fields=["serial"], name="partindex_serial_idx"),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="partnumbertrigram",
+            constraint=models.UniqueConstraint(
+                fields=("trigram", "part"), name="parttrigram_trigram_part_uniq"
+            ),
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
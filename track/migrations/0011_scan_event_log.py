@@ -0,0 +1,69 @@
+# Generated by Django 4.2.18 on 2026-10-17 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("track", "0010_part_number_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScanEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("timestamp", models.DateTimeField()),
+                ("day", models.DateField()),
+                ("station", models.CharField(max_length=10)),
+                (
+                    "part_number",
+                    models.CharField(blank=True, default="", max_length=100),
+                ),
+                ("result_word", models.SmallIntegerField(blank=True, null=True)),
+                ("signal", models.SmallIntegerField(blank=True, null=True)),
+                (
+                    "outcome",
+                    models.CharField(
+                        choices=[
+                            ("ok", "OK saved"),
+                            ("not_ok", "NOT OK saved"),
+                            ("already_ok", "Already OK"),
+                            ("invalid_qr", "Invalid QR"),
+                            ("interlock", "Previous station not OK"),
+                            ("no_read", "QR/result not read"),
+                            ("ack_failed", "Signal not written"),
+                            ("timeout", "Handshake timed out"),
+                            ("error", "Error"),
+                        ],
+                        max_length=12,
+                    ),
+                ),
+                ("read_ms", models.FloatField(blank=True, null=True)),
+                ("resolve_ms", models.FloatField(blank=True, null=True)),
+                ("ack_ms", models.FloatField(blank=True, null=True)),
+                ("total_ms", models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["part_number", "timestamp"],
+                        name="scanevent_part_ts_idx",
+                    ),
+                    models.Index(fields=["timestamp"], name="scanevent_ts_idx"),
+                    models.Index(
+                        fields=["station", "timestamp"], name="scanevent_station_ts_idx"
+                    ),
+                    models.Index(fields=["day"], name="scanevent_day_idx"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.18 on 2026-10-17 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("track", "0011_scan_event_log"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShiftRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shift_date", models.DateField()),
+                ("shift", models.CharField(max_length=10)),
+                ("parts_started", models.PositiveIntegerField(default=0)),
+                ("parts_completed", models.PositiveIntegerField(default=0)),
+                ("parts_failed", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ShiftStationRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shift_date", models.DateField()),
+                ("shift", models.CharField(max_length=10)),
+                ("station", models.CharField(max_length=10)),
+                ("ok_count", models.PositiveIntegerField(default=0)),
+                ("not_ok_count", models.PositiveIntegerField(default=0)),
+                ("first_pass_count", models.PositiveIntegerField(default=0)),
+                ("first_pass_ok", models.PositiveIntegerField(default=0)),
+                ("retest_count", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="shiftstationrollup",
+            constraint=models.UniqueConstraint(
+                fields=("shift_date", "shift", "station"),
+                name="shiftstationrollup_date_shift_station_uniq",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="shiftrollup",
+            constraint=models.UniqueConstraint(
+                fields=("shift_date", "shift"), name="shiftrollup_date_shift_uniq"
+            ),
+        ),
+    ]
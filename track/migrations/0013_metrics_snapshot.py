@@ -0,0 +1,29 @@
+# Generated by Django 4.2.18 on 2026-10-17 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("track", "0012_shift_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MetricsSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source", models.CharField(max_length=50, unique=True)),
+                ("updated_at", models.DateTimeField()),
+                ("data", models.JSONField(default=dict)),
+            ],
+        ),
+    ]
@@ -0,0 +1,142 @@
+# Generated by Django 4.2.18 on 2026-10-17 12:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# The layout previously hard-coded in track.plc_utils (PLC_MAPPING and REGISTERS):
+# controller IP and name -> station: (qr, result, scan_trigger, write_signal)
+LINE_LAYOUT = {
+    ("192.168.1.100", "St 1"): {"st1": (5100, 5154, 5156, 5158)},
+    ("192.168.1.130", "St 2"): {"st2": (5200, 5254, 5256, 5258)},
+    ("192.168.1.20", "St 3 & 4"): {
+        "st3": (5300, 5354, 5356, 5358),
+        "st4": (5400, 5454, 5456, 5458),
+    },
+    ("192.168.1.40", "St 5 & 6"): {
+        "st5": (5500, 5554, 5556, 5558),
+        "st6": (5600, 5654, 5656, 5658),
+    },
+    ("192.168.1.60", "St 7 & 8"): {
+        "st7": (5700, 5764, 5760, 5762),
+        "st8": (5800, 5854, 5856, 5858),
+    },
+}
+
+
+def seed_registry(apps, schema_editor):
+    Controller = apps.get_model("track", "Controller")
+    Station = apps.get_model("track", "Station")
+    ChangeSequence = apps.get_model("track", "ChangeSequence")
+    for (ip, name), stations in LINE_LAYOUT.items():
+        controller = Controller.objects.create(ip=ip, name=name)
+        for station, (qr, result, scan_trigger, write_signal) in stations.items():
+            Station.objects.create(
+                name=station,
+                controller=controller,
+                qr_register=qr,
+                result_register=result,
+                scan_trigger_register=scan_trigger,
+                write_signal_register=write_signal,
+            )
+    ChangeSequence.objects.get_or_create(name="registry", defaults={"value": 1})
+
+
+def unseed_registry(apps, schema_editor):
+    apps.get_model("track", "Station").objects.all().delete()
+    apps.get_model("track", "Controller").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("track", "0013_metrics_snapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Controller",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("ip", models.GenericIPAddressField(unique=True)),
+                ("port", models.PositiveIntegerField(default=5007)),
+                ("name", models.CharField(blank=True, default="", max_length=50)),
+                ("enabled", models.BooleanField(default=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Station",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        choices=[
+                            ("st1", "st1"),
+                            ("st2", "st2"),
+                            ("st3", "st3"),
+                            ("st4", "st4"),
+                            ("st5", "st5"),
+                            ("st6", "st6"),
+                            ("st7", "st7"),
+                            ("st8", "st8"),
+                            ("st9", "st9"),
+                            ("st10", "st10"),
+                        ],
+                        max_length=10,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "qr_register",
+                    models.PositiveIntegerField(
+                        help_text="First of the 30 words holding the scanned QR text"
+                    ),
+                ),
+                (
+                    "result_register",
+                    models.PositiveIntegerField(
+                        help_text="1 when the station reports OK"
+                    ),
+                ),
+                (
+                    "scan_trigger_register",
+                    models.PositiveIntegerField(
+                        help_text="Set to 1 by the PLC when a scan is ready"
+                    ),
+                ),
+                (
+                    "write_signal_register",
+                    models.PositiveIntegerField(
+                        help_text="Handshake signal written back by the poller"
+                    ),
+                ),
+                ("enabled", models.BooleanField(default=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "controller",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="stations",
+                        to="track.controller",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(seed_registry, unseed_registry),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.18 on 2026-10-17 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("track", "0014_station_registry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="plcstatus",
+            name="breaker",
+            field=models.CharField(
+                choices=[
+                    ("closed", "Closed"),
+                    ("open", "Open"),
+                    ("half_open", "Half-open"),
+                ],
+                default="closed",
+                max_length=9,
+            ),
+        ),
+        migrations.AddField(
+            model_name="plcstatus",
+            name="retry_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
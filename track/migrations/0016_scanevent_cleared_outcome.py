@@ -0,0 +1,31 @@
+# Generated by Django 4.2.18 on 2026-10-17 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("track", "0015_plcstatus_breaker"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="scanevent",
+            name="outcome",
+            field=models.CharField(
+                choices=[
+                    ("ok", "OK saved"),
+                    ("not_ok", "NOT OK saved"),
+                    ("already_ok", "Already OK"),
+                    ("invalid_qr", "Invalid QR"),
+                    ("interlock", "Previous station not OK"),
+                    ("no_read", "QR/result not read"),
+                    ("cleared", "Trigger cleared before read"),
+                    ("ack_failed", "Signal not written"),
+                    ("timeout", "Handshake timed out"),
+                    ("error", "Error"),
+                ],
+                max_length=12,
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.18 on 2026-10-17 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("track", "0016_scanevent_cleared_outcome"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="stationresult",
+            name="stationresult_st_res_ts_idx",
+        ),
+        migrations.AddIndex(
+            model_name="stationresult",
+            index=models.Index(
+                fields=["station", "result", "timestamp", "part"],
+                name="stationresult_st_res_ts_pt_idx",
+            ),
+        ),
+    ]
@@ -1,4 +1,69 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery
+
+# Station columns shown on the dashboard, search page and export
+STATIONS = [f"st{n}" for n in range(1, 11)]
+
+# Stations a part passes through on the line, in order; all OK means complete
+LINE_STATIONS = STATIONS[:8]
+
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_COMPLETE = "complete"
+STATUS_FAILED = "failed"
+STATUS_CHOICES = [
+    (STATUS_IN_PROGRESS, "In progress"),
+    (STATUS_COMPLETE, "Complete"),
+    (STATUS_FAILED, "Failed"),
+]
+
+
+def compute_part_status(results, stations=LINE_STATIONS):
+    """Return (overall_status, first_failed_station) for a {station: result} dict."""
+    for station in stations:
+        if results.get(station) == "NOT OK":
+            return STATUS_FAILED, station
+    if all(results.get(station) == "OK" for station in stations):
+        return STATUS_COMPLETE, None
+    return STATUS_IN_PROGRESS, None
+
+
+class ChangeSequence(models.Model):
+    """Named counters handing out monotonically increasing change versions."""
+
+    name = models.CharField(max_length=30, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+def next_change_version(name="parts"):
+    """Claim the next value of a change counter.
+
+    Call inside the transaction that writes the changed rows so versions
+    become visible in commit order.
+    """
+    with transaction.atomic():
+        if not ChangeSequence.objects.filter(name=name).update(value=F("value") + 1):
+            ChangeSequence.objects.create(name=name, value=1)
+        return ChangeSequence.objects.values_list("value", flat=True).get(name=name)
+
+
+def current_change_version(name="parts"):
+    return ChangeSequence.objects.filter(name=name).values_list("value", flat=True).first() or 0
+
+
+class TraceabilityDataQuerySet(models.QuerySet):
+    def with_station_columns(self, stations=STATIONS):
+        """Annotate `stN_result` for each station, in the shape of the old wide columns."""
+        return self.annotate(**{
+            f"{station}_result": Subquery(
+                StationResult.objects.filter(part=OuterRef("pk"), station=station).values("result")[:1]
+            )
+            for station in stations
+        })
+
 
 class TraceabilityData(models.Model):
     sr_no = models.AutoField(primary_key=True)  # Serial Number (Primary Key)
@@ -6,26 +71,302 @@ class TraceabilityData(models.Model):
     date = models.DateField()  # Date of entry
     time = models.TimeField()  # Time of entry
     shift = models.CharField(max_length=10, null=True, blank=True)  # Shift (e.g., A, B, C)
-    st1_time = models.TimeField(null=True, blank=True)
-    st1_result = models.CharField(max_length=10, null=True, blank=True)  # Station 1 Result
-    st2_time = models.TimeField(null=True, blank=True)
-    st2_result = models.CharField(max_length=10, null=True, blank=True)  # Station 2 Result
-    st3_time = models.TimeField(null=True, blank=True)
-    st3_result = models.CharField(max_length=10, null=True, blank=True)  # Station 3 Result
-    st4_time = models.TimeField(null=True, blank=True)
-    st4_result = models.CharField(max_length=10, null=True, blank=True)  # Station 4 Result
-    st5_time = models.TimeField(null=True, blank=True)
-    st5_result = models.CharField(max_length=10, null=True, blank=True)  # Station 5 Result
-    st6_time = models.TimeField(null=True, blank=True)
-    st6_result = models.CharField(max_length=10, null=True, blank=True)  # Station 6 Result
-    st7_time = models.TimeField(null=True, blank=True)
-    st7_result = models.CharField(max_length=10, null=True, blank=True)  # Station 7 Result
-    st8_time = models.TimeField(null=True, blank=True)
-    st8_result = models.CharField(max_length=10, null=True, blank=True)  # Station 8 Result
-    st9_time = models.TimeField(null=True, blank=True)
-    st9_result = models.CharField(max_length=10, null=True, blank=True)  # Station 7 Result
-    st10_time = models.TimeField(null=True, blank=True)
-    st10_result = models.CharField(max_length=10, null=True, blank=True)  # Station 8 Result
+    overall_status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=STATUS_IN_PROGRESS)
+    first_failed_station = models.CharField(max_length=10, null=True, blank=True)  # First NOT OK station in line order
+    version = models.BigIntegerField(default=0, db_index=True)  # Change counter value of the last write
+
+    objects = TraceabilityDataQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["overall_status", "date"], name="traceability_status_date_idx"),
+            # Newest-first ordering of the dashboard and keyset pagination of search_parts
+            models.Index(fields=["date", "time", "sr_no"], name="traceability_date_time_sr_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        from track.part_search import index_parts
+
+        # Edits made through the ORM (admin, shell) must reach the dashboard deltas too
+        with transaction.atomic():
+            self.version = next_change_version()
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "version"}
+            super().save(*args, **kwargs)
+            if kwargs.get("update_fields") is None or "part_number" in kwargs["update_fields"]:
+                index_parts([(self.pk, self.part_number)], replace=True)
 
     def __str__(self):
         return f"{self.sr_no} - {self.part_number}"
+
+
+class StationResult(models.Model):
+    part = models.ForeignKey(TraceabilityData, on_delete=models.CASCADE, related_name="station_results")
+    station = models.CharField(max_length=10)  # e.g. "st1"
+    result = models.CharField(max_length=10, null=True, blank=True)  # "OK" / "NOT OK"
+    timestamp = models.DateTimeField()  # When the station reported the result
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["part", "station"], name="stationresult_part_station_uniq"),
+        ]
+        indexes = [
+            # Covers load_station_times, which reads part ids and timestamps straight from the index
+            models.Index(fields=["station", "result", "timestamp", "part"], name="stationresult_st_res_ts_pt_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.part_id} - {self.station}: {self.result}"
+
+
+class PartNumberIndex(models.Model):
+    """QR components of a part number (see track.part_search), indexed for structured lookups."""
+
+    part = models.OneToOneField(TraceabilityData, on_delete=models.CASCADE, primary_key=True, related_name="number_index")
+    prefix = models.CharField(max_length=60, db_index=True)  # e.g. "PDU-S-10594-1"
+    family = models.CharField(max_length=10)  # e.g. "PDU"
+    model_number = models.CharField(max_length=20)  # e.g. "10594"
+    revision = models.CharField(max_length=10)  # e.g. "1"
+    code_date = models.DateField(null=True, blank=True)  # DDMMYY printed by generate_qr_code
+    serial = models.CharField(max_length=10)  # e.g. "00012"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["family", "model_number", "revision"], name="partindex_model_idx"),
+            models.Index(fields=["code_date", "serial"], name="partindex_date_serial_idx"),
+            models.Index(fields=["serial"], name="partindex_serial_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.part_id}: {self.prefix} {self.code_date} {self.serial}"
+
+
+class PartNumberTrigram(models.Model):
+    """One row per distinct 3-character substring of a part number, for substring search."""
+
+    part = models.ForeignKey(TraceabilityData, on_delete=models.CASCADE, related_name="number_trigrams")
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["trigram", "part"], name="parttrigram_trigram_part_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.part_id}: {self.trigram}"
+
+
+# MC protocol (3E frame) port configured on the controllers
+PLC_PORT = 5007
+
+
+def bump_registry_version():
+    """Mark the station registry changed so the pollers reload it (track.station_registry)."""
+    return next_change_version("registry")
+
+
+class Controller(models.Model):
+    """A PLC serving one or more stations, edited in the admin and read by track.station_registry."""
+
+    ip = models.GenericIPAddressField(unique=True)
+    port = models.PositiveIntegerField(default=PLC_PORT)
+    name = models.CharField(max_length=50, blank=True, default="")  # e.g. "St 3 & 4"
+    enabled = models.BooleanField(default=True)  # Disabled controllers are neither polled nor probed
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            bump_registry_version()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            bump_registry_version()
+        return result
+
+    def __str__(self):
+        return f"{self.name or self.ip} ({self.ip}:{self.port})"
+
+
+class Station(models.Model):
+    """Handshake registers of one station on its controller; register fields hold D register numbers."""
+
+    name = models.CharField(max_length=10, unique=True, choices=[(station, station) for station in STATIONS])
+    controller = models.ForeignKey(Controller, on_delete=models.PROTECT, related_name="stations")
+    qr_register = models.PositiveIntegerField(help_text="First of the 30 words holding the scanned QR text")
+    result_register = models.PositiveIntegerField(help_text="1 when the station reports OK")
+    scan_trigger_register = models.PositiveIntegerField(help_text="Set to 1 by the PLC when a scan is ready")
+    write_signal_register = models.PositiveIntegerField(help_text="Handshake signal written back by the poller")
+    enabled = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def register_numbers(self):
+        return [self.qr_register, self.result_register, self.scan_trigger_register, self.write_signal_register]
+
+    def clean(self):
+        # Registers must not overlap those of another enabled station on the same controller
+        from track.station_registry import StationConfig, register_overlaps
+
+        if not self.enabled or self.controller_id is None or None in self.register_numbers():
+            return
+        others = Station.objects.filter(controller_id=self.controller_id, enabled=True).exclude(pk=self.pk)
+        problems = register_overlaps(
+            StationConfig(station.name, self.controller.ip, None, *station.register_numbers())
+            for station in [self, *others]
+        )
+        if problems:
+            raise ValidationError(problems)
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            bump_registry_version()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            bump_registry_version()
+        return result
+
+    def __str__(self):
+        return self.name
+
+
+PLC_CONNECTED = "connected"
+PLC_DISCONNECTED = "disconnected"
+PLC_STATE_CHOICES = [(PLC_CONNECTED, "Connected"), (PLC_DISCONNECTED, "Disconnected")]
+
+# Circuit breaker states of a controller (track.plc_breaker)
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+BREAKER_STATE_CHOICES = [(BREAKER_CLOSED, "Closed"), (BREAKER_OPEN, "Open"), (BREAKER_HALF_OPEN, "Half-open")]
+
+
+class PLCStatus(models.Model):
+    """Latest health-probe result per PLC controller, written by track.plc_health."""
+
+    plc_ip = models.CharField(max_length=45, unique=True)
+    stations = models.CharField(max_length=100)  # Comma-separated stations served, e.g. "st3,st4"
+    state = models.CharField(max_length=12, choices=PLC_STATE_CHOICES, default=PLC_DISCONNECTED)
+    last_change = models.DateTimeField()  # When `state` last flipped
+    last_checked = models.DateTimeField()
+    rtt_ms = models.FloatField(null=True, blank=True)  # TCP connect time of the last successful probe
+    error = models.CharField(max_length=200, blank=True, default="")
+    breaker = models.CharField(max_length=9, choices=BREAKER_STATE_CHOICES, default=BREAKER_CLOSED)
+    retry_at = models.DateTimeField(null=True, blank=True)  # Next probe while the breaker is not closed
+
+    def station_list(self):
+        return self.stations.split(",") if self.stations else []
+
+    def __str__(self):
+        return f"{self.plc_ip} ({self.stations}): {self.state}"
+
+
+SCAN_OUTCOMES = [
+    ("ok", "OK saved"),  # signal 4
+    ("not_ok", "NOT OK saved"),  # signal 1
+    ("already_ok", "Already OK"),  # signal 2
+    ("invalid_qr", "Invalid QR"),  # signal 3
+    ("interlock", "Previous station not OK"),  # signal 5
+    ("no_read", "QR/result not read"),
+    ("cleared", "Trigger cleared before read"),
+    ("ack_failed", "Signal not written"),
+    ("timeout", "Handshake timed out"),
+    ("error", "Error"),
+]
+SIGNAL_OUTCOMES = {4: "ok", 1: "not_ok", 2: "already_ok", 3: "invalid_qr", 5: "interlock"}
+
+
+class ScanEventQuerySet(models.QuerySet):
+    def for_part(self, part_number):
+        return self.filter(part_number=part_number).order_by("timestamp")
+
+    def between(self, start, end):
+        return self.filter(timestamp__gte=start, timestamp__lt=end)
+
+
+class ScanEvent(models.Model):
+    """Append-only record of one PLC handshake, whatever its outcome.
+
+    Rows are only ever inserted (by the DB writer) and removed a whole `day`
+    at a time by the prune_scan_events command.
+    """
+
+    timestamp = models.DateTimeField()  # Trigger seen
+    day = models.DateField()  # Local date of `timestamp`; the retention partition
+    station = models.CharField(max_length=10)
+    part_number = models.CharField(max_length=100, blank=True, default="")  # Raw QR as read, even if invalid
+    result_word = models.SmallIntegerField(null=True, blank=True)
+    signal = models.SmallIntegerField(null=True, blank=True)  # Handshake signal sent to the PLC
+    outcome = models.CharField(max_length=12, choices=SCAN_OUTCOMES)
+    read_ms = models.FloatField(null=True, blank=True)
+    resolve_ms = models.FloatField(null=True, blank=True)
+    ack_ms = models.FloatField(null=True, blank=True)
+    total_ms = models.FloatField(null=True, blank=True)
+
+    objects = ScanEventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["part_number", "timestamp"], name="scanevent_part_ts_idx"),
+            models.Index(fields=["timestamp"], name="scanevent_ts_idx"),
+            models.Index(fields=["station", "timestamp"], name="scanevent_station_ts_idx"),
+            models.Index(fields=["day"], name="scanevent_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.timestamp:%Y-%m-%d %H:%M:%S} {self.station} {self.part_number}: {self.outcome}"
+
+
+class ShiftRollup(models.Model):
+    """Part counts per production shift, kept current by the DB writer (see track.rollups)."""
+
+    shift_date = models.DateField()  # Production day the shift started on
+    shift = models.CharField(max_length=10)
+    parts_started = models.PositiveIntegerField(default=0)
+    parts_completed = models.PositiveIntegerField(default=0)  # Became complete during the shift
+    parts_failed = models.PositiveIntegerField(default=0)  # Became failed during the shift
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["shift_date", "shift"], name="shiftrollup_date_shift_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.shift_date} {self.shift}"
+
+
+class ShiftStationRollup(models.Model):
+    """Station results per production shift, kept current by the DB writer (see track.rollups)."""
+
+    shift_date = models.DateField()
+    shift = models.CharField(max_length=10)
+    station = models.CharField(max_length=10)
+    ok_count = models.PositiveIntegerField(default=0)  # Results written, retests included
+    not_ok_count = models.PositiveIntegerField(default=0)
+    first_pass_count = models.PositiveIntegerField(default=0)  # Parts seen at the station for the first time
+    first_pass_ok = models.PositiveIntegerField(default=0)  # ... whose first result was OK
+    retest_count = models.PositiveIntegerField(default=0)  # Results overwriting an earlier one
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["shift_date", "shift", "station"], name="shiftstationrollup_date_shift_station_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.shift_date} {self.shift} {self.station}"
+
+
+class MetricsSnapshot(models.Model):
+    """Latest metrics of one process (e.g. the poller), published by track.metrics.MetricsPublisher."""
+
+    source = models.CharField(max_length=50, unique=True)
+    updated_at = models.DateTimeField()
+    data = models.JSONField(default=dict)  # MetricsRegistry.dump()
+
+    def __str__(self):
+        return f"{self.source} @ {self.updated_at:%Y-%m-%d %H:%M:%S}"
@@ -0,0 +1,78 @@
+from datetime import date, time
+
+from django.db.models import Q
+
+COUNT_LIMIT = 10000  # counts stop here and are shown as "10000+"
+
+
+def encode_cursor(part):
+    return f"{part.date.isoformat()}_{part.time.isoformat()}_{part.sr_no}"
+
+
+def decode_cursor(cursor):
+    """(date, time, sr_no) from encode_cursor(), or None if it does not parse."""
+    try:
+        day, moment, sr_no = cursor.split("_")
+        return date.fromisoformat(day), time.fromisoformat(moment), int(sr_no)
+    except (AttributeError, ValueError):
+        return None
+
+
+def seek(day, moment, sr_no, direction):
+    """Rows strictly before (`lt`) or after (`gt`) a key in (date, time, sr_no) order."""
+    return (
+        Q(**{f"date__{direction}": day})
+        | Q(date=day, **{f"time__{direction}": moment})
+        | Q(date=day, time=moment, **{f"sr_no__{direction}": sr_no})
+    )
+
+
+class KeysetPage:
+    def __init__(self, rows, has_newer, has_older):
+        self.rows = rows
+        self.has_newer = has_newer
+        self.has_older = has_older
+
+    @property
+    def newer_cursor(self):
+        return encode_cursor(self.rows[0]) if self.has_newer and self.rows else None
+
+    @property
+    def older_cursor(self):
+        return encode_cursor(self.rows[-1]) if self.has_older and self.rows else None
+
+
+class KeysetPaginator:
+    """Newest-first seek pagination on (date, time, sr_no).
+
+    Pages are addressed by the key of their boundary row instead of an
+    offset, so every page is one index range scan (traceability_date_time_sr_idx)
+    of `page_size + 1` rows no matter how deep into the table it is.
+    """
+
+    def __init__(self, queryset, page_size):
+        self.queryset = queryset
+        self.page_size = page_size
+
+    def page(self, older_than=None, newer_than=None):
+        """The page after the `older_than` cursor, the one before `newer_than`, or the newest page."""
+        older_key = decode_cursor(older_than)
+        newer_key = decode_cursor(newer_than)
+        if newer_key:
+            rows = list(
+                self.queryset.filter(seek(*newer_key, "gt")).order_by("date", "time", "sr_no")[: self.page_size + 1]
+            )
+            has_newer = len(rows) > self.page_size
+            return KeysetPage(rows[: self.page_size][::-1], has_newer, True)
+
+        queryset = self.queryset
+        if older_key:
+            queryset = queryset.filter(seek(*older_key, "lt"))
+        rows = list(queryset.order_by("-date", "-time", "-sr_no")[: self.page_size + 1])
+        return KeysetPage(rows[: self.page_size], bool(older_key), len(rows) > self.page_size)
+
+
+def bounded_count(queryset, limit=COUNT_LIMIT):
+    """Count matches up to `limit`; returns (count, exact)."""
+    count = queryset.values("pk")[: limit + 1].count()
+    return min(count, limit), count <= limit
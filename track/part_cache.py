@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from django.utils import timezone
+
+from track.db_writer import PartCreate, StationUpdate, db_writer
+from track.models import TraceabilityData
+
+logger = logging.getLogger(__name__)
+
+
+class PartState:
+    """Per-station results of one part as last seen by the pollers."""
+
+    __slots__ = ("results", "expires_at")
+
+    def __init__(self, results, expires_at):
+        self.results = results  # "st1" -> "OK" / "NOT OK" / None
+        self.expires_at = expires_at
+
+    def result(self, station):
+        return self.results.get(station)
+
+
+class PartStateCache:
+    """Write-through, size-bounded LRU cache of recently scanned parts.
+
+    Writes update memory immediately and are persisted by the DB writer
+    thread. Entries expire `ttl` seconds after they were loaded so edits made
+    outside the pollers (admin, shell) are picked up again. Results of
+    `remote_stations`, polled by another worker process, can be reloaded
+    with `refresh()`.
+    """
+
+    def __init__(self, max_parts=2048, ttl=900):
+        self.max_parts = max_parts
+        self.ttl = ttl
+        self.remote_stations = set()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, part_number, get_shift=None):
+        """Return the PartState for `part_number`, creating its DB record on first sight."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._entries.get(part_number)
+            if state is not None and state.expires_at > now:
+                self._entries.move_to_end(part_number)
+                self._stats["hits"] += 1
+                return state
+            self._stats["misses"] += 1
+
+        state = self._load(part_number, get_shift)
+        state.expires_at = now + self.ttl
+        with self._lock:
+            self._entries[part_number] = state
+            self._entries.move_to_end(part_number)
+            while len(self._entries) > self.max_parts:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return state
+
+    def _load(self, part_number, get_shift):
+        rows = list(
+            TraceabilityData.objects.filter(part_number=part_number)
+            .values_list("station_results__station", "station_results__result")
+        )
+        if not rows:
+            db_writer.submit(PartCreate(
+                part_number=part_number,
+                date=datetime.today().date(),
+                time=datetime.now().time(),
+                shift=get_shift() if get_shift else None,
+            ))
+            logger.info(f"🟢 Queued new record for {part_number}")
+            return PartState({}, 0)
+        return PartState({station: result for station, result in rows if station}, 0)
+
+    def refresh(self, part_number, stations, get_shift=None):
+        """Reload the results of `stations` from the DB into the cached state of `part_number`."""
+        state = self.get(part_number, get_shift)
+        rows = dict(
+            TraceabilityData.objects.filter(part_number=part_number, station_results__station__in=stations)
+            .values_list("station_results__station", "station_results__result")
+        )
+        with self._lock:
+            for station in stations:
+                state.results[station] = rows.get(station)
+        return state
+
+    def record(self, part_number, station, result, get_shift=None):
+        """Update the cached result and queue the write of that station's row.
+
+        `get_shift` is needed as for `get()`: the entry may have expired or
+        been evicted since it was read, and the part is then created again.
+        """
+        state = self.get(part_number, get_shift)
+        with self._lock:
+            state.results[station] = result
+        db_writer.submit(StationUpdate(part_number, station, result, timezone.now()))
+
+    def invalidate(self, part_number=None):
+        with self._lock:
+            if part_number is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(part_number, None)
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "size": len(self._entries)}
+
+
+# Shared by every poller in this process
+part_cache = PartStateCache()
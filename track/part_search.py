@@ -0,0 +1,93 @@
+import re
+from datetime import datetime
+
+from django.db.models import Count
+
+from track.models import PartNumberIndex, PartNumberTrigram, TraceabilityData
+
+# Same structure as plc_utils.QR_PATTERN, split into the parts generate_qr_code joins:
+# FAMILY-S-MODEL-REVISION-DDMMYY + 5-digit serial
+QR_COMPONENTS = re.compile(
+    r"^(?P<prefix>(?P<family>[A-Z]+)-S-(?P<model_number>\d+)-(?P<revision>\d+))-(?P<code_date>\d{6})(?P<serial>\d{5})$"
+)
+# A leading fragment of that structure ("PDU", "PDU-S-105", "PDU-S-10594-1-2403"...)
+QR_LEADING = re.compile(r"^[A-Z]+(-(S(-(\d+(-(\d+(-\d*)?)?)?)?)?)?)?$")
+
+
+def parse_part_number(part_number):
+    """QR components of `part_number` as a dict, or None if it does not follow the QR structure."""
+    match = QR_COMPONENTS.match(part_number)
+    if not match:
+        return None
+    components = match.groupdict()
+    try:
+        components["code_date"] = datetime.strptime(components["code_date"], "%d%m%y").date()
+    except ValueError:
+        components["code_date"] = None
+    return components
+
+
+def trigrams(text):
+    text = text.upper()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def index_parts(parts, replace=False):
+    """Write search index rows for (pk, part_number) pairs.
+
+    With `replace`, existing rows of those parts are dropped first (part
+    number edited); otherwise parts that are already indexed are left as is.
+    """
+    parts = list(parts)
+    if not parts:
+        return
+    if replace:
+        pks = [pk for pk, _ in parts]
+        PartNumberIndex.objects.filter(part_id__in=pks).delete()
+        PartNumberTrigram.objects.filter(part_id__in=pks).delete()
+    components, grams = [], []
+    for pk, part_number in parts:
+        parsed = parse_part_number(part_number)
+        if parsed:
+            components.append(PartNumberIndex(part_id=pk, **parsed))
+        grams.extend(PartNumberTrigram(part_id=pk, trigram=gram) for gram in trigrams(part_number))
+    PartNumberIndex.objects.bulk_create(components, ignore_conflicts=True)
+    PartNumberTrigram.objects.bulk_create(grams, ignore_conflicts=True, batch_size=2000)
+
+
+def index_part_numbers(part_numbers, replace=False):
+    index_parts(
+        TraceabilityData.objects.filter(part_number__in=set(part_numbers)).values_list("pk", "part_number"),
+        replace=replace,
+    )
+
+
+def search_part_numbers(queryset, query):
+    """Filter `queryset` to parts whose number matches `query` without scanning the table.
+
+    - a complete QR code is an exact lookup on the unique part_number index;
+    - a leading fragment of the QR structure (family, model...) is a range
+      scan on the same index;
+    - anything else of 3+ characters (date, serial, model digits) is matched
+      through the trigram table, then confirmed with a substring test on the
+      few candidates.
+    """
+    query = query.strip().upper()
+    if not query:
+        return queryset
+    if QR_COMPONENTS.match(query):
+        return queryset.filter(part_number=query)
+    if QR_LEADING.match(query):
+        return queryset.filter(part_number__gte=query, part_number__lt=query + "\uffff")
+    grams = trigrams(query)
+    if not grams:
+        # Too short for the trigram table
+        return queryset.filter(part_number__contains=query)
+    candidates = (
+        PartNumberTrigram.objects.filter(trigram__in=grams)
+        .values("part")
+        .annotate(matched=Count("trigram"))
+        .filter(matched=len(grams))
+        .values("part")
+    )
+    return queryset.filter(pk__in=candidates, part_number__contains=query)
@@ -0,0 +1,139 @@
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+
+from track.metrics import PLC_BREAKER_OPEN, PLC_BREAKER_OPENS
+from track.models import BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BREAKER_OPTIONS = {
+    "failure_threshold": 3,  # failures in a row that open the breaker
+    "base_delay": 1.0,  # seconds before the first trial, doubled per failed trial
+    "max_delay": 10.0,
+    "jitter": 0.5,  # fraction of the delay taken off at random, so controllers do not retry in step
+    "connect_timeout": 1.0,  # TCP connect timeout of a PLC session, separate from its request timeout
+}
+
+
+def breaker_options():
+    return {**DEFAULT_BREAKER_OPTIONS, **getattr(settings, "PLC_BREAKER", {})}
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of opening a socket to a controller whose breaker is open."""
+
+    def __init__(self, plc_ip, retry_in):
+        super().__init__(f"PLC {plc_ip} circuit open, next attempt in {retry_in:.1f}s")
+        self.plc_ip = plc_ip
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Connection circuit breaker of one controller.
+
+    Closed, every caller may open a socket. `failure_threshold` failures in a
+    row open it: callers then fail fast, without any I/O, until a jittered
+    delay has passed. The breaker is then half-open and lets one caller try;
+    success closes it, failure reopens it with the delay doubled up to
+    `max_delay`. If the trial's result never arrives, another caller gets a
+    trial after the same delay.
+    """
+
+    def __init__(self, plc_ip, failure_threshold=3, base_delay=1.0, max_delay=10.0, jitter=0.5):
+        self.plc_ip = plc_ip
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.state = BREAKER_CLOSED
+        self.failures = 0  # in a row
+        self.delay = base_delay  # before the next trial, before jitter
+        self.retry_at = 0.0  # time.monotonic() of the next trial
+        self.last_error = ""
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        self.state = state
+        PLC_BREAKER_OPEN.set(int(state != BREAKER_CLOSED), plc=self.plc_ip)
+
+    def _schedule(self, now):
+        self.retry_at = now + self.delay * (1 - random.uniform(0, self.jitter))
+
+    def allow(self):
+        """True if the caller may open a socket to the controller now."""
+        with self._lock:
+            if self.state == BREAKER_CLOSED:
+                return True
+            now = time.monotonic()
+            if now < self.retry_at:
+                return False
+            self._set_state(BREAKER_HALF_OPEN)
+            self._schedule(now)  # Callers until then keep failing fast
+            return True
+
+    def check(self):
+        """Raise CircuitOpenError unless the caller may open a socket now."""
+        if not self.allow():
+            raise CircuitOpenError(self.plc_ip, self.retry_in())
+
+    def retry_in(self):
+        """Seconds until the breaker lets a caller try again; 0 while closed."""
+        with self._lock:
+            if self.state == BREAKER_CLOSED:
+                return 0.0
+            return max(self.retry_at - time.monotonic(), 0.0)
+
+    def success(self):
+        with self._lock:
+            recovered = self.state != BREAKER_CLOSED
+            self.failures = 0
+            self.delay = self.base_delay
+            self.last_error = ""
+            if recovered:
+                self._set_state(BREAKER_CLOSED)
+        if recovered:
+            logger.info("🔌 Circuit closed, controller answering again", extra={"plc": self.plc_ip})
+
+    def failure(self, error=""):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)[:200]
+            if self.state == BREAKER_OPEN or (
+                self.state == BREAKER_CLOSED and self.failures < self.failure_threshold
+            ):
+                return
+            if self.state == BREAKER_HALF_OPEN:
+                self.delay = min(self.delay * 2, self.max_delay)
+            self._set_state(BREAKER_OPEN)
+            self._schedule(time.monotonic())
+            wait = self.retry_at - time.monotonic()
+        PLC_BREAKER_OPENS.inc(plc=self.plc_ip)
+        logger.warning(
+            f"⛔ Circuit open after {self.failures} failures ({self.last_error}); next attempt in {wait:.1f}s",
+            extra={"plc": self.plc_ip},
+        )
+
+
+class BreakerBoard:
+    """The circuit breakers of this process, one per controller IP, created on first use."""
+
+    def __init__(self):
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, plc_ip):
+        with self._lock:
+            breaker = self._breakers.get(plc_ip)
+            if breaker is None:
+                options = breaker_options()
+                options.pop("connect_timeout")
+                breaker = self._breakers[plc_ip] = CircuitBreaker(plc_ip, **options)
+            return breaker
+
+
+# Shared by the pollers and the health prober of this process
+plc_breakers = BreakerBoard()
@@ -0,0 +1,324 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils import timezone
+
+from track.db_writer import ScanLog, db_writer
+from track.metrics import PLC_READ_ERRORS, PLC_TRIGGER_READ_SECONDS, observe_scan
+from track.models import SIGNAL_OUTCOMES
+from track.plc_breaker import plc_breakers
+from track.plc_utils import (
+    TRIGGER_CLEARED,
+    plc_pool,
+    read_scan_triggers,
+    read_station,
+    resolve_scan,
+    scan_part_number,
+    send_ack,
+)
+from track.station_registry import current_registry
+
+logger = logging.getLogger(__name__)
+
+
+def poll_triggers(mc, plc_ip, stations):
+    """Read the trigger words of `stations`, dropping the session if the read fails."""
+    with PLC_TRIGGER_READ_SECONDS.time(plc=plc_ip):
+        triggers = read_scan_triggers(mc, stations)
+    if triggers is None:
+        PLC_READ_ERRORS.inc(plc=plc_ip)
+        plc_pool.invalidate(plc_ip)
+    return triggers
+
+
+DEFAULT_POLL_RATE = {"min": 0.05, "max": 0.15, "backoff": 1.5, "active_hold": 30}
+
+
+def station_poll_rate(station):
+    """Poll-rate bounds for `station`: settings.PLC_POLL_RATES[station] over its "default" entry."""
+    rates = getattr(settings, "PLC_POLL_RATES", {})
+    return {**DEFAULT_POLL_RATE, **rates.get("default", {}), **rates.get(station, {})}
+
+
+class StationSchedule:
+    """Adaptive poll interval and scan-trigger edge detection for one station.
+
+    The station is polled at its minimum interval right after a trigger and
+    for `active_hold` seconds afterwards (a part is usually in cycle), then
+    the interval grows by `backoff` per idle poll up to the maximum.
+    """
+
+    def __init__(self, min_interval, max_interval, backoff, active_hold):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.active_hold = active_hold
+        self.interval = min_interval
+        self.last_trigger = 0
+        self.active_until = 0
+
+    @classmethod
+    def for_station(cls, station):
+        rate = station_poll_rate(station)
+        return cls(rate["min"], rate["max"], rate["backoff"], rate["active_hold"])
+
+    def observe(self, word, now):
+        """Record a trigger read; True when it rose to 1 and the handshake should run."""
+        rising = word == 1 and self.last_trigger != 1
+        self.last_trigger = word
+        if word == 1:
+            self.active_until = now + self.active_hold
+        return rising
+
+    def handled(self, now):
+        # The ack clears the trigger, so the next 1 we read is a new scan
+        self.last_trigger = 0
+        self.active_until = now + self.active_hold
+
+    def next_interval(self, now):
+        if now < self.active_until:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        return self.interval
+
+
+class PollingEngine:
+    """Drives every PLC controller from a single asyncio event loop.
+
+    Blocking MC-protocol calls run on a one-thread executor per controller, so
+    requests on a shared socket stay ordered and a hung controller cannot stall
+    the others. Cache lookups for a scan run on one dedicated worker thread;
+    results are persisted by the shared DB writer. `update()` swaps in new
+    controller groups while running, touching only the controllers that changed.
+    """
+
+    def __init__(self, groups, io_timeout=5, station_timeout=10, retry_delay=5):
+        self.groups = {plc_ip: list(stations) for plc_ip, stations in groups.items()}
+        self.io_timeout = io_timeout
+        self.station_timeout = station_timeout
+        self.retry_delay = retry_delay
+        self._io_executors = {}
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plc-db")
+        self._tasks = {}  # plc_ip -> poll_controller task
+        self._running = {}  # plc_ip -> (stations, port) its task was started with
+        self._loop = None
+        self._main_task = None
+        self._thread = None
+
+    def _io_executor(self, plc_ip):
+        if plc_ip not in self._io_executors:
+            self._io_executors[plc_ip] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"plc-io-{plc_ip}")
+        return self._io_executors[plc_ip]
+
+    async def call_io(self, plc_ip, func, *args):
+        """Run `func(mc, *args)` on the controller's pooled session with a timeout.
+
+        On timeout the socket is closed so the stuck worker thread returns.
+        """
+        def run():
+            with plc_pool.session(plc_ip) as mc:
+                return func(mc, *args)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(self._io_executor(plc_ip), run), self.io_timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"⏱️ Request timed out after {self.io_timeout}s", extra={"plc": plc_ip})
+            plc_pool.abort(plc_ip)
+            plc_breakers.get(plc_ip).failure("request timed out")
+            raise
+
+    async def call_db(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._db_executor, func, *args)
+
+    async def backoff(self, plc_ip):
+        """Wait before retrying a failing controller, for as long as its circuit breaker says.
+
+        Waiting costs no I/O: while the breaker is open, reconnects fail fast.
+        Looks again at least every second, as the health prober may close the
+        breaker before this poller's trial is due.
+        """
+        await asyncio.sleep(min(max(plc_breakers.get(plc_ip).retry_in(), 0.1), 1.0))
+
+    async def poll_controller(self, plc_ip, stations):
+        label = ", ".join(stations)
+        schedules = {station: StationSchedule.for_station(station) for station in stations}
+        while True:
+            try:
+                triggers = await self.call_io(plc_ip, poll_triggers, plc_ip, stations)
+            except asyncio.CancelledError:
+                raise
+            except ConnectionError:
+                await self.backoff(plc_ip)  # Connect failed (already logged) or the breaker is open
+                continue
+            except Exception as e:
+                logger.error(f"❌ Error polling {label}: {e}", extra={"plc": plc_ip})
+                await asyncio.sleep(self.retry_delay)
+                continue
+
+            if triggers is None:
+                await self.backoff(plc_ip)
+                continue
+
+            now = time.monotonic()
+            triggered = [station for station in stations if schedules[station].observe(triggers[station], now)]
+
+            for station in triggered:
+                try:
+                    await asyncio.wait_for(self.handle_station(plc_ip, station), self.station_timeout)
+                except asyncio.CancelledError:
+                    raise
+                except asyncio.TimeoutError:
+                    logger.error(
+                        f"⏱️ Handshake timed out after {self.station_timeout}s",
+                        extra={"station": station, "plc": plc_ip},
+                    )
+                except Exception as e:
+                    logger.error(f"❌ Handshake failed: {e}", extra={"station": station, "plc": plc_ip})
+                schedules[station].handled(time.monotonic())
+
+            now = time.monotonic()
+            await asyncio.sleep(min(schedule.next_interval(now) for schedule in schedules.values()))
+
+    async def handle_station(self, plc_ip, station):
+        """Read the station block, resolve the scan on the DB worker, then acknowledge.
+
+        Every handshake, whatever its outcome, is queued to the scan event log
+        with per-stage timings and recorded in the process metrics.
+        """
+        timestamp = timezone.now()
+        started = stage = time.perf_counter()
+        timings = {"read_ms": None, "decode_ms": None, "resolve_ms": None, "ack_ms": None}
+        part_number, result_word, signal, outcome = "", None, None, "error"
+
+        def lap(name):
+            nonlocal stage
+            now = time.perf_counter()
+            timings[name] = (now - stage) * 1000
+            stage = now
+
+        try:
+            scan = await self.call_io(plc_ip, read_station, plc_ip, station)
+            lap("read_ms")
+            if scan is None:
+                PLC_READ_ERRORS.inc(plc=plc_ip)
+                outcome = "no_read"
+                return
+            if scan is TRIGGER_CLEARED:
+                outcome = "cleared"
+                return
+            part_number, result_word = scan_part_number(scan[0]), scan[1]
+            lap("decode_ms")
+            signal = await self.call_db(resolve_scan, station, *scan)
+            lap("resolve_ms")
+            written = await self.call_io(plc_ip, send_ack, plc_ip, current_registry().station(station), signal)
+            lap("ack_ms")
+            outcome = SIGNAL_OUTCOMES[signal] if written else "ack_failed"
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            outcome = "timeout"
+            raise
+        finally:
+            total_ms = (time.perf_counter() - started) * 1000
+            observe_scan(station, outcome, signal, timings, total_ms)
+            db_writer.submit(ScanLog(
+                timestamp=timestamp,
+                station=station,
+                part_number=part_number[:100],
+                result_word=result_word,
+                signal=signal,
+                outcome=outcome,
+                read_ms=timings["read_ms"],
+                resolve_ms=timings["resolve_ms"],
+                ack_ms=timings["ack_ms"],
+                total_ms=total_ms,
+            ))
+
+    def _reconcile(self):
+        """Start, stop or restart controller tasks so they match `self.groups`.
+
+        A controller whose stations or port changed is restarted on a fresh
+        session; register address changes need no restart, as every request
+        reads them from the current registry snapshot.
+        """
+        registry = current_registry()
+        wanted = {plc_ip: (tuple(stations), registry.port(plc_ip)) for plc_ip, stations in self.groups.items()}
+        for plc_ip in list(self._tasks):
+            if wanted.get(plc_ip) != self._running[plc_ip]:
+                self._tasks.pop(plc_ip).cancel()
+                del self._running[plc_ip]
+                plc_pool.abort(plc_ip)
+                if plc_ip not in wanted:
+                    executor = self._io_executors.pop(plc_ip, None)
+                    if executor is not None:
+                        executor.shutdown(wait=False)
+                    logger.info("⏹️ Stopped polling", extra={"plc": plc_ip})
+        for plc_ip, (stations, port) in wanted.items():
+            if plc_ip not in self._tasks:
+                task = asyncio.create_task(self.poll_controller(plc_ip, list(stations)), name=f"plc-{plc_ip}")
+                task.add_done_callback(self._task_done)
+                self._tasks[plc_ip] = task
+                self._running[plc_ip] = (stations, port)
+                logger.info(f"▶️ Polling {', '.join(stations)} on port {port}", extra={"plc": plc_ip})
+
+    def _task_done(self, task):
+        # poll_controller only returns by cancellation; anything else stops the engine, as a crash would
+        if not task.cancelled() and self._main_task is not None:
+            logger.error(f"❌ {task.get_name()} task ended: {task.exception()!r}")
+            self._main_task.cancel()
+
+    def update(self, groups):
+        """Switch to new controller groups ({plc_ip: [stations]}); safe to call from any thread."""
+        self.groups = {plc_ip: list(stations) for plc_ip, stations in groups.items()}
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._reconcile)
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._main_task = asyncio.current_task()
+        self._reconcile()
+        try:
+            await self._loop.create_future()  # Until stop() cancels us
+        finally:
+            tasks = list(self._tasks.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._tasks.clear()
+            self._running.clear()
+
+    def start(self):
+        """Run the engine on a background thread."""
+        self._thread = threading.Thread(target=self._run_forever, name="plc-engine", daemon=True)
+        self._thread.start()
+
+    def _run_forever(self):
+        try:
+            asyncio.run(self.run())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._shutdown_executors()
+            logger.info("🛑 PLC polling engine stopped.")
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self, timeout=None):
+        """Cancel every controller task and close the pooled sessions."""
+        if self._loop and self._main_task:
+            self._loop.call_soon_threadsafe(self._main_task.cancel)
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _shutdown_executors(self):
+        plc_pool.close_all()
+        for executor in self._io_executors.values():
+            executor.shutdown(wait=False)
+        self._db_executor.shutdown(wait=True)
+        db_writer.stop()
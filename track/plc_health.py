@@ -0,0 +1,142 @@
+import datetime
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from track.models import PLC_CONNECTED, PLC_DISCONNECTED, PLC_PORT, PLCStatus
+from track.plc_breaker import plc_breakers
+from track.plc_utils import controller_groups, plc_port
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEALTH_OPTIONS = {"interval": 1.0, "timeout": 1.0, "stale_after": 10.0}
+
+
+def health_options():
+    return {**DEFAULT_HEALTH_OPTIONS, **getattr(settings, "PLC_HEALTH", {})}
+
+
+def probe_plc(plc_ip, port=PLC_PORT, timeout=1.0):
+    """TCP-connect to the controller; returns (connected, rtt_ms, error)."""
+    started = time.perf_counter()
+    try:
+        with socket.create_connection((plc_ip, port), timeout=timeout):
+            return True, (time.perf_counter() - started) * 1000, ""
+    except OSError as e:
+        return False, None, str(e)[:200]
+
+
+class PLCHealthProber:
+    """Probes every controller in parallel and keeps the PLCStatus table current.
+
+    Runs in the process that polls the same controllers (each poller worker
+    probes its own shard), so web processes only read the table and never
+    open sockets to the PLCs themselves. Probes go through the controllers'
+    circuit breakers, which are per process and therefore shared with the
+    pollers of those controllers: a dead controller is only probed when its
+    breaker allows a trial, a successful trial closes the breaker so polling
+    resumes right away, and the breaker state written to the table is the
+    one the pollers obey.
+    """
+
+    def __init__(self, groups, interval=1.0, timeout=1.0):
+        self.groups = {plc_ip: list(stations) for plc_ip, stations in groups.items()}
+        self.interval = interval
+        self.timeout = timeout
+        # Threads start on demand, so room for controllers added to the registry later costs nothing
+        self._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="plc-health")
+        self._stop = threading.Event()
+        self._thread = None
+
+    def update(self, groups):
+        """Probe these controllers ({plc_ip: [stations]}) from the next round on."""
+        self.groups = {plc_ip: list(stations) for plc_ip, stations in groups.items()}
+
+    def probe(self, plc_ip):
+        """Probe through the controller's circuit breaker: while it is open, report its last error without I/O."""
+        breaker = plc_breakers.get(plc_ip)
+        if not breaker.allow():
+            return False, None, breaker.last_error
+        connected, rtt_ms, error = probe_plc(plc_ip, plc_port(plc_ip), self.timeout)
+        if connected:
+            breaker.success()
+        else:
+            breaker.failure(error)
+        return connected, rtt_ms, error
+
+    def probe_all(self):
+        futures = {plc_ip: self._executor.submit(self.probe, plc_ip) for plc_ip in self.groups}
+        return {plc_ip: future.result() for plc_ip, future in futures.items()}
+
+    def record(self, results):
+        """Write one round of probe results and breaker states, stamping last_change on state flips."""
+        now = timezone.now()
+        with transaction.atomic():
+            existing = {row.plc_ip: row for row in PLCStatus.objects.filter(plc_ip__in=results)}
+            created, updated = [], []
+            for plc_ip, (connected, rtt_ms, error) in results.items():
+                state = PLC_CONNECTED if connected else PLC_DISCONNECTED
+                row = existing.get(plc_ip)
+                if row is None:
+                    row = PLCStatus(plc_ip=plc_ip, last_change=now)
+                    created.append(row)
+                else:
+                    updated.append(row)
+                    if row.state != state:
+                        row.last_change = now
+                        if connected:
+                            logger.info("🟢 Reachable again", extra={"plc": plc_ip})
+                        else:
+                            logger.warning(f"🔴 Unreachable: {error}", extra={"plc": plc_ip})
+                row.stations = ",".join(self.groups.get(plc_ip, []))
+                row.state = state
+                row.last_checked = now
+                row.rtt_ms = rtt_ms
+                row.error = error
+                breaker = plc_breakers.get(plc_ip)
+                row.breaker = breaker.state
+                retry_in = breaker.retry_in()
+                row.retry_at = now + datetime.timedelta(seconds=retry_in) if retry_in else None
+            PLCStatus.objects.bulk_create(created)
+            PLCStatus.objects.bulk_update(
+                updated, ["stations", "state", "last_change", "last_checked", "rtt_ms", "error", "breaker", "retry_at"]
+            )
+
+    def run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.record(self.probe_all())
+            except Exception as e:
+                logger.error(f"❌ PLC health probe failed: {e}", exc_info=True)
+                close_old_connections()
+            self._stop.wait(max(self.interval - (time.monotonic() - started), 0))
+        close_old_connections()
+
+    def start(self):
+        """Probe on a background thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="plc-health", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._executor.shutdown(wait=False)
+
+
+def start_health_prober(groups=None):
+    """Start probing `groups` ({plc_ip: [stations]}, every controller in the station registry by default)."""
+    options = health_options()
+    groups = controller_groups() if groups is None else groups
+    prober = PLCHealthProber(groups, interval=options["interval"], timeout=options["timeout"])
+    prober.start()
+    logger.info(f"🩺 PLC health prober started for {len(prober.groups)} controllers.")
+    return prober
@@ -0,0 +1,335 @@
+import asyncio
+import logging
+import random
+import struct
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+from track.station_registry import REGISTER_SIZES, current_registry
+
+logger = logging.getLogger(__name__)
+
+# MC protocol 3E binary frames as sent by pymcprotocol.Type3E for Q/L series:
+# subheader, network, pc, module I/O, module station, data length (bytes after this header)
+FRAME_HEADER = struct.Struct("<2sBBHBH")
+REQUEST_SUBHEADER = b"\x50\x00"
+RESPONSE_SUBHEADER = b"\xd0\x00"
+DEVICE_D = 0xA8  # Data register device code
+
+BATCH_READ = 0x0401
+BATCH_WRITE = 0x1401
+RANDOM_READ = 0x0403
+RANDOM_WRITE = 0x1402
+
+END_OK = 0x0000
+END_POINTS_OUT_OF_RANGE = 0xC051
+END_UNSUPPORTED = 0xC059
+
+MAX_WORDS = 960
+
+DEFAULT_PROFILE = {
+    "rate": 1.0,  # parts per second entering the first station
+    "ok_ratio": 0.95,  # share of scans the station reports OK
+    "invalid_ratio": 0.01,  # share of scans with an unreadable QR, rescanned afterwards
+    "drop_interval": None,  # mean seconds between link drops per controller, None for a stable link
+    "drop_duration": 5.0,  # seconds a dropped controller refuses connections
+    "ack_timeout": 10.0,  # seconds a station waits for the poller before giving up on a scan
+    "transfer_time": 1.0,  # seconds a passed part takes to reach the next station
+}
+
+
+def encode_qr(text):
+    """QR text as the 30 little-endian words the stations write, NUL padded."""
+    size = REGISTER_SIZES["qr"]
+    return list(struct.unpack(f"<{size}H", text.encode("ascii")[: size * 2].ljust(size * 2, b"\x00")))
+
+
+class SimulatedPLC:
+    """One controller: a D register memory served over MC protocol 3E (binary).
+
+    Understands the word batch/random reads and writes the pollers use; any
+    other command is answered with an error end code. `drop()` closes every
+    connection and refuses new ones for a while, like a pulled cable.
+    """
+
+    def __init__(self, host, port, stations):
+        self.host = host
+        self.port = port
+        self.station_names = list(stations)
+        self.stations = {}  # station name -> SimulatedStation, registered by the stations
+        self.words = {}
+        self.requests = Counter()  # command code -> count
+        self.drops = 0
+        self._server = None
+        self._writers = set()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for writer in list(self._writers):
+            writer.close()
+
+    async def drop(self, duration):
+        logger.info(f"🔌 Simulated PLC {self.host}:{self.port} link down for {duration:.1f}s")
+        self.drops += 1
+        await self.close()
+        await asyncio.sleep(duration)
+        await self.start()
+        logger.info(f"🔌 Simulated PLC {self.host}:{self.port} link restored")
+
+    def read(self, address, count):
+        return [self.words.get(address + i, 0) for i in range(count)]
+
+    def write(self, address, values):
+        for i, value in enumerate(values):
+            self.words[address + i] = value
+
+    async def _serve(self, reader, writer):
+        self._writers.add(writer)
+        try:
+            while True:
+                header = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+                body = await reader.readexactly(header[5])
+                end_code, data = self.handle(body)
+                writer.write(
+                    FRAME_HEADER.pack(RESPONSE_SUBHEADER, *header[1:5], 2 + len(data))
+                    + struct.pack("<H", end_code)
+                    + data
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass  # Client went away, link dropped or simulator stopping
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def handle(self, body):
+        """Execute one request body (timer, command, subcommand, data); returns (end code, response data)."""
+        _, command, subcommand = struct.unpack_from("<HHH", body)
+        data = body[6:]
+        self.requests[command] += 1
+        if subcommand != 0:
+            return END_UNSUPPORTED, b""
+        try:
+            if command == BATCH_READ:
+                address, size = self._device(data, 0), struct.unpack_from("<H", data, 4)[0]
+                if not 0 < size <= MAX_WORDS:
+                    return END_POINTS_OUT_OF_RANGE, b""
+                return END_OK, struct.pack(f"<{size}h", *self.read(address, size))
+            if command == BATCH_WRITE:
+                address, size = self._device(data, 0), struct.unpack_from("<H", data, 4)[0]
+                self.write(address, struct.unpack_from(f"<{size}h", data, 6))
+                self._written()
+                return END_OK, b""
+            if command == RANDOM_READ:
+                words, dwords = data[0], data[1]
+                if dwords:
+                    return END_UNSUPPORTED, b""
+                addresses = [self._device(data, 2 + 4 * i) for i in range(words)]
+                return END_OK, struct.pack(f"<{words}h", *(self.words.get(a, 0) for a in addresses))
+            if command == RANDOM_WRITE:
+                words, dwords = data[0], data[1]
+                if dwords:
+                    return END_UNSUPPORTED, b""
+                for i in range(words):
+                    offset = 2 + 6 * i
+                    self.write(self._device(data, offset), struct.unpack_from("<h", data, offset + 4))
+                self._written()
+                return END_OK, b""
+        except (ValueError, struct.error):
+            return END_UNSUPPORTED, b""
+        return END_UNSUPPORTED, b""
+
+    def _device(self, data, offset):
+        if data[offset + 3] != DEVICE_D:
+            raise ValueError("only D registers are simulated")
+        return int.from_bytes(data[offset:offset + 3], "little")
+
+    def _written(self):
+        for station in self.stations.values():
+            station.check_ack()
+
+
+class SimulatedStation:
+    """The PLC side of one station's handshake.
+
+    Takes parts from its queue (new parts for the first station, parts that
+    passed the previous station otherwise), writes QR and result, raises the
+    scan trigger and waits for the poller to write the signal and clear it.
+    Parts reported OK reach the next station `transfer_time` seconds later.
+    """
+
+    def __init__(self, plc, station, profile, rng, next_station=None):
+        self.plc = plc
+        self.station = station
+        self.registers = current_registry().station(station)
+        self.profile = profile
+        self.rng = rng
+        self.next_station = next_station
+        self.parts = None  # asyncio.Queue of part numbers, created on the simulator loop
+        self.latencies = []  # seconds from raising the trigger to the ack
+        self.signals = Counter()
+        self.timeouts = 0
+        self._pending = None
+        plc.stations[station] = self
+
+    def check_ack(self):
+        """Called after every write request: an ack is the trigger word cleared by the poller."""
+        if self._pending is None or self._pending.done():
+            return
+        if self.plc.read(self.registers.scan_trigger, 1)[0] == 0:
+            self._pending.set_result(self.plc.read(self.registers.write_signal, 1)[0])
+
+    async def scan(self, qr, result_word):
+        """Present one scan to the poller.
+
+        Returns the signal it wrote (0 if it cleared the trigger without
+        one), or None if it did not answer within `ack_timeout`.
+        """
+        loop = asyncio.get_running_loop()
+        self._pending = loop.create_future()
+        self.plc.write(self.registers.qr, encode_qr(qr))
+        self.plc.write(self.registers.result, [result_word])
+        self.plc.write(self.registers.write_signal, [0])
+        self.plc.write(self.registers.scan_trigger, [1])
+        raised_at = time.perf_counter()
+        try:
+            signal = await asyncio.wait_for(self._pending, self.profile["ack_timeout"])
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.plc.write(self.registers.scan_trigger, [0])
+            return None
+        finally:
+            self._pending = None
+        self.latencies.append(time.perf_counter() - raised_at)
+        self.signals[signal] += 1
+        return signal
+
+    async def run(self):
+        while True:
+            part_number = await self.parts.get()
+            while True:
+                if self.rng.random() < self.profile["invalid_ratio"]:
+                    await self.scan(f"#{part_number[::-1]}", 1)
+                    continue  # Unreadable label: the operator rescans the same part
+                ok = self.rng.random() < self.profile["ok_ratio"]
+                signal = await self.scan(part_number, 1 if ok else 2)
+                if signal == 0:
+                    await asyncio.sleep(0.1)  # Poller gave up on the read; the PLC retries
+                    continue
+                break
+            if signal == 4 and self.next_station is not None:
+                loop = asyncio.get_running_loop()
+                loop.call_later(self.profile["transfer_time"], self.next_station.parts.put_nowait, part_number)
+
+
+class LineSimulator:
+    """Simulated controllers and stations of the line, run on their own event loop thread.
+
+    `addresses` maps each controller's stations to the (host, port) it
+    listens on, e.g. {("st3", "st4"): ("127.0.0.3", 15007)}. Parts enter the
+    first station (in `stations` order) at `rate` per second, Poisson
+    distributed, and flow down the line as they pass.
+    """
+
+    def __init__(self, addresses, stations, profile=None, seed=None):
+        self.profile = {**DEFAULT_PROFILE, **(profile or {})}
+        self.rng = random.Random(seed)
+        self.plcs = [SimulatedPLC(host, port, group) for group, (host, port) in addresses.items()]
+        plc_of = {station: plc for plc in self.plcs for station in plc.station_names}
+        self.stations = []
+        next_station = None
+        for station in reversed(stations):
+            next_station = SimulatedStation(plc_of[station], station, self.profile, self.rng, next_station)
+            self.stations.insert(0, next_station)
+        self.parts_entered = 0
+        self._serial = 0
+        self._loop = None
+        self._main_task = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+
+    def next_part_number(self):
+        self._serial += 1
+        return f"SIM-S-10594-1-{date.today():%d%m%y}{self._serial % 100000:05d}"
+
+    async def feed(self):
+        while True:
+            await asyncio.sleep(self.rng.expovariate(self.profile["rate"]))
+            self.stations[0].parts.put_nowait(self.next_part_number())
+            self.parts_entered += 1
+
+    async def drops(self, plc):
+        while True:
+            await asyncio.sleep(self.rng.expovariate(1 / self.profile["drop_interval"]))
+            await plc.drop(self.profile["drop_duration"])
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._main_task = asyncio.current_task()
+        try:
+            for plc in self.plcs:
+                await plc.start()
+        except OSError as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        for station in self.stations:
+            station.parts = asyncio.Queue()
+        tasks = [asyncio.create_task(self.feed())]
+        tasks += [asyncio.create_task(station.run()) for station in self.stations]
+        if self.profile["drop_interval"]:
+            tasks += [asyncio.create_task(self.drops(plc)) for plc in self.plcs]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for plc in self.plcs:
+                await plc.close()
+
+    def start(self):
+        """Start listening and feeding parts on a background thread; raises OSError if a port cannot be bound."""
+        self._thread = threading.Thread(target=self._run_forever, name="plc-simulator", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error:
+            raise self._error
+
+    def _run_forever(self):
+        try:
+            asyncio.run(self.run())
+        except asyncio.CancelledError:
+            pass
+
+    def stop(self, timeout=None):
+        if self._loop and self._main_task:
+            self._loop.call_soon_threadsafe(self._main_task.cancel)
+        if self._thread:
+            self._thread.join(timeout)
+
+    def stats(self):
+        """Per-station trigger-to-ack latencies (seconds), signal counts and timeouts, plus link drops."""
+        return {
+            "parts_entered": self.parts_entered,
+            "stations": {
+                station.station: {
+                    "latencies": list(station.latencies),
+                    "signals": dict(station.signals),
+                    "timeouts": station.timeouts,
+                    "waiting": station.parts.qsize() if station.parts else 0,
+                }
+                for station in self.stations
+            },
+            "drops": sum(plc.drops for plc in self.plcs),
+        }
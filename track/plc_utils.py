@@ -1,55 +1,252 @@
 import pymcprotocol
 import time
 import logging
-from track.models import TraceabilityData
-from datetime import datetime
+from track.metrics import PLC_CONNECT_FAILURES, PLC_CONNECT_SECONDS, PLC_RECONNECTS
+from track.part_cache import part_cache
+from track.plc_breaker import CircuitOpenError, breaker_options, plc_breakers
+from track.shifts import shift_calendar
+from track.station_registry import REGISTER_SIZES, current_registry
 import struct
 import re
 import threading
-import socket
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Define PLCs for each station
-PLC_MAPPING = {
-    "st1": {"ip": "192.168.1.100"},
-    "st2": {"ip": "192.168.1.130"},
-    "st3": {"ip": "192.168.1.20"},
-    "st4": {"ip": "192.168.1.20"},
-    "st5": {"ip": "192.168.1.40"},
-    "st6": {"ip": "192.168.1.40"},
-    "st7": {"ip": "192.168.1.60"},
-    "st8": {"ip": "192.168.1.60"},
-}
-
-# Define Registers for each station
-REGISTERS = {
-    "st1": {"qr": 5100, "result": 5154, "scan_trigger": 5156, "write_signal": 5158},
-    "st2": {"qr": 5200, "result": 5254, "scan_trigger": 5256, "write_signal": 5258},
-    "st3": {"qr": 5300, "result": 5354, "scan_trigger": 5356, "write_signal": 5358},
-    "st4": {"qr": 5400, "result": 5454, "scan_trigger": 5456, "write_signal": 5458},
-    "st5": {"qr": 5500, "result": 5554, "scan_trigger": 5556, "write_signal": 5558},
-    "st6": {"qr": 5600, "result": 5654, "scan_trigger": 5656, "write_signal": 5658},
-    "st7": {"qr": 5700, "result": 5764, "scan_trigger": 5760, "write_signal": 5762},
-    "st8": {"qr": 5800, "result": 5854, "scan_trigger": 5856, "write_signal": 5858},
-}
+# Stations, their controllers and handshake registers come from the Station
+# and Controller tables (track.station_registry), edited in the admin
+
+# Largest batch read a 3E frame allows, and the widest hole between two
+# registers that is still cheaper to read through than to split into a second request
+MAX_BATCH_WORDS = 960
+MAX_READ_GAP = 128
 
 QR_PATTERN = re.compile(r"^[A-Z]+-S-\d+-\d+-\d{11}$")
 
+# read_station() result when the PLC withdrew the scan between the trigger poll and the block read
+TRIGGER_CLEARED = "cleared"
+
+
+def plc_port(plc_ip):
+    """MC protocol port of the controller at `plc_ip`."""
+    return current_registry().port(plc_ip)
+
+
+def connect_to_plc(plc_ip, timeout=3, connect_timeout=None, attempts=None):
+    """Open a Type3E session through the controller's circuit breaker.
 
-def connect_to_plc(plc_ip, timeout=3, retry_delay=5):
+    Retries forever unless `attempts` is given, in which case the last
+    ConnectionError is raised once they are used up; while the breaker is
+    open that is a CircuitOpenError, raised without touching the network.
+    Attempts are paced by the breaker's backoff. `connect_timeout`
+    (PLC_BREAKER["connect_timeout"] by default) bounds the TCP connect and
+    `timeout` every request on the session; both apply to this socket only.
+    """
+    breaker = plc_breakers.get(plc_ip)
+    if connect_timeout is None:
+        connect_timeout = breaker_options()["connect_timeout"]
+    attempt = 0
     while True:
-        mc = pymcprotocol.Type3E()
+        attempt += 1
         try:
-            socket.setdefaulttimeout(timeout)
-            mc.connect(plc_ip, 5007)
-            logger.info(f"✅ Connected to PLC {plc_ip}")
+            breaker.check()
+            mc = pymcprotocol.Type3E()
+            mc.soc_timeout = connect_timeout
+            try:
+                mc.connect(plc_ip, plc_port(plc_ip))
+            except OSError as e:
+                breaker.failure(e)
+                logger.error(f"❌ Connection failed: {e}", extra={"plc": plc_ip})
+                raise ConnectionError(f"PLC {plc_ip} unreachable: {e}") from e
+            mc.soc_timeout = timeout
+            mc._sock.settimeout(timeout)
+            logger.info("✅ Connected", extra={"plc": plc_ip})
             return mc
+        except ConnectionError:
+            if attempts is not None and attempt >= attempts:
+                raise
+            time.sleep(breaker.retry_in())
+
+
+class PLCConnectionPool:
+    """Keeps one open MC-protocol session per PLC IP and reconnects only on failure."""
+
+    def __init__(self, timeout=3, health_check_interval=30, probe_device="D0"):
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.probe_device = probe_device
+        self._sessions = {}  # ip -> pymcprotocol.Type3E
+        self._last_used = {}  # ip -> time.monotonic() of last successful use
+        self._ip_locks = {}  # ip -> lock serializing requests on the shared socket
+        self._lock = threading.Lock()
+        self._stats = {"connects": 0, "reconnects": 0, "reuses": 0, "invalidations": 0, "health_checks": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _ip_lock(self, plc_ip):
+        with self._lock:
+            return self._ip_locks.setdefault(plc_ip, threading.Lock())
+
+    def _is_healthy(self, plc_ip, mc):
+        if not getattr(mc, "_is_connected", False):
+            return False
+        if time.monotonic() - self._last_used.get(plc_ip, 0) < self.health_check_interval:
+            return True
+        # Idle session: make sure the PLC still answers before handing it out
+        self._count("health_checks")
+        try:
+            mc.batchread_wordunits(headdevice=self.probe_device, readsize=1)
+            return True
         except Exception as e:
-            logger.error(f"❌ Connection failed to PLC {plc_ip}: {e}. Retrying in {retry_delay} seconds...")
-            time.sleep(retry_delay)
+            logger.warning(f"⚠️ Health check failed: {e}", extra={"plc": plc_ip})
+            return False
+
+    def _acquire(self, plc_ip):
+        mc = self._sessions.get(plc_ip)
+        if mc is not None:
+            if self._is_healthy(plc_ip, mc):
+                self._count("reuses")
+                return mc
+            self._discard(plc_ip)
+            self._count("reconnects")
+            PLC_RECONNECTS.inc(plc=plc_ip)
+
+        started = time.perf_counter()
+        try:
+            mc = connect_to_plc(plc_ip, timeout=self.timeout, attempts=1)
+        except CircuitOpenError:
+            raise  # Failed fast, nothing was attempted
+        except ConnectionError:
+            PLC_CONNECT_FAILURES.inc(plc=plc_ip)
+            raise
+        PLC_CONNECT_SECONDS.observe(time.perf_counter() - started, plc=plc_ip)
+        self._count("connects")
+        self._sessions[plc_ip] = mc
+        self._last_used[plc_ip] = time.monotonic()
+        return mc
+
+    def _discard(self, plc_ip):
+        mc = self._sessions.pop(plc_ip, None)
+        self._last_used.pop(plc_ip, None)
+        if mc is not None:
+            try:
+                mc.close()
+            except Exception:
+                pass
+
+    @contextmanager
+    def session(self, plc_ip):
+        """Yield the pooled session for `plc_ip`, holding it exclusively for the block.
+
+        A socket error raised inside the block drops the session so the next
+        caller reconnects. The controller's circuit breaker counts it as a
+        failure, and a block that completes on a live session as a success.
+        Raises CircuitOpenError, without any I/O, while the breaker is open.
+        """
+        with self._ip_lock(plc_ip):
+            mc = self._acquire(plc_ip)
+            try:
+                yield mc
+            except OSError as e:
+                if plc_ip in self._sessions:  # Not aborted after a timeout, which the caller counts itself
+                    plc_breakers.get(plc_ip).failure(e)
+                self._invalidate_locked(plc_ip)
+                raise
+            else:
+                if plc_ip in self._sessions:
+                    self._last_used[plc_ip] = time.monotonic()
+                    plc_breakers.get(plc_ip).success()
+
+    def _invalidate_locked(self, plc_ip):
+        if plc_ip in self._sessions:
+            self._count("invalidations")
+            self._discard(plc_ip)
+
+    def invalidate(self, plc_ip, error="request failed"):
+        """Drop the session for `plc_ip`; call from inside `session()` after a failed request."""
+        self._invalidate_locked(plc_ip)
+        plc_breakers.get(plc_ip).failure(error)
+
+    def abort(self, plc_ip):
+        """Close the session for `plc_ip` without waiting for its holder.
+
+        Used when a request has timed out: closing the socket unblocks the
+        thread stuck in it and forces a reconnect.
+        """
+        self._invalidate_locked(plc_ip)
+
+    def close_all(self):
+        with self._lock:
+            ips = list(self._sessions)
+        for plc_ip in ips:
+            with self._ip_lock(plc_ip):
+                self._discard(plc_ip)
+
+    def stats(self):
+        """Return pool counters plus the set of currently open sessions."""
+        now = time.monotonic()
+        with self._lock:
+            counters = dict(self._stats)
+        return {
+            **counters,
+            "open_sessions": len(self._sessions),
+            "sessions": {
+                ip: {"idle_seconds": round(now - self._last_used.get(ip, now), 1)}
+                for ip in list(self._sessions)
+            },
+        }
+
+
+# Shared by all station pollers in this process
+plc_pool = PLCConnectionPool()
+
+
+RegisterBlock = namedtuple("RegisterBlock", ["start", "size", "fields"])
+
+
+def plan_reads(fields, max_gap=MAX_READ_GAP, max_words=MAX_BATCH_WORDS):
+    """Merge register fields into the fewest contiguous batch reads.
+
+    `fields` maps a name to an `(address, size)` pair. Returns a list of
+    RegisterBlock whose `fields` map each name to its `(offset, size)` in the block.
+    """
+    blocks = []
+    start = end = None
+    members = {}
+    for name, (address, size) in sorted(fields.items(), key=lambda item: item[1][0]):
+        if start is not None and address - end <= max_gap and max(end, address + size) - start <= max_words:
+            end = max(end, address + size)
+        else:
+            if start is not None:
+                blocks.append(RegisterBlock(start, end - start, members))
+            start, end, members = address, address + size, {}
+        members[name] = (address - start, size)
+    if start is not None:
+        blocks.append(RegisterBlock(start, end - start, members))
+    return blocks
+
+
+@lru_cache(maxsize=256)
+def station_read_plan(config):
+    """Plan the read of a triggered station's QR, result and trigger words (cached per StationConfig)."""
+    fields = ("qr", "result", "scan_trigger")
+    return plan_reads({name: (getattr(config, name), REGISTER_SIZES[name]) for name in fields})
+
+
+def read_blocks(mc, blocks):
+    """Execute a read plan and slice each field out of its block; None if any read fails."""
+    values = {}
+    for block in blocks:
+        words = read_register(mc, block.start, block.size)
+        if not words or len(words) < block.size:
+            return None
+        for name, (offset, size) in block.fields.items():
+            values[name] = words[offset:offset + size]
+    return values
 
 
 def read_register(mc, address, num_registers=1):
@@ -63,9 +260,35 @@ def read_register(mc, address, num_registers=1):
 def write_register(mc, address, value):
     try:
         mc.batchwrite_wordunits(headdevice=f"D{address}", values=[value])
-        logger.info(f"✅ Wrote {value} to register {address}")
+        logger.debug(f"✅ Wrote {value} to register {address}")
+        return True
     except Exception as e:
         logger.error(f"❌ Error writing to register {address}: {e}")
+        return False
+
+
+def write_registers(mc, values):
+    """Write several single-word registers in one request.
+
+    `values` maps address to value and is written in insertion order. A
+    contiguous run goes out as one batch write, anything else as one random write.
+    """
+    addresses = list(values)
+    try:
+        if sorted(addresses) == list(range(min(addresses), min(addresses) + len(addresses))):
+            mc.batchwrite_wordunits(headdevice=f"D{min(addresses)}", values=[values[a] for a in sorted(addresses)])
+        else:
+            mc.randomwrite(
+                word_devices=[f"D{a}" for a in addresses],
+                word_values=[values[a] for a in addresses],
+                dword_devices=[],
+                dword_values=[],
+            )
+        logger.debug(f"✅ Wrote {values} to registers")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Error writing to registers {addresses}: {e}")
+        return False
 
 
 def convert_registers_to_string(registers):
@@ -78,106 +301,113 @@ def convert_registers_to_string(registers):
 
 
 def get_current_shift():
-    now = datetime.now().time()
-    if datetime.strptime("07:00", "%H:%M").time() <= now < datetime.strptime("15:30", "%H:%M").time():
-        return 'Shift 1'
-    elif datetime.strptime("15:30", "%H:%M").time() <= now < datetime.strptime("23:59", "%H:%M").time():
-        return 'Shift 2'
-    else:
-        return 'Shift 3'
+    return shift_calendar.current()[1]
 
 
-def process_station(station):
-    plc = PLC_MAPPING[station]
-    reg = REGISTERS[station]
+def controller_groups(stations=None):
+    """Group stations by PLC IP so each controller is served by one session."""
+    return current_registry().groups(stations)
 
-    while True:
-        mc = None
-        try:
-            mc = connect_to_plc(plc["ip"])
-            if not mc:
-                continue
 
-            scan_trigger = read_register(mc, reg["scan_trigger"], 1)
-            if not scan_trigger or scan_trigger[0] != 1:
-                logger.info(f"⏸️ {station}: No scan trigger")
-                mc.close()
-                time.sleep(1)
-                continue
-
-            qr_registers = read_register(mc, reg["qr"], 30)
-            result = read_register(mc, reg["result"], 1)
-            if not qr_registers or not result:
-                logger.warning(f"⚠️ {station}: Failed to read QR/result")
-                write_register(mc, reg["scan_trigger"], 0)
-                mc.close()
-                continue
+def read_scan_triggers(mc, stations):
+    """Read the scan_trigger word of every station on one PLC in a single request.
 
-            qr_string = convert_registers_to_string(qr_registers).strip()
-            part_number = qr_string
-            result_value = "OK" if result[0] == 1 else "NOT OK"
+    Neighbouring trigger words are fetched with one batch read; otherwise a
+    random read picks them up individually in the same round trip.
+    """
+    registry = current_registry()
+    blocks = plan_reads({station: (registry.station(station).scan_trigger, 1) for station in stations})
+    if len(blocks) == 1:
+        values = read_blocks(mc, blocks)
+        return {station: words[0] for station, words in values.items()} if values else None
+    try:
+        words, _ = mc.randomread(
+            word_devices=[f"D{registry.station(station).scan_trigger}" for station in stations],
+            dword_devices=[],
+        )
+        return dict(zip(stations, words))
+    except Exception as e:
+        logger.error(f"❌ Error reading scan triggers for {', '.join(stations)}: {e}")
+        return None
 
-            if not QR_PATTERN.match(part_number):
-                logger.warning(f"🚫 {station}: Invalid QR format - '{part_number}'")
-                write_register(mc, reg["write_signal"], 3)
-                write_register(mc, reg["scan_trigger"], 0)
-                mc.close()
-                continue
-
-            obj = TraceabilityData.objects.filter(part_number=part_number).first()
-            if not obj:
-                obj = TraceabilityData.objects.create(
-                    part_number=part_number,
-                    date=datetime.today().date(),
-                    time=datetime.now().time(),
-                    shift=get_current_shift()
-                )
-                logger.info(f"🟢 {station}: Created record for {part_number}")
-            else:
-                logger.info(f"🟡 {station}: Updating record for {part_number}")
 
-            station_num = int(station[2:])
-            prev_station = f"st{station_num - 1}" if station_num > 1 else None
-            prev_result = getattr(obj, f"{prev_station}_result", None) if prev_station else None
+def read_station(mc, plc_ip, station):
+    """Read a triggered station's block; returns (qr_registers, result_word), TRIGGER_CLEARED or None.
 
-            if prev_station and prev_result in [None, "NOT OK"]:
-                logger.warning(f"🚨 {station}: Previous station '{prev_station}' result: {prev_result}")
-                write_register(mc, reg["write_signal"], 5)
-                write_register(mc, reg["scan_trigger"], 0)
-                mc.close()
-                continue
+    None means the read failed, in which case the trigger is cleared so the
+    PLC can retry the scan. TRIGGER_CLEARED means the read worked but the
+    PLC had already dropped the trigger, which is a normal race.
+    """
+    config = current_registry().station(station)
+    values = read_blocks(mc, station_read_plan(config))
+    if not values:
+        logger.warning("⚠️ Failed to read QR/result", extra={"station": station, "plc": plc_ip})
+        if not write_register(mc, config.scan_trigger, 0):
+            plc_pool.invalidate(plc_ip)
+        return None
+    if values["scan_trigger"][0] != 1:
+        logger.info("⏸️ Scan trigger cleared before read", extra={"station": station})
+        return TRIGGER_CLEARED
+    return values["qr"], values["result"][0]
 
-            existing_ok = getattr(obj, f"{station}_result", None) == "OK"
-            if existing_ok:
-                write_register(mc, reg["write_signal"], 2)
-                logger.info(f"✅ {station}: Part already OK. Sending 2.")
-                write_register(mc, reg["scan_trigger"], 0)
-                mc.close()
-                continue
 
-            setattr(obj, f"{station}_result", result_value)
-            setattr(obj, f"{station}_time", datetime.now().time())  # ✅ Save the current time for the station
-            obj.save()
-            logger.info(f"✅ {station}: Updated DB with result '{result_value}'")
+def scan_part_number(qr_registers):
+    return convert_registers_to_string(qr_registers).strip()
 
-            signal = 4 if result_value == "OK" else 1
-            write_register(mc, reg["write_signal"], signal)
-            write_register(mc, reg["scan_trigger"], 0)
 
-        except Exception as e:
-            logger.error(f"❌ Error in {station}: {e}")
-        finally:
-            if mc:
-                mc.close()
-            time.sleep(2)
+def resolve_scan(station, qr_registers, result_word):
+    """Apply a scan to the database and return the handshake signal for the PLC.
+
+    Signals: 1 NOT OK saved, 2 already OK, 3 invalid QR, 4 OK saved,
+    5 previous station not OK.
+    """
+    part_number = scan_part_number(qr_registers)
+    result_value = "OK" if result_word == 1 else "NOT OK"
+
+    if not QR_PATTERN.match(part_number):
+        logger.warning(f"🚫 Invalid QR format - '{part_number}'", extra={"station": station})
+        return 3
+
+    state = part_cache.get(part_number, get_shift=get_current_shift)
 
+    station_num = int(station[2:])
+    prev_station = f"st{station_num - 1}" if station_num > 1 else None
+    prev_result = state.result(prev_station) if prev_station else None
+    if prev_result in [None, "NOT OK"] and prev_station in part_cache.remote_stations:
+        # Another worker process polls the previous station; our copy may predate its result
+        prev_result = part_cache.refresh(part_number, [prev_station], get_current_shift).result(prev_station)
 
-# Function to start PLC monitoring in a separate thread
+    if prev_station and prev_result in [None, "NOT OK"]:
+        logger.warning(f"🚨 Previous station '{prev_station}' result: {prev_result}", extra={"station": station})
+        return 5
+
+    existing_ok = state.result(station) == "OK"
+    if existing_ok:
+        logger.info("✅ Part already OK. Sending 2.", extra={"station": station})
+        return 2
+
+    part_cache.record(part_number, station, result_value, get_current_shift)
+    logger.info(f"✅ Queued result '{result_value}'", extra={"station": station})
+
+    return 4 if result_value == "OK" else 1
+
+
+def send_ack(mc, plc_ip, config, signal):
+    """Write the handshake signal and clear the scan trigger in one request; drop the session on failure."""
+    written = write_registers(mc, {config.write_signal: signal, config.scan_trigger: 0})
+    if not written:
+        plc_pool.invalidate(plc_ip)
+    return written
+
+
+# Function to start PLC monitoring on the asyncio polling engine
 def start_plc_monitoring():
-    for station in PLC_MAPPING.keys():
-        t = threading.Thread(target=process_station, args=(station,), daemon=True)
-        t.start()
-    logger.info("🚀 PLC Monitoring started in background threads.")
+    from track.plc_engine import PollingEngine
+
+    engine = PollingEngine(controller_groups())
+    engine.start()
+    logger.info("🚀 PLC Monitoring started on the polling engine.")
+    return engine
 
 # Start Django server first
 if __name__ == "__main__":
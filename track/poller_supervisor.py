@@ -0,0 +1,247 @@
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.conf import settings
+
+from track.metrics import POLLER_WORKER_RESTARTS, POLLER_WORKER_STATIONS, POLLER_WORKER_UP
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUPERVISOR_OPTIONS = {
+    "workers": 2,  # poller processes; 0 runs the engine inside start_modbus itself
+    "restart_delay": 1.0,  # first restart delay after a crash, doubled per crash in a row
+    "max_restart_delay": 60.0,
+    "stable_after": 60.0,  # seconds a worker must stay up before its delay resets
+    "shutdown_timeout": 15.0,  # seconds workers get to drain before they are terminated
+}
+
+
+def supervisor_options():
+    return {**DEFAULT_SUPERVISOR_OPTIONS, **getattr(settings, "POLLER_SUPERVISOR", {})}
+
+
+def shard_controllers(groups, workers, current=None):
+    """Split controller groups ({plc_ip: [stations]}) into `workers` shards, fewer if there are fewer controllers.
+
+    A controller is never split, so each PLC keeps a single session. The
+    largest controllers are placed first, each on the shard with the fewest
+    stations so far. Given the `current` shards, controllers still in
+    `groups` stay where they are and only new ones are placed.
+    """
+    if current is None:
+        shards = [{} for _ in range(max(min(workers, len(groups)), 1))]
+    else:
+        shards = [{plc_ip: list(groups[plc_ip]) for plc_ip in shard if plc_ip in groups} for shard in current]
+    placed = {plc_ip for shard in shards for plc_ip in shard}
+    for plc_ip, stations in sorted(groups.items(), key=lambda item: (-len(item[1]), item[0])):
+        if plc_ip not in placed:
+            shard = min(shards, key=lambda s: sum(len(group) for group in s.values()))
+            shard[plc_ip] = list(stations)
+    return shards
+
+
+def remote_stations(groups):
+    """Stations of the registry polled outside `groups`, i.e. by other workers."""
+    from track.station_registry import current_registry
+
+    return set(current_registry().stations) - {station for stations in groups.values() for station in stations}
+
+
+def run_worker(name, groups, conn):
+    """Entry point of one poller process: poll and health-probe `groups` until the supervisor sends "stop" on `conn`.
+
+    The supervisor also sends new groups when the station registry changes;
+    the worker reloads the registry and moves its engine over. Ctrl+C and
+    SIGTERM (which service managers send to every process of the service)
+    are left to the supervisor, so the workers drain in order. Exits with
+    status 1 if the polling engine dies on its own.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    import django
+
+    django.setup()
+
+    from track.db_writer import db_writer
+    from track.metrics import start_metrics_publisher
+    from track.part_cache import part_cache
+    from track.plc_engine import PollingEngine
+    from track.plc_health import start_health_prober
+    from track.station_registry import reload_registry
+
+    record_factory = logging.getLogRecordFactory()
+
+    def tagged_record(*args, **kwargs):
+        record = record_factory(*args, **kwargs)
+        record.worker = name
+        return record
+
+    logging.setLogRecordFactory(tagged_record)
+
+    db_writer.open_journal(name)  # Replays what this worker had not written when it last stopped
+    # Previous-station results of these stations are written by other workers
+    part_cache.remote_stations = remote_stations(groups)
+    engine = PollingEngine(groups)
+    engine.start()
+    # Probed here rather than in the supervisor, so prober and pollers share each controller's circuit breaker
+    prober = start_health_prober(groups)
+    publisher = start_metrics_publisher(name)
+    logger.info(f"🚀 Polling {', '.join(sorted(groups)) or 'no controllers yet'}.")
+    try:
+        while True:
+            if conn.poll(1):
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    break  # Supervisor gone
+                if message == "stop":
+                    break
+                reload_registry()
+                part_cache.remote_stations = remote_stations(message)
+                engine.update(message)
+                prober.update(message)
+            elif not engine.is_alive():
+                logger.error("❌ Polling engine stopped unexpectedly.")
+                raise SystemExit(1)
+    finally:
+        prober.stop(2)
+        # Leave the publisher time for its final snapshot within the supervisor's shutdown timeout
+        engine.stop(max(supervisor_options()["shutdown_timeout"] - 3, 1))
+        publisher.stop(2)
+
+
+class Worker:
+    """Supervisor-side state of one poller process and its restart backoff."""
+
+    def __init__(self, name, groups, restart_delay):
+        self.name = name
+        self.groups = groups
+        self.process = None
+        self.conn = None  # supervisor end of the pipe the worker reads new groups and its stop request from
+        self.started_at = None
+        self.restart_at = None
+        self.delay = restart_delay
+        self.restarts = 0
+
+    @property
+    def stations(self):
+        return [station for stations in self.groups.values() for station in stations]
+
+
+class PollerSupervisor:
+    """Runs the line's controllers sharded over several poller processes.
+
+    Each worker runs its own PollingEngine, health prober, DB writer and metrics publisher,
+    so decoding and ORM work spread over cores and a controller that wedges
+    its process only takes down its own shard. Crashed workers are
+    restarted with exponential backoff. Processes are spawned on every
+    platform, as on Windows, so workers never inherit sockets or threads.
+    """
+
+    def __init__(self, groups, workers=2, restart_delay=1.0, max_restart_delay=60.0, stable_after=60.0,
+                 shutdown_timeout=15.0):
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.stable_after = stable_after
+        self.shutdown_timeout = shutdown_timeout
+        self.workers = [
+            Worker(f"poller-{i}", shard, restart_delay)
+            for i, shard in enumerate(shard_controllers(groups, workers), start=1)
+        ]
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = threading.Event()
+        self._lock = threading.Lock()  # check() runs on the main thread, update() on the registry watcher
+
+    def start_worker(self, worker):
+        if worker.conn is not None:
+            worker.conn.close()
+        # A pipe rather than a multiprocessing.Event: setting an Event blocks
+        # forever if a process died while waiting on it. The worker also stops
+        # when the supervisor goes away and its end closes.
+        conn, worker.conn = self._context.Pipe(duplex=False)
+        worker.process = self._context.Process(
+            target=run_worker, args=(worker.name, worker.groups, conn), name=worker.name
+        )
+        worker.process.start()
+        conn.close()
+        worker.started_at = time.monotonic()
+        worker.restart_at = None
+        logger.info(f"▶️ Started {worker.name} (pid {worker.process.pid}) for {', '.join(worker.stations)}.")
+
+    def send(self, worker, message):
+        try:
+            worker.conn.send(message)
+        except OSError:
+            pass  # Worker already gone; a restart gets its current groups
+
+    def update(self, groups):
+        """Apply a new registry layout: controllers keep their worker, new ones go to the least loaded."""
+        with self._lock:
+            shards = shard_controllers(groups, len(self.workers), [worker.groups for worker in self.workers])
+            for worker, shard in zip(self.workers, shards):
+                worker.groups = shard
+                self.send(worker, shard)  # Every worker reloads: register addresses may have changed too
+        logger.info(
+            "🗂️ Controllers per worker: "
+            + "; ".join(f"{worker.name}: {', '.join(worker.groups) or '-'}" for worker in self.workers)
+        )
+
+    def check(self):
+        """Schedule restarts of exited workers and start those whose delay has passed."""
+        with self._lock:
+            self._check()
+
+    def _check(self):
+        now = time.monotonic()
+        for worker in self.workers:
+            if worker.process.is_alive():
+                if now - worker.started_at >= self.stable_after:
+                    worker.delay = self.restart_delay
+                continue
+            if worker.restart_at is None:
+                worker.restart_at = now + worker.delay
+                worker.restarts += 1
+                POLLER_WORKER_RESTARTS.inc(worker=worker.name)
+                logger.error(
+                    f"💥 {worker.name} exited with code {worker.process.exitcode}; restarting in {worker.delay:.0f}s."
+                )
+                worker.delay = min(worker.delay * 2, self.max_restart_delay)
+            elif now >= worker.restart_at:
+                self.start_worker(worker)
+
+    def collect(self):
+        """Refresh the per-worker gauges before the supervisor's metrics are published."""
+        for worker in self.workers:
+            POLLER_WORKER_UP.set(int(bool(worker.process and worker.process.is_alive())), worker=worker.name)
+            POLLER_WORKER_STATIONS.set(len(worker.stations), worker=worker.name)
+
+    def run(self, interval=0.5):
+        """Start every worker and keep them running until `stop()` is called, then shut them down."""
+        with self._lock:
+            for worker in self.workers:
+                self.start_worker(worker)
+        try:
+            while not self._stop.wait(interval):
+                self.check()
+        finally:
+            self.shutdown()
+
+    def stop(self):
+        self._stop.set()
+
+    def shutdown(self):
+        """Ask every worker to drain and exit; kill those still running after `shutdown_timeout`."""
+        running = [worker for worker in self.workers if worker.process and worker.process.is_alive()]
+        for worker in running:
+            self.send(worker, "stop")
+        deadline = time.monotonic() + self.shutdown_timeout
+        for worker in running:
+            worker.process.join(max(deadline - time.monotonic(), 0))
+            if worker.process.is_alive():
+                logger.warning(f"⚠️ {worker.name} did not stop in {self.shutdown_timeout:.0f}s; killing it.")
+                worker.process.kill()
+                worker.process.join(5)
+        logger.info(f"🛑 Stopped {len(running)} poller workers.")
@@ -4,8 +4,6 @@ import datetime
 import logging
 import os
 
-# Logging Configuration
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # ✅ Get Current Project Directory
@@ -0,0 +1,150 @@
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db.models import F, Max
+from django.utils import timezone
+
+from track.models import (
+    STATUS_COMPLETE,
+    STATUS_FAILED,
+    ShiftRollup,
+    ShiftStationRollup,
+    StationResult,
+    TraceabilityData,
+)
+from track.shifts import shift_calendar
+
+SHIFT_KEY = ("shift_date", "shift")
+STATION_KEY = ("shift_date", "shift", "station")
+
+
+def add_counts(model, key_fields, deltas):
+    """Add `deltas` ({key tuple: Counter of field increments}) to the rollup rows, creating missing ones."""
+    deltas = {key: counts for key, counts in deltas.items() if any(counts.values())}
+    if not deltas:
+        return
+    model.objects.bulk_create([model(**dict(zip(key_fields, key))) for key in deltas], ignore_conflicts=True)
+    for key, counts in deltas.items():
+        model.objects.filter(**dict(zip(key_fields, key))).update(
+            **{field: F(field) + n for field, n in counts.items() if n}
+        )
+
+
+def part_deltas(events):
+    """Per-shift increments for (when, field) part events, e.g. (created_at, "parts_started")."""
+    deltas = defaultdict(Counter)
+    for when, field in events:
+        deltas[shift_calendar.shift_at(when)][field] += 1
+    return deltas
+
+
+def station_deltas(results):
+    """Per-shift, per-station increments for (when, station, result, first) station writes."""
+    deltas = defaultdict(Counter)
+    for when, station, result, first in results:
+        counts = deltas[(*shift_calendar.shift_at(when), station)]
+        counts["ok_count" if result == "OK" else "not_ok_count"] += 1
+        if first:
+            counts["first_pass_count"] += 1
+            counts["first_pass_ok"] += result == "OK"
+        else:
+            counts["retest_count"] += 1
+    return deltas
+
+
+def record_part_events(events):
+    add_counts(ShiftRollup, SHIFT_KEY, part_deltas(events))
+
+
+def record_station_results(results):
+    add_counts(ShiftStationRollup, STATION_KEY, station_deltas(results))
+
+
+def rebuild_rollups(start=None, end=None):
+    """Recompute the rollups of shift dates start..end (inclusive; open ends allowed) from the part tables.
+
+    Only each station's latest result is stored, so history from before the
+    rollups existed counts every result as a first pass with no retests.
+    Returns the number of rollup rows written.
+    """
+    def in_range(shift_date):
+        return (start is None or shift_date >= start) and (end is None or shift_date <= end)
+
+    parts = TraceabilityData.objects.all()
+    results = StationResult.objects.all()
+    if start is not None:
+        parts = parts.filter(date__gte=start)
+        results = results.filter(timestamp__gte=timezone.make_aware(datetime.combine(start, time.min)))
+    if end is not None:
+        # The night shift of `end` runs into the next calendar day
+        parts = parts.filter(date__lte=end + timedelta(days=1))
+        results = results.filter(timestamp__lt=timezone.make_aware(datetime.combine(end + timedelta(days=2), time.min)))
+
+    events = [(datetime.combine(day, moment), "parts_started") for day, moment in parts.values_list("date", "time").iterator()]
+    finished = {STATUS_COMPLETE: "parts_completed", STATUS_FAILED: "parts_failed"}
+    events += [
+        (last_result, finished[status])
+        for status, last_result in parts.filter(overall_status__in=finished)
+        .annotate(last_result=Max("station_results__timestamp"))
+        .values_list("overall_status", "last_result")
+        .iterator()
+        if last_result is not None
+    ]
+    shift_counts = {key: counts for key, counts in part_deltas(events).items() if in_range(key[0])}
+    station_counts = {
+        key: counts
+        for key, counts in station_deltas(
+            (when, station, result, True) for when, station, result in results.values_list("timestamp", "station", "result").iterator()
+        ).items()
+        if in_range(key[0])
+    }
+
+    shifts = ShiftRollup.objects.all()
+    stations = ShiftStationRollup.objects.all()
+    if start is not None:
+        shifts, stations = shifts.filter(shift_date__gte=start), stations.filter(shift_date__gte=start)
+    if end is not None:
+        shifts, stations = shifts.filter(shift_date__lte=end), stations.filter(shift_date__lte=end)
+    shifts.delete()
+    stations.delete()
+    ShiftRollup.objects.bulk_create(
+        [ShiftRollup(**dict(zip(SHIFT_KEY, key)), **counts) for key, counts in shift_counts.items()], batch_size=1000
+    )
+    ShiftStationRollup.objects.bulk_create(
+        [ShiftStationRollup(**dict(zip(STATION_KEY, key)), **counts) for key, counts in station_counts.items()],
+        batch_size=1000,
+    )
+    return len(shift_counts) + len(station_counts)
+
+
+def rollup_report(start, end, stations=None):
+    """Rollups of shift dates start..end as JSON-ready rows, one per shift with its stations nested."""
+    report = {}
+
+    def shift_row(shift_date, shift):
+        return report.setdefault((shift_date, shift), {
+            "shift_date": shift_date.isoformat(),
+            "shift": shift,
+            "parts_started": 0,
+            "parts_completed": 0,
+            "parts_failed": 0,
+            "stations": {},
+        })
+
+    for row in ShiftRollup.objects.filter(shift_date__range=(start, end)):
+        shift_row(row.shift_date, row.shift).update(
+            parts_started=row.parts_started, parts_completed=row.parts_completed, parts_failed=row.parts_failed
+        )
+    station_rows = ShiftStationRollup.objects.filter(shift_date__range=(start, end)).order_by("station")
+    if stations:
+        station_rows = station_rows.filter(station__in=stations)
+    for row in station_rows:
+        results = row.ok_count + row.not_ok_count
+        shift_row(row.shift_date, row.shift)["stations"][row.station] = {
+            "ok": row.ok_count,
+            "not_ok": row.not_ok_count,
+            "retests": row.retest_count,
+            "not_ok_rate": round(row.not_ok_count / results, 4) if results else None,
+            "first_pass_yield": round(row.first_pass_ok / row.first_pass_count, 4) if row.first_pass_count else None,
+        }
+    return [report[key] for key in sorted(report)]
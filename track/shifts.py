@@ -0,0 +1,39 @@
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+# Shift name and local start time; each shift runs until the next one starts
+DEFAULT_SHIFTS = [("Shift 1", "07:00"), ("Shift 2", "15:30"), ("Shift 3", "23:59")]
+
+
+class ShiftCalendar:
+    """Maps a local time to its shift, with the boundaries parsed once.
+
+    A shift belongs to the production day it started on, so the part of the
+    night shift after midnight counts towards the previous date.
+    """
+
+    def __init__(self, shifts):
+        shifts = sorted((time.fromisoformat(start), name) for name, start in shifts)
+        self.starts = [start for start, _ in shifts]
+        self.names = [name for _, name in shifts]
+
+    def shift_name(self, moment):
+        """Shift of a time of day."""
+        return self.names[bisect_right(self.starts, moment) - 1]  # -1 wraps to the last (overnight) shift
+
+    def shift_at(self, when):
+        """(shift date, shift name) of a datetime; aware datetimes are converted to local time."""
+        if timezone.is_aware(when):
+            when = timezone.localtime(when)
+        moment = when.time()
+        day = when.date() if moment >= self.starts[0] else when.date() - timedelta(days=1)
+        return day, self.shift_name(moment)
+
+    def current(self):
+        return self.shift_at(datetime.now())
+
+
+shift_calendar = ShiftCalendar(getattr(settings, "SHIFTS", DEFAULT_SHIFTS))
@@ -0,0 +1,191 @@
+import logging
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from track.models import PLC_PORT, Station, current_change_version
+
+logger = logging.getLogger(__name__)
+
+# Handshake registers of a station, and their word counts
+REGISTER_FIELDS = ("qr", "result", "scan_trigger", "write_signal")
+REGISTER_SIZES = {"qr": 30, "result": 1, "scan_trigger": 1, "write_signal": 1}
+
+DEFAULT_REGISTRY_OPTIONS = {"reload_interval": 5.0}
+
+
+def registry_options():
+    return {**DEFAULT_REGISTRY_OPTIONS, **getattr(settings, "STATION_REGISTRY", {})}
+
+
+class RegistryError(ValueError):
+    """The Station/Controller tables describe a layout the pollers cannot run."""
+
+
+class StationConfig(namedtuple("StationConfig", ["name", "plc_ip", "port", *REGISTER_FIELDS])):
+    """One enabled station: its controller address and the D register number of each handshake field."""
+
+    __slots__ = ()
+
+    def register_spans(self):
+        """(first, last, field) of every handshake field, in words."""
+        return [
+            (getattr(self, field), getattr(self, field) + REGISTER_SIZES[field] - 1, field) for field in REGISTER_FIELDS
+        ]
+
+
+def register_overlaps(stations):
+    """Messages for handshake registers that overlap on the same controller; empty when the layout is valid."""
+    spans = {}
+    for station in stations:
+        for first, last, field in station.register_spans():
+            spans.setdefault(station.plc_ip, []).append((first, last, station.name, field))
+    problems = []
+    for plc_ip, controller_spans in spans.items():
+        furthest = None
+        for span in sorted(controller_spans):
+            if furthest is not None and span[0] <= furthest[1]:
+                problems.append(
+                    f"{plc_ip}: {span[2]} {span[3]} (D{span[0]}-D{span[1]}) overlaps"
+                    f" {furthest[2]} {furthest[3]} (D{furthest[0]}-D{furthest[1]})"
+                )
+            if furthest is None or span[1] > furthest[1]:
+                furthest = span
+    return problems
+
+
+class RegistrySnapshot(namedtuple("RegistrySnapshot", ["version", "stations", "ports"])):
+    """Read-only view of the registry at one version: stations in line order and controller ports.
+
+    Loaded once per change, so the polling loop only does dictionary
+    lookups and never queries the tables.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def build(cls, version, stations):
+        stations = sorted(stations, key=lambda station: (len(station.name), station.name))
+        return cls(
+            version,
+            MappingProxyType({station.name: station for station in stations}),
+            MappingProxyType({station.plc_ip: station.port for station in stations}),
+        )
+
+    def station(self, name):
+        return self.stations[name]
+
+    def port(self, plc_ip):
+        return self.ports.get(plc_ip, PLC_PORT)
+
+    def groups(self, stations=None):
+        """{plc_ip: [stations]} of `stations` (all by default), so each controller is served by one session."""
+        groups = {}
+        for name in self.stations if stations is None else stations:
+            groups.setdefault(self.stations[name].plc_ip, []).append(name)
+        return groups
+
+
+def load_registry():
+    """Read the enabled stations of enabled controllers; raises RegistryError if their registers overlap."""
+    # Read the version first: an edit racing this load bumps it again and triggers another reload
+    version = current_change_version("registry")
+    stations = [
+        StationConfig(
+            row.name,
+            row.controller.ip,
+            row.controller.port,
+            row.qr_register,
+            row.result_register,
+            row.scan_trigger_register,
+            row.write_signal_register,
+        )
+        for row in Station.objects.filter(enabled=True, controller__enabled=True).select_related("controller")
+    ]
+    problems = register_overlaps(stations)
+    if problems:
+        raise RegistryError("; ".join(problems))
+    return RegistrySnapshot.build(version, stations)
+
+
+_snapshot = None
+_rejected_version = None
+_lock = threading.Lock()
+
+
+def current_registry():
+    """The snapshot in use by this process, loaded on first use."""
+    global _snapshot
+    if _snapshot is None:
+        with _lock:
+            if _snapshot is None:
+                _snapshot = load_registry()
+    return _snapshot
+
+
+def reload_registry():
+    """Install a new snapshot if the registry changed since the current one; returns it, or None if unchanged.
+
+    A registry that fails validation is logged once per version and the
+    current snapshot stays in use.
+    """
+    global _snapshot, _rejected_version
+    with _lock:
+        version = current_change_version("registry")
+        if _snapshot is not None and version in (_snapshot.version, _rejected_version):
+            return None
+        try:
+            snapshot = load_registry()
+        except RegistryError as e:
+            _rejected_version = version
+            if _snapshot is None:
+                raise
+            logger.error(f"❌ Station registry version {version} rejected, keeping version {_snapshot.version}: {e}")
+            return None
+        _snapshot = snapshot
+    logger.info(f"🗂️ Station registry version {snapshot.version}: {len(snapshot.stations)} stations.")
+    return snapshot
+
+
+class RegistryWatcher:
+    """Polls the registry version every `interval` seconds and hands each new snapshot to `on_change` callables."""
+
+    def __init__(self, interval=5.0, on_change=()):
+        self.interval = interval
+        self.on_change = list(on_change)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        snapshot = reload_registry()
+        if snapshot is not None:
+            for callback in self.on_change:
+                callback(snapshot)
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"❌ Station registry reload failed: {e}")
+            finally:
+                close_old_connections()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="registry-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+
+def start_registry_watcher(on_change):
+    """Watch the registry for edits made in the admin; returns the watcher."""
+    watcher = RegistryWatcher(registry_options()["reload_interval"], on_change)
+    watcher.start()
+    return watcher
@@ -0,0 +1,71 @@
+from datetime import date, time
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from track.models import (
+    STATUS_FAILED,
+    STATUS_IN_PROGRESS,
+    StationResult,
+    TraceabilityData,
+    current_change_version,
+)
+
+PART = "PDU-S-10594-1-24032500001"
+
+
+class TraceabilityDataAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+        self.part = TraceabilityData.objects.create(
+            part_number=PART, date=date(2025, 3, 24), time=time(8),
+            overall_status=STATUS_FAILED, first_failed_station="st1",
+        )
+        self.result = StationResult.objects.create(
+            part=self.part, station="st1", result="NOT OK", timestamp=timezone.now()
+        )
+
+    def change_url(self):
+        return reverse("admin:track_traceabilitydata_change", args=[self.part.pk])
+
+    def test_changelist_shows_station_columns(self):
+        response = self.client.get(reverse("admin:track_traceabilitydata_changelist"))
+        self.assertContains(response, PART)
+        self.assertContains(response, "NOT OK")
+
+    def test_change_form_has_station_results_inline(self):
+        response = self.client.get(self.change_url())
+        self.assertContains(response, 'name="station_results-TOTAL_FORMS"')
+        self.assertContains(response, '<option value="NOT OK" selected>')
+
+    def test_derived_fields_are_read_only(self):
+        form = self.client.get(self.change_url()).context["adminform"].form
+        self.assertNotIn("overall_status", form.fields)
+        self.assertNotIn("version", form.fields)
+
+    def test_result_can_be_corrected(self):
+        timestamp = timezone.localtime(self.result.timestamp)
+        response = self.client.post(self.change_url(), {
+            "part_number": PART,
+            "date": "2025-03-24",
+            "time": "08:00:00",
+            "shift": "",
+            "station_results-TOTAL_FORMS": "1",
+            "station_results-INITIAL_FORMS": "1",
+            "station_results-MIN_NUM_FORMS": "0",
+            "station_results-MAX_NUM_FORMS": "1000",
+            "station_results-0-id": self.result.pk,
+            "station_results-0-part": self.part.pk,
+            "station_results-0-station": "st1",
+            "station_results-0-result": "OK",
+            "station_results-0-timestamp_0": timestamp.strftime("%Y-%m-%d"),
+            "station_results-0-timestamp_1": timestamp.strftime("%H:%M:%S"),
+        })
+        self.assertRedirects(response, reverse("admin:track_traceabilitydata_changelist"))
+        self.result.refresh_from_db()
+        self.assertEqual(self.result.result, "OK")
+        self.part.refresh_from_db()  # Status recomputed from the corrected results
+        self.assertEqual((self.part.overall_status, self.part.first_failed_station), (STATUS_IN_PROGRESS, None))
+        self.assertEqual(self.part.version, current_change_version())
@@ -0,0 +1,150 @@
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+
+import numpy as np
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from track.analytics import (
+    StationTimes,
+    cycle_times,
+    lead_times,
+    load_station_times,
+    local_midnight,
+    shift_keys,
+    shift_of_key,
+    station_analytics,
+    summarize,
+)
+from track.models import StationResult, TraceabilityData
+from track.shifts import shift_calendar
+
+DAY = date(2025, 3, 24)
+STATIONS = ["st1", "st2", "st3"]
+
+
+def local(hour, minute=0, second=0, day=DAY):
+    return timezone.make_aware(datetime.combine(day, time(hour, minute, second)))
+
+
+def make_parts(count, start, cycle=60, lead=30, stations=STATIONS):
+    """`count` parts entering st1 every `cycle` seconds from `start`, each spending `lead` seconds per station."""
+    parts = TraceabilityData.objects.bulk_create([
+        TraceabilityData(part_number=f"PDU-S-10594-1-240325{n:05}", date=DAY, time=time(8), shift="Shift 1")
+        for n in range(count)
+    ])
+    StationResult.objects.bulk_create([
+        StationResult(part=part, station=station, result="OK",
+                      timestamp=start + timedelta(seconds=n * cycle + i * lead))
+        for n, part in enumerate(parts) for i, station in enumerate(stations)
+    ])
+    return parts
+
+
+def times(part_ids, stations, seconds):
+    return StationTimes(np.array(part_ids), np.array(stations), np.array(seconds, dtype=float))
+
+
+class LoadStationTimesTests(TestCase):
+    def test_arrays(self):
+        [part] = make_parts(1, local(8))
+        StationResult.objects.create(part=part, station="st4", result=None, timestamp=local(8, 5))
+        loaded = load_station_times(local(0), local(23), STATIONS)
+        order = np.argsort(loaded.stations)
+        self.assertEqual(loaded.part_ids.tolist(), [part.pk] * 3)
+        self.assertEqual(loaded.stations[order].tolist(), [0, 1, 2])
+        self.assertEqual(loaded.seconds[order].tolist(), [local(8).timestamp() + s for s in (0, 30, 60)])
+
+    def test_window_is_half_open(self):
+        make_parts(2, local(8), cycle=3600, lead=1)
+        self.assertEqual(len(load_station_times(local(8), local(9), STATIONS).seconds), 3)
+
+    def test_chunks(self):
+        make_parts(3, local(8))
+        self.assertEqual(len(load_station_times(local(0), local(23), STATIONS, chunk_size=2).seconds), 9)
+
+    def test_empty(self):
+        loaded = load_station_times(local(0), local(23), STATIONS)
+        self.assertEqual([len(a) for a in loaded], [0, 0, 0])
+
+    def test_seconds_keep_milliseconds(self):
+        make_parts(1, local(8) + timedelta(milliseconds=250), stations=["st1"])
+        loaded = load_station_times(local(0), local(23), ["st1"])
+        self.assertEqual(loaded.seconds.tolist(), [local(8).timestamp() + 0.25])
+
+    def test_reads_only_the_covering_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            load_station_times(local(0), local(23), STATIONS)
+        self.assertEqual(len(queries), len(STATIONS))
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {queries[0]['sql']}")
+            plan = " | ".join(row[-1] for row in cursor.fetchall())
+        self.assertIn("USING COVERING INDEX stationresult_st_res_ts_pt_idx", plan)
+
+
+class ComputationTests(SimpleTestCase):
+    def test_cycle_times(self):
+        # st1 at 0, 50, 2000 (idle), st2 at 30, 80; input deliberately out of order
+        cycle = cycle_times(times([2, 1, 3, 1, 2], [0, 0, 0, 1, 1], [50, 0, 2000, 30, 80]), max_gap=600)
+        np.testing.assert_array_equal(cycle, [50, np.nan, np.nan, np.nan, 50])
+
+    def test_lead_times_drop_retests(self):
+        lead = lead_times(times([1, 1, 1, 2, 2, 2], [0, 1, 2, 0, 1, 2], [0, 30, 90, 100, 200, 150]), 3)
+        np.testing.assert_array_equal(lead, [[30, 60], [100, np.nan]])
+
+    def test_lead_times_missing_station(self):
+        lead = lead_times(times([1, 1], [0, 2], [0, 90]), 3)
+        np.testing.assert_array_equal(lead, [[np.nan, np.nan]])
+
+    def test_summarize(self):
+        summary = summarize(np.array([10.0, 20.0, np.nan, 30.0, 40.0]))
+        self.assertEqual((summary["count"], summary["mean"], summary["p50"]), (4, 25.0, 25.0))
+        self.assertEqual(sum(summary["histogram"]), 4)
+        self.assertEqual(summarize(np.array([np.nan])), {"count": 0})
+
+    def test_shift_keys_match_calendar(self):
+        moments = [local(h, m, day=d) for d in (DAY, DAY + timedelta(days=1)) for h in range(24) for m in (0, 29, 30)]
+        keys = shift_keys(np.array([moment.timestamp() for moment in moments]))
+        self.assertEqual([shift_of_key(key) for key in keys], [shift_calendar.shift_at(moment) for moment in moments])
+
+
+class StationAnalyticsTests(TestCase):
+    def test_report(self):
+        make_parts(5, local(8), cycle=60, lead=30)
+        result = station_analytics(local_midnight(DAY), local_midnight(DAY + timedelta(days=1)), STATIONS)
+        self.assertEqual((result["parts"], result["results"]), (5, 15))
+        self.assertEqual(result["cycle_time"]["st1"]["count"], 4)  # The first part has no predecessor
+        self.assertEqual(result["cycle_time"]["st2"]["p50"], 60.0)
+        self.assertEqual(result["lead_time"]["st1->st2"]["p99"], 30.0)
+        [shift] = result["bottlenecks"]
+        self.assertEqual((shift["shift_date"], shift["shift"]), ("2025-03-24", shift_calendar.shift_name(time(8))))
+        self.assertEqual([s["station"] for s in shift["stations"]], STATIONS)
+
+    def test_view(self):
+        make_parts(2, local(8))
+        response = self.client.get(reverse("station_analytics"), {"start": "2025-03-24", "end": "2025-03-24",
+                                                                  "station": ["st1", "st2"]})
+        data = response.json()
+        self.assertEqual((data["results"], list(data["lead_time"])), (4, ["st1->st2"]))
+        self.assertEqual(self.client.get(reverse("station_analytics"), {"end": "24/03/2025"}).status_code, 400)
+        too_long = {"start": "2025-01-01", "end": "2025-06-01"}
+        self.assertEqual(self.client.get(reverse("station_analytics"), too_long).status_code, 400)
+
+    def test_command(self):
+        make_parts(2, local(8))
+        out = StringIO()
+        call_command("station_analytics", "--start", "2025-03-24", "--end", "2025-03-24", stdout=out)
+        self.assertIn("2 parts, 6 results", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("station_analytics", "--start", "soon", stdout=StringIO())
+
+    def test_bench_command_rolls_back(self):
+        out = StringIO()
+        call_command("bench_analytics", "--rows", "80", "--repeat", "1", stdout=out)
+        self.assertIn("80 station results seeded", out.getvalue())
+        self.assertIn("station_analytics", out.getvalue())
+        self.assertFalse(StationResult.objects.exists())
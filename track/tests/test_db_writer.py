@@ -0,0 +1,257 @@
+import tempfile
+from datetime import date, datetime, time
+from unittest import mock
+
+from django.db import OperationalError, transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from track.db_writer import (
+    PartCreate,
+    ScanLog,
+    StationResultWriter,
+    StationUpdate,
+    apply_batch,
+    decode_item,
+    encode_item,
+    is_lock_error,
+)
+from track.models import (
+    LINE_STATIONS,
+    ScanEvent,
+    STATUS_COMPLETE,
+    STATUS_FAILED,
+    STATUS_IN_PROGRESS,
+    StationResult,
+    TraceabilityData,
+    compute_part_status,
+    current_change_version,
+)
+
+PART = "PDU-S-10594-1-24032500001"
+OTHER = "PDU-S-10594-1-24032500002"
+
+
+def create(part_number):
+    return PartCreate(part_number, date(2025, 3, 24), time(10, 0), "Shift 1")
+
+
+def at(minute):
+    return timezone.make_aware(datetime(2025, 3, 24, 10, minute))
+
+
+def update(part_number, station, result, minute=0):
+    return StationUpdate(part_number, station, result, at(minute))
+
+
+def results(part_number):
+    return dict(StationResult.objects.filter(part__part_number=part_number).values_list("station", "result"))
+
+
+class ApplyBatchTests(TestCase):
+    def apply(self, *items):
+        with transaction.atomic():
+            apply_batch(list(items))
+
+    def test_creates_part_and_results(self):
+        self.apply(create(PART), update(PART, "st1", "OK", 1), update(PART, "st2", "NOT OK", 2))
+        self.assertEqual(TraceabilityData.objects.get(part_number=PART).shift, "Shift 1")
+        self.assertEqual(results(PART), {"st1": "OK", "st2": "NOT OK"})
+        self.assertEqual(StationResult.objects.get(part__part_number=PART, station="st2").timestamp, at(2))
+
+    def test_repeated_create_keeps_one_part(self):
+        self.apply(create(PART), update(PART, "st1", "OK"))
+        self.apply(create(PART), create(PART))
+        self.assertEqual(TraceabilityData.objects.filter(part_number=PART).count(), 1)
+        self.assertEqual(results(PART), {"st1": "OK"})
+
+    def test_station_result_is_upserted(self):
+        self.apply(create(PART), update(PART, "st1", "NOT OK", 1))
+        self.apply(update(PART, "st1", "OK", 2))
+        result = StationResult.objects.get(part__part_number=PART, station="st1")
+        self.assertEqual((result.result, result.timestamp), ("OK", at(2)))
+
+    def test_updates_of_several_parts(self):
+        self.apply(create(PART), create(OTHER))
+        self.apply(update(PART, "st1", "OK"), update(PART, "st2", "OK"), update(OTHER, "st1", "NOT OK"))
+        self.assertEqual(results(PART), {"st1": "OK", "st2": "OK"})
+        self.assertEqual(results(OTHER), {"st1": "NOT OK"})
+
+    def test_last_update_in_batch_wins(self):
+        self.apply(create(PART), update(PART, "st1", "NOT OK", 1), update(PART, "st1", "OK", 2))
+        self.assertEqual(results(PART), {"st1": "OK"})
+
+    def test_status_recomputed(self):
+        self.apply(create(PART), update(PART, "st1", "OK"))
+        part = TraceabilityData.objects.get(part_number=PART)
+        self.assertEqual((part.overall_status, part.first_failed_station), (STATUS_IN_PROGRESS, None))
+
+        self.apply(*[update(PART, station, "OK") for station in LINE_STATIONS])
+        part.refresh_from_db()
+        self.assertEqual((part.overall_status, part.first_failed_station), (STATUS_COMPLETE, None))
+
+        self.apply(update(PART, "st5", "NOT OK", 1), update(PART, "st3", "NOT OK", 1))
+        part.refresh_from_db()
+        self.assertEqual((part.overall_status, part.first_failed_station), (STATUS_FAILED, "st3"))
+
+        self.apply(update(PART, "st3", "OK", 2))
+        part.refresh_from_db()
+        self.assertEqual((part.overall_status, part.first_failed_station), (STATUS_FAILED, "st5"))
+
+    def test_touched_parts_get_a_new_version(self):
+        self.apply(create(PART), create(OTHER))
+        versions = dict(TraceabilityData.objects.values_list("part_number", "version"))
+        self.assertEqual(versions[PART], versions[OTHER])  # One version per batch
+        self.apply(update(PART, "st1", "OK"))
+        self.assertGreater(TraceabilityData.objects.get(part_number=PART).version, versions[PART])
+        self.assertEqual(TraceabilityData.objects.get(part_number=OTHER).version, versions[OTHER])
+        self.assertEqual(current_change_version(), versions[PART] + 1)
+
+    def test_result_for_unknown_part_is_dropped(self):
+        with self.assertLogs("track.db_writer", "ERROR"):
+            self.apply(update(PART, "st1", "OK"))
+        self.assertFalse(StationResult.objects.exists())
+
+    def test_scan_log_only_batch(self):
+        version = current_change_version()
+        self.apply(ScanLog(at(0), "st1", PART, 1, 4, "ok", 1.0, 2.0, 1.0, 4.0))
+        event = ScanEvent.objects.get()
+        self.assertEqual((event.station, event.outcome, event.day), ("st1", "ok", date(2025, 3, 24)))
+        self.assertFalse(TraceabilityData.objects.exists())
+        self.assertEqual(current_change_version(), version)  # Telemetry does not touch the dashboard
+
+    def test_scan_log_with_results(self):
+        self.apply(create(PART), update(PART, "st1", "OK"), ScanLog(at(0), "st1", PART, 1, 4, "ok", 1.0, 2.0, 1.0, 4.0))
+        self.assertEqual(ScanEvent.objects.count(), 1)
+        self.assertEqual(results(PART), {"st1": "OK"})
+
+
+class ComputePartStatusTests(TestCase):
+    def test_statuses(self):
+        all_ok = {station: "OK" for station in LINE_STATIONS}
+        self.assertEqual(compute_part_status({}), (STATUS_IN_PROGRESS, None))
+        self.assertEqual(compute_part_status(all_ok), (STATUS_COMPLETE, None))
+        self.assertEqual(compute_part_status({**all_ok, "st9": None}), (STATUS_COMPLETE, None))  # Off-line station
+        self.assertEqual(compute_part_status({**all_ok, "st8": None}), (STATUS_IN_PROGRESS, None))
+        self.assertEqual(compute_part_status({"st2": "NOT OK", "st6": "NOT OK"}), (STATUS_FAILED, "st2"))
+
+
+class StationResultWriterTests(TestCase):
+    def setUp(self):
+        self.writer = StationResultWriter(max_retries=2)
+        for patcher in (mock.patch("track.db_writer.time.sleep"), mock.patch("track.part_cache.part_cache")):
+            self.cache = patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write(self, batch):
+        entries = [(None, item) for item in batch]
+        for entry in entries:
+            self.writer._queue.put(entry)
+        self.writer._write(entries)
+
+    def test_writes_batch(self):
+        self.write([create(PART), update(PART, "st1", "OK")])
+        self.assertEqual(results(PART), {"st1": "OK"})
+        self.assertEqual(self.writer.stats()["written"], 2)
+
+    def test_retries_lock_errors_until_they_clear(self):
+        locked = OperationalError("database is locked")
+        with mock.patch("track.db_writer.apply_batch", side_effect=[locked, locked, locked, None]):
+            with self.assertLogs("track.db_writer", "ERROR") as logs:  # Stuck after max_retries, still retrying
+                self.write([create(PART)])
+        self.assertEqual(len(logs.output), 1)
+        self.assertEqual(self.writer.stats()["retries"], 3)
+        self.assertEqual((self.writer.stats()["written"], self.writer.stats()["dropped"]), (1, 0))
+
+    def test_stopping_writer_leaves_locked_batch_in_journal(self):
+        self.writer._stop.set()
+        with mock.patch("track.db_writer.apply_batch", side_effect=OperationalError("database is locked")):
+            with self.assertLogs("track.db_writer", "ERROR") as logs:
+                self.write([create(PART)])
+        self.assertIn("journal kept", logs.output[-1])
+        self.assertEqual((self.writer.stats()["written"], self.writer.stats()["dropped"]), (0, 0))
+
+    def test_other_errors_drop_only_failing_items(self):
+        failures = [ValueError("bad item"), None, ValueError("bad item")]  # Batch, then each item
+        with mock.patch("track.db_writer.apply_batch", side_effect=failures):
+            with self.assertLogs("track.db_writer", "ERROR"):
+                self.write([create(PART), update(OTHER, "st1", "OK")])
+        self.assertEqual((self.writer.stats()["written"], self.writer.stats()["dropped"]), (1, 1))
+        self.cache.invalidate.assert_called_once_with(OTHER)
+
+    def test_other_operational_errors_are_not_retried(self):
+        missing = OperationalError("no such table: track_stationresult")
+        with mock.patch("track.db_writer.apply_batch", side_effect=[missing, None, missing]):
+            with self.assertLogs("track.db_writer", "ERROR") as logs:
+                self.write([create(PART), update(OTHER, "st1", "OK")])
+        self.assertEqual(self.writer.stats()["retries"], 0)
+        self.assertEqual((self.writer.stats()["written"], self.writer.stats()["dropped"]), (1, 1))
+        self.assertIn("applying them one by one", logs.output[0])
+        self.assertIn("dropped", logs.output[1])
+        self.cache.invalidate.assert_called_once_with(OTHER)
+
+    def test_lock_error_while_splitting_retries_the_rest(self):
+        locked = OperationalError("database is locked")
+        # Batch fails, first item is dropped, the second hits a lock; the rest is retried as a batch
+        # until the lock clears
+        failures = [ValueError("bad item"), ValueError("bad item"), locked, locked, None]
+        with mock.patch("track.db_writer.apply_batch", side_effect=failures):
+            with self.assertLogs("track.db_writer", "ERROR"):
+                self.write([create(PART), update(OTHER, "st1", "OK"), update(OTHER, "st2", "OK")])
+        self.assertEqual(self.writer.stats()["retries"], 1)
+        self.assertEqual((self.writer.stats()["written"], self.writer.stats()["dropped"]), (2, 1))
+
+    def test_lock_errors(self):
+        self.assertTrue(is_lock_error(OperationalError("database is locked")))
+        self.assertTrue(is_lock_error(OperationalError("database table is locked: track_stationresult")))
+        self.assertTrue(is_lock_error(OperationalError("SQLITE_BUSY: database busy")))
+        self.assertFalse(is_lock_error(OperationalError("disk I/O error")))
+        self.assertFalse(is_lock_error(ValueError("database is locked")))
+
+
+class WriteJournalTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.writer = StationResultWriter(journal_dir=directory.name)
+        self.addCleanup(lambda: self.writer.journal and self.writer.journal.close())
+
+    def test_items_round_trip(self):
+        for item in (create(PART), update(PART, "st1", "NOT OK", minute=5), StationUpdate(PART, "st2", None, None)):
+            self.assertEqual(decode_item(encode_item(item)), item)
+
+    def test_submit_journals_before_returning(self):
+        self.writer.open_journal("poller-1")
+        with mock.patch.object(self.writer, "_ensure_started"):
+            self.writer.submit(create(PART))
+            self.writer.submit(ScanLog(at(0), "st1", PART, 1, 4, "ok", 1, 1, 1, 3))  # Telemetry, not journaled
+        self.assertEqual([item for _, item in self.writer.journal.pending()], [create(PART)])
+        entries = [self.writer._queue.get_nowait() for _ in range(2)]
+        self.assertIsNotNone(entries[0][0])
+        self.assertIsNone(entries[1][0])
+
+    def test_committed_items_leave_the_journal(self):
+        self.writer.open_journal("poller-1")
+        with mock.patch.object(self.writer, "_ensure_started"):
+            self.writer.submit(create(PART))
+        entry = self.writer._queue.get_nowait()
+        self.writer._queue.put(entry)
+        self.writer._write([entry])
+        self.assertEqual(self.writer.journal.pending(), [])
+        self.assertTrue(TraceabilityData.objects.filter(part_number=PART).exists())
+
+    def test_unwritten_items_are_replayed(self):
+        self.writer.open_journal("poller-1")
+        with mock.patch.object(self.writer, "_ensure_started"):
+            self.writer.submit(create(PART))
+            self.writer.submit(update(PART, "st1", "OK"))
+        self.writer.journal.close()  # Crash before the writer ran
+        self.writer.journal = None
+
+        restarted = StationResultWriter(journal_dir=self.writer.journal_dir)
+        with mock.patch.object(restarted, "_ensure_started"), self.assertLogs("track.db_writer", "WARNING"):
+            restarted.open_journal("poller-1")
+        self.addCleanup(restarted.journal.close)
+        self.assertEqual(restarted.stats()["replayed"], 2)
+        entries = [restarted._queue.get_nowait() for _ in range(2)]
+        self.assertEqual([item for _, item in entries], [create(PART), update(PART, "st1", "OK")])
@@ -0,0 +1,178 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from track.events import DashboardHub, sse_event
+
+
+def parse_event(message):
+    event, data = message.strip().split("\n")
+    return event[len("event: "):], json.loads(data[len("data: "):])
+
+
+class FakeDashboard:
+    """Version counter, changes and PLC status the hub polls; counts the polls."""
+
+    def __init__(self):
+        self.version = 1
+        self.rows = []
+        self.plc = {"connected_count": 8}
+        self.calls = {"version": 0, "changes": 0}
+
+    def get_version(self):
+        self.calls["version"] += 1
+        return self.version
+
+    def get_changes(self, since):
+        self.calls["changes"] += 1
+        return {"rows": [row for row in self.rows if row["version"] > since], "version": self.version}
+
+    def get_plc_status(self):
+        return dict(self.plc)
+
+
+class DashboardHubTests(SimpleTestCase):
+    def setUp(self):
+        self.dashboard = FakeDashboard()
+        self.hub = DashboardHub(
+            self.dashboard.get_version, self.dashboard.get_changes, self.dashboard.get_plc_status, interval=0.01,
+            queue_size=4,
+        )
+
+    def run_async(self, coroutine):
+        return asyncio.run(asyncio.wait_for(coroutine, 5))
+
+    def test_sse_event(self):
+        self.assertEqual(sse_event("rows", {"version": 3}), 'event: rows\ndata: {"version": 3}\n\n')
+
+    def test_changes_fan_out_to_every_subscriber(self):
+        async def scenario():
+            queues = [self.hub.subscribe() for _ in range(3)]
+            await asyncio.sleep(0.05)
+            self.dashboard.rows = [{"part_number": "P1", "version": 2}]
+            self.dashboard.version = 2
+            messages = [await queue.get() for queue in queues]
+            for queue in queues:
+                self.hub.unsubscribe(queue)
+            return messages
+
+        messages = self.run_async(scenario())
+        self.assertEqual(set(messages), {messages[0]})
+        rows = {"rows": [{"part_number": "P1", "version": 2}], "version": 2}
+        self.assertEqual(parse_event(messages[0]), ("rows", rows))
+        self.assertEqual(self.dashboard.calls["changes"], 1)  # Queried once, not once per client
+
+    def test_plc_status_sent_when_it_changes(self):
+        async def scenario():
+            queue = self.hub.subscribe()
+            await asyncio.sleep(0.05)
+            self.assertTrue(queue.empty())
+            self.dashboard.plc = {"connected_count": 7}
+            message = await queue.get()
+            self.hub.unsubscribe(queue)
+            return message
+
+        self.assertEqual(parse_event(self.run_async(scenario())), ("plc", {"connected_count": 7}))
+
+    def test_version_bump_without_visible_rows_sends_nothing(self):
+        async def scenario():
+            queue = self.hub.subscribe()
+            await asyncio.sleep(0.05)
+            self.dashboard.version = 2
+            await asyncio.sleep(0.05)
+            self.hub.unsubscribe(queue)
+            return queue.empty()
+
+        self.assertTrue(self.run_async(scenario()))
+        self.assertEqual(self.dashboard.calls["changes"], 1)
+
+    def test_watcher_stops_without_subscribers(self):
+        async def scenario():
+            queue = self.hub.subscribe()
+            self.assertTrue(self.hub.stats()["running"])
+            self.hub.unsubscribe(queue)
+            await asyncio.sleep(0.05)
+            polls = self.dashboard.calls["version"]
+            await asyncio.sleep(0.05)
+            return polls
+
+        polls = self.run_async(scenario())
+        self.assertEqual(self.dashboard.calls["version"], polls)
+        self.assertEqual(self.hub.stats(), {"subscribers": 0, "running": False})
+
+    def test_slow_client_is_disconnected(self):
+        async def scenario():
+            slow = self.hub.subscribe()
+            fast = self.hub.subscribe()
+            with self.assertLogs("track.events", "WARNING"):
+                for n in range(5):
+                    self.hub.publish("rows", {"n": n})
+                    if n < 4:
+                        await fast.get()
+            messages = []
+            while not slow.empty():
+                messages.append(slow.get_nowait())
+            self.hub.unsubscribe(fast)
+            return messages
+
+        messages = self.run_async(scenario())
+        self.assertIsNone(messages[-1])  # End of the stream; the client reconnects and resyncs
+        self.assertEqual(self.hub.stats()["subscribers"], 0)
+
+    def test_watcher_survives_errors(self):
+        calls = []
+
+        def failing_changes(since):
+            calls.append(since)
+            if len(calls) == 1:
+                raise RuntimeError("database is locked")
+            return self.dashboard.get_changes(since)
+
+        self.hub.get_changes = failing_changes
+
+        async def scenario():
+            queue = self.hub.subscribe()
+            await asyncio.sleep(0.05)
+            self.dashboard.rows = [{"part_number": "P1", "version": 2}]
+            self.dashboard.version = 2
+            with self.assertLogs("track.events", "ERROR"):
+                message = await queue.get()
+            self.hub.unsubscribe(queue)
+            return message
+
+        self.assertEqual(parse_event(self.run_async(scenario()))[0], "rows")
+        self.assertGreaterEqual(len(calls), 2)
+
+
+class DashboardEventsViewTests(TestCase):
+    def test_needs_asgi(self):
+        self.assertEqual(self.client.get(reverse("dashboard_events")).status_code, 503)
+
+    async def test_stream_starts_with_snapshot(self):
+        response = await self.async_client.get(reverse("dashboard_events"))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = response.streaming_content
+        event, data = parse_event((await stream.__anext__()).decode())
+        await stream.aclose()
+        self.assertEqual(event, "snapshot")
+        self.assertEqual(set(data), {"data", "version", "plc"})
+
+    async def test_snapshot_is_resent_periodically(self):
+        with mock.patch("track.views.SSE_FULL_SYNC", 0.05):
+            response = await self.async_client.get(reverse("dashboard_events"))
+            stream = response.streaming_content
+            events = [parse_event((await stream.__anext__()).decode())[0] for _ in range(2)]
+            await stream.aclose()
+        self.assertEqual(events, ["snapshot", "snapshot"])
+
+    async def test_keepalive_between_snapshots(self):
+        with mock.patch("track.views.SSE_KEEPALIVE", 0.01):
+            response = await self.async_client.get(reverse("dashboard_events"))
+            stream = response.streaming_content
+            await stream.__anext__()
+            message = (await stream.__anext__()).decode()
+            await stream.aclose()
+        self.assertEqual(message, ": keepalive\n\n")
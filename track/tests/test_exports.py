@@ -0,0 +1,89 @@
+import csv
+import gzip
+import io
+import os
+from datetime import date, time
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from track import exports
+from track.exports import EXPORT_COLUMNS
+from track.models import StationResult, TraceabilityData
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for n in range(1, 6):
+            part = TraceabilityData.objects.create(
+                part_number=f"PDU-S-10594-1-2403250000{n}",
+                date=date(2025, 3, 24),
+                time=time(8, n),
+                shift="Shift 1" if n < 4 else "Shift 2",
+            )
+            StationResult.objects.create(part=part, station="st1", result="OK", timestamp=timezone.now())
+            if n == 2:
+                StationResult.objects.create(part=part, station="st2", result="NOT OK", timestamp=timezone.now())
+
+    def export(self, **params):
+        response = self.client.get(reverse("export_parts"), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def csv_rows(self, body):
+        return list(csv.reader(io.StringIO(body.decode("utf-8"))))
+
+    def test_csv(self):
+        response, body = self.export(format="csv")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn('filename="traceability_data.csv"', response["Content-Disposition"])
+        rows = self.csv_rows(body)
+        self.assertEqual(rows[0], EXPORT_COLUMNS)
+        self.assertEqual([row[1] for row in rows[1:]], [f"PDU-S-10594-1-2403250000{n}" for n in range(1, 6)])
+        second = dict(zip(EXPORT_COLUMNS, rows[2]))
+        self.assertEqual((second["st1_result"], second["st2_result"], second["st3_result"]), ("OK", "NOT OK", ""))
+
+    def test_search_filters_apply(self):
+        _, body = self.export(format="csv", shift="Shift 2")
+        self.assertEqual(len(self.csv_rows(body)), 3)
+
+    def test_csv_is_sent_in_pieces(self):
+        with mock.patch.object(exports, "CHUNK_BYTES", 100):
+            response = self.client.get(reverse("export_parts"), {"format": "csv"})
+            chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 2)
+        _, whole = self.export(format="csv")
+        self.assertEqual(b"".join(chunks), whole)
+
+    def test_gzip(self):
+        response, body = self.export(format="csv", gzip="1")
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn('filename="traceability_data.csv.gz"', response["Content-Disposition"])
+        self.assertEqual(gzip.decompress(body), self.export(format="csv")[1])
+
+    def test_xlsx(self):
+        paths = []
+        mkstemp = exports.tempfile.mkstemp
+
+        def track_mkstemp(*args, **kwargs):
+            fd, path = mkstemp(*args, **kwargs)
+            paths.append(path)
+            return fd, path
+
+        with mock.patch.object(exports.tempfile, "mkstemp", track_mkstemp):
+            response, body = self.export()
+        self.assertEqual(response["Content-Type"], exports.EXPORT_FORMATS["xlsx"][0])
+        rows = list(load_workbook(io.BytesIO(body), read_only=True).active.iter_rows(values_only=True))
+        self.assertEqual(list(rows[0]), EXPORT_COLUMNS)
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][1], "PDU-S-10594-1-24032500001")
+        self.assertFalse(os.path.exists(paths[0]))  # Temporary workbook removed once sent
+
+    def test_bad_format(self):
+        response = self.client.get(reverse("export_parts"), {"format": "pdf"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,145 @@
+import logging
+import queue
+import sys
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from track.log_pipeline import CompactFormatter, RateLimiter, RoutedQueueHandler, RoutingQueueListener
+
+
+def record(msg, level=logging.WARNING, name="track.plc_utils", **context):
+    entry = logging.LogRecord(name, level, __file__, 1, msg, None, None)
+    entry.__dict__.update(context)
+    return entry
+
+
+class ListHandler(logging.Handler):
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(level)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@mock.patch("track.log_pipeline.time.monotonic")
+class RateLimiterTests(SimpleTestCase):
+    def test_burst_then_suppress(self, monotonic):
+        monotonic.return_value = 100.0
+        limiter = RateLimiter(burst=2, period=60)
+        results = [limiter.check(record(f"Read failed after {n} ms", station="st1")) for n in range(4)]
+        self.assertEqual(results, [(True, 0), (True, 0), (False, 0), (False, 0)])
+
+    def test_next_window_reports_suppressed(self, monotonic):
+        monotonic.return_value = 100.0
+        limiter = RateLimiter(burst=1, period=60)
+        for _ in range(3):
+            limiter.check(record("Read failed"))
+        monotonic.return_value = 159.0
+        self.assertEqual(limiter.check(record("Read failed")), (False, 0))
+        monotonic.return_value = 160.0
+        self.assertEqual(limiter.check(record("Read failed")), (True, 3))
+
+    def test_context_level_and_logger_keep_separate_limits(self, monotonic):
+        monotonic.return_value = 100.0
+        limiter = RateLimiter(burst=1, period=60)
+        self.assertTrue(limiter.check(record("Read failed", station="st1"))[0])
+        self.assertTrue(limiter.check(record("Read failed", station="st2"))[0])
+        self.assertTrue(limiter.check(record("Read failed", level=logging.ERROR))[0])
+        self.assertTrue(limiter.check(record("Read failed", name="track.plc_engine"))[0])
+        self.assertFalse(limiter.check(record("Read failed", station="st1"))[0])
+
+    def test_prunes_expired_windows(self, monotonic):
+        monotonic.return_value = 100.0
+        limiter = RateLimiter(burst=1, period=60)
+        limiter.max_keys = 2
+        limiter.check(record("a"))
+        limiter.check(record("b"))
+        monotonic.return_value = 200.0
+        limiter.check(record("c"))
+        self.assertEqual(len(limiter._windows), 1)
+
+
+class CompactFormatterTests(SimpleTestCase):
+    def test_format(self):
+        entry = record("🚫 Invalid QR format - %r", station="st3", plc=None)
+        entry.args = ("X",)
+        entry.created, entry.msecs = 0.0, 123.0
+        line = CompactFormatter().format(entry)
+        self.assertRegex(line, r"^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\.123 W ")
+        self.assertTrue(line.endswith(" W track.plc_utils station=st3 🚫 Invalid QR format - 'X'"))
+
+    def test_exception(self):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            entry = logging.LogRecord("track", logging.ERROR, __file__, 1, "failed", None, sys.exc_info())
+        line = CompactFormatter().format(entry)
+        self.assertIn(" E track failed\nTraceback", line)
+        self.assertTrue(line.endswith("ValueError: boom"))
+
+
+class QueueHandlerTests(SimpleTestCase):
+    def test_enqueues_routed_record(self):
+        log_queue = queue.Queue()
+        RoutedQueueHandler(log_queue, "track").handle(record("Read failed"))
+        self.assertEqual(log_queue.get_nowait().route, "track")
+
+    def test_rate_limited_and_summarized(self):
+        log_queue = queue.Queue()
+        handler = RoutedQueueHandler(log_queue, "track", RateLimiter(burst=1, period=60))
+        with mock.patch("track.log_pipeline.time.monotonic", side_effect=[0.0, 1.0, 2.0, 61.0]):
+            for _ in range(4):
+                handler.handle(record("Read failed"))
+        messages = [log_queue.get_nowait().getMessage() for _ in range(log_queue.qsize())]
+        self.assertEqual(messages, ["Read failed", "Read failed (suppressed 2 similar)"])
+
+    def test_errors_are_never_rate_limited(self):
+        log_queue = queue.Queue()
+        handler = RoutedQueueHandler(log_queue, "track", RateLimiter(burst=1, period=60))
+        for _ in range(3):
+            handler.handle(record("Connection failed", level=logging.ERROR))
+        self.assertEqual(log_queue.qsize(), 3)
+
+    @mock.patch("track.log_pipeline.time.monotonic")
+    def test_summarize_reports_closed_windows(self, monotonic):
+        log_queue = queue.Queue()
+        handler = RoutedQueueHandler(log_queue, "track", RateLimiter(burst=1, period=60))
+        monotonic.return_value = 0.0
+        for n in range(4):
+            handler.handle(record(f"Read failed after {n} ms", station="st1"))
+        handler.handle(record("Quiet", station="st2"))
+        log_queue.queue.clear()
+        monotonic.return_value = 30.0
+        handler.summarize()
+        self.assertTrue(log_queue.empty())  # Window still open
+        monotonic.return_value = 60.0
+        handler.summarize()
+        [summary] = list(log_queue.queue)
+        self.assertEqual(
+            summary.getMessage(), "3 similar messages suppressed in the last 60s, last: Read failed after 3 ms"
+        )
+        self.assertEqual((summary.station, summary.route, summary.levelno), ("st1", "track", logging.WARNING))
+        handler.summarize()
+        self.assertEqual(log_queue.qsize(), 1)  # Reported once
+
+    def test_full_queue_drops_without_blocking(self):
+        log_queue = queue.Queue(1)
+        handler = RoutedQueueHandler(log_queue, "track")
+        handler.handle(record("first"))
+        handler.handle(record("second"))
+        self.assertEqual((log_queue.qsize(), handler.dropped), (1, 1))
+
+    def test_listener_writes_with_the_route_handlers(self):
+        log_queue = queue.Queue()
+        track, warnings_only, other = ListHandler(), ListHandler(logging.WARNING), ListHandler()
+        listener = RoutingQueueListener(log_queue, {"track": [track, warnings_only], "django": [other]})
+        sender = RoutedQueueHandler(log_queue, "track")
+        sender.handle(record("info", level=logging.INFO))
+        sender.handle(record("warning"))
+        listener.start()
+        listener.stop()
+        self.assertEqual([r.getMessage() for r in track.records], ["info", "warning"])
+        self.assertEqual([r.getMessage() for r in warnings_only.records], ["warning"])
+        self.assertEqual(other.records, [])
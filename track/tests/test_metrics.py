@@ -0,0 +1,138 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from track import metrics
+from track.metrics import MetricsPublisher, MetricsRegistry, histogram_quantile, merge_metrics, render_metrics
+from track.models import MetricsSnapshot
+
+
+def sample_registry():
+    registry = MetricsRegistry()
+    registry.counter("scans_total", "Scans.", ["station"]).inc(station="st1")
+    registry.gauge("pending", "Pending.").set(3)
+    registry.histogram("read_seconds", "Reads.", ["plc"], buckets=(0.01, 0.1)).observe(0.05, plc="10.0.0.1")
+    return registry
+
+
+class RegistryTests(SimpleTestCase):
+    def test_registering_twice_returns_the_same_metric(self):
+        registry = MetricsRegistry()
+        self.assertIs(registry.counter("a_total", "A."), registry.counter("a_total", "A."))
+
+    def test_dump(self):
+        registry = sample_registry()
+        registry.counter("scans_total", "Scans.", ["station"]).inc(2, station="st1")
+        dump = registry.dump()
+        self.assertEqual(dump["scans_total"]["values"], [[["st1"], 3]])
+        self.assertEqual(dump["pending"]["values"], [[[], 3]])
+        self.assertEqual(dump["read_seconds"]["values"], [[["10.0.0.1"], [[0, 1, 0], 0.05, 1]]])
+
+    def test_histogram_bucket_bounds_are_inclusive(self):
+        histogram = MetricsRegistry().histogram("h", "H.", buckets=(0.1, 1.0))
+        for value in (0.1, 0.5, 1.0, 7.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.dump()["values"][0][1][0], [1, 2, 1])
+
+    def test_observe_scan(self):
+        registry = MetricsRegistry()
+        rejects = registry.counter("r", "R.", ["station", "signal"])
+        stages = registry.histogram("t", "T.", ["station", "stage"])
+        scans = registry.counter("s", "S.", ["station", "outcome"])
+        with mock.patch.multiple(metrics, PLC_SCANS=scans, PLC_REJECTS=rejects, PLC_STAGE_SECONDS=stages):
+            metrics.observe_scan("st1", "ok", 1, {"read_ms": 2.0, "ack_ms": None}, 5.0)
+        self.assertEqual(rejects.dump()["values"], [[["st1", "1"], 1]])
+        self.assertEqual([key[1] for key, _ in stages.dump()["values"]], ["read", "total"])
+
+
+class ExpositionTests(SimpleTestCase):
+    def test_render(self):
+        text = render_metrics({"poller": sample_registry().dump()})
+        self.assertEqual(text.splitlines(), [
+            "# HELP pending Pending.",
+            "# TYPE pending gauge",
+            'pending{source="poller"} 3',
+            "# HELP read_seconds Reads.",
+            "# TYPE read_seconds histogram",
+            'read_seconds_bucket{plc="10.0.0.1",source="poller",le="0.01"} 0',
+            'read_seconds_bucket{plc="10.0.0.1",source="poller",le="0.1"} 1',
+            'read_seconds_bucket{plc="10.0.0.1",source="poller",le="+Inf"} 1',
+            'read_seconds_sum{plc="10.0.0.1",source="poller"} 0.05',
+            'read_seconds_count{plc="10.0.0.1",source="poller"} 1',
+            "# HELP scans_total Scans.",
+            "# TYPE scans_total counter",
+            'scans_total{station="st1",source="poller"} 1',
+        ])
+
+    def test_sources_share_one_family(self):
+        text = render_metrics({"web": sample_registry().dump(), "poller": sample_registry().dump()})
+        self.assertEqual(text.count("# TYPE pending gauge"), 1)
+        self.assertIn('pending{source="web"} 3', text)
+        self.assertIn('pending{source="poller"} 3', text)
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.counter("c_total", "C.", ["plc"]).inc(plc='a"b\\c\n')
+        self.assertIn('c_total{plc="a\\"b\\\\c\\n",source="x"} 1', render_metrics({"x": registry.dump()}))
+
+    def test_histogram_quantile(self):
+        self.assertIsNone(histogram_quantile(0.5, (1, 2), [0, 0, 0]))
+        self.assertEqual(histogram_quantile(0.5, (1, 2), [2, 2, 0]), 1.0)
+        self.assertEqual(histogram_quantile(0.75, (1, 2), [2, 2, 0]), 1.5)
+        self.assertEqual(histogram_quantile(0.99, (1, 2), [0, 0, 5]), 2)  # Past the last bound
+
+    def test_merge(self):
+        merged = merge_metrics([sample_registry().dump(), sample_registry().dump()])
+        self.assertEqual(merged["scans_total"]["values"], [[["st1"], 2]])
+        self.assertEqual(merged["read_seconds"]["values"], [[["10.0.0.1"], [[0, 2, 0], 0.1, 2]]])
+
+
+class PublishedMetricsTests(TestCase):
+    def publish(self, source, registry, age=0):
+        with mock.patch.object(metrics, "registry", registry):
+            MetricsPublisher(source).publish()
+        MetricsSnapshot.objects.filter(source=source).update(updated_at=timezone.now() - timedelta(seconds=age))
+
+    def test_publish_runs_collectors(self):
+        registry = MetricsRegistry()
+        gauge = registry.gauge("pending", "Pending.")
+        with mock.patch.object(metrics, "registry", registry):
+            MetricsPublisher("poller", collect=[lambda: gauge.set(7)]).publish()
+        self.assertEqual(MetricsSnapshot.objects.get(source="poller").data["pending"]["values"], [[[], 7]])
+
+    def test_metrics_view(self):
+        self.publish("poller", sample_registry())
+        self.publish("old-poller", sample_registry(), age=3600)
+        response = self.client.get(reverse("metrics"))
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = response.content.decode()
+        self.assertIn('scans_total{station="st1",source="poller"} 1', text)
+        self.assertNotIn("old-poller", text)
+        self.assertIn('dashboard_subscribers{source="web"} 0', text)
+        self.assertIn('metrics_snapshot_age_seconds{snapshot="poller",source="web"}', text)
+
+    def test_plc_top_once(self):
+        out = StringIO()
+        call_command("plc_top", "--once", stdout=out)
+        self.assertIn("No metrics published recently", out.getvalue())
+
+        registry = MetricsRegistry()
+        registry.counter("plc_scans_total", "Scans.", ["station", "outcome"]).inc(3, station="st1", outcome="ok")
+        stages = registry.histogram("plc_stage_seconds", "Stages.", ["station", "stage"])
+        stages.observe(0.02, station="st1", stage="total")
+        registry.histogram("plc_trigger_read_seconds", "Polls.", ["plc"]).observe(0.004, plc="192.168.1.100")
+        registry.histogram("db_write_batch_seconds", "Batches.").observe(0.01)
+        registry.counter("db_write_items_total", "Items.").inc(6)
+        self.publish("poller", registry)
+        out = StringIO()
+        call_command("plc_top", "--once", stdout=out)
+        screen = out.getvalue()
+        self.assertIn("sources: poller", screen)
+        self.assertRegex(screen, r"\nst1 +3 +3 ")
+        self.assertRegex(screen, r"\n192\.168\.1\.100 +1 ")
+        self.assertIn("DB writer: 6 items in 1 batches", screen)
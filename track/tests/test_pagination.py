@@ -0,0 +1,108 @@
+from datetime import date, time
+
+from django.test import TestCase
+from django.urls import reverse
+
+from track.models import TraceabilityData
+from track.pagination import KeysetPaginator, bounded_count, decode_cursor, encode_cursor
+
+
+def make_part(part_number, day, moment, shift="Shift 1"):
+    return TraceabilityData.objects.create(part_number=part_number, date=day, time=moment, shift=shift)
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Oldest first; two parts share a timestamp so sr_no breaks the tie
+        cls.parts = [
+            make_part("PDU-S-10594-1-24032500001", date(2025, 3, 24), time(8, 0)),
+            make_part("PDU-S-10594-1-24032500002", date(2025, 3, 24), time(9, 0)),
+            make_part("PDU-S-10594-1-24032500003", date(2025, 3, 24), time(9, 0)),
+            make_part("PDU-S-10594-1-25032500001", date(2025, 3, 25), time(7, 0)),
+            make_part("PDU-S-10594-1-25032500002", date(2025, 3, 25), time(7, 30)),
+        ]
+        cls.newest_first = [part.pk for part in reversed(cls.parts)]
+
+    def setUp(self):
+        self.paginator = KeysetPaginator(TraceabilityData.objects.all(), page_size=2)
+
+    def pks(self, page):
+        return [part.pk for part in page.rows]
+
+    def test_walks_older_then_back_newer(self):
+        first = self.paginator.page()
+        self.assertEqual(self.pks(first), self.newest_first[:2])
+        self.assertEqual((first.has_newer, first.has_older), (False, True))
+        self.assertIsNone(first.newer_cursor)
+
+        second = self.paginator.page(older_than=first.older_cursor)
+        self.assertEqual(self.pks(second), self.newest_first[2:4])
+        self.assertEqual((second.has_newer, second.has_older), (True, True))
+
+        last = self.paginator.page(older_than=second.older_cursor)
+        self.assertEqual(self.pks(last), self.newest_first[4:])
+        self.assertEqual((last.has_newer, last.has_older), (True, False))
+        self.assertIsNone(last.older_cursor)
+
+        back = self.paginator.page(newer_than=last.newer_cursor)
+        self.assertEqual(self.pks(back), self.newest_first[2:4])
+        self.assertEqual((back.has_newer, back.has_older), (True, True))
+
+        top = self.paginator.page(newer_than=back.newer_cursor)
+        self.assertEqual(self.pks(top), self.newest_first[:2])
+        self.assertFalse(top.has_newer)
+
+    def test_page_is_one_query(self):
+        first = self.paginator.page()
+        with self.assertNumQueries(1):
+            self.paginator.page(older_than=first.older_cursor)
+
+    def test_bad_cursor_gives_newest_page(self):
+        self.assertEqual(self.pks(self.paginator.page(older_than="not-a-cursor")), self.newest_first[:2])
+
+    def test_cursor_round_trip(self):
+        part = self.parts[2]
+        self.assertEqual(decode_cursor(encode_cursor(part)), (part.date, part.time, part.sr_no))
+        self.assertIsNone(decode_cursor(None))
+
+    def test_bounded_count(self):
+        queryset = TraceabilityData.objects.all()
+        self.assertEqual(bounded_count(queryset), (5, True))
+        self.assertEqual(bounded_count(queryset, limit=5), (5, True))
+        self.assertEqual(bounded_count(queryset, limit=3), (3, False))
+
+
+class SearchPartsViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parts = [
+            make_part(f"PDU-S-10594-1-240325{n:05d}", date(2025, 3, 24), time(8, n), "Shift 1" if n % 2 else "Shift 2")
+            for n in range(1, 8)
+        ]
+
+    def search(self, **params):
+        response = self.client.get(reverse("search_parts"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context
+
+    def test_pages_follow_filters(self):
+        context = self.search(shift="Shift 1", page_size=2)
+        self.assertEqual([part.pk for part in context["page"].rows], [self.parts[6].pk, self.parts[4].pk])
+        self.assertIn("shift=Shift+1", context["older_query"])
+        older = self.client.get(f"{reverse('search_parts')}?{context['older_query']}").context
+        self.assertEqual([part.pk for part in older["page"].rows], [self.parts[2].pk, self.parts[0].pk])
+        self.assertIsNone(older["older_query"])
+
+    def test_page_size_is_clamped(self):
+        with self.settings(SEARCH_PAGE_SIZE={"default": 3, "max": 5}):
+            self.assertEqual(len(self.search()["page"].rows), 3)
+            self.assertEqual(len(self.search(page_size=100)["page"].rows), 5)
+            self.assertEqual(len(self.search(page_size="x")["page"].rows), 3)
+
+    def test_count_only_on_request(self):
+        context = self.search(shift="Shift 2")
+        self.assertNotIn("result_count", context)
+        self.assertEqual(context["count_query"], "shift=Shift+2&count=1")
+        context = self.search(shift="Shift 2", count=1)
+        self.assertEqual((context["result_count"], context["count_exact"]), (3, True))
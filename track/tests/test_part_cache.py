@@ -0,0 +1,113 @@
+from datetime import date, time
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from track.db_writer import PartCreate, StationUpdate
+from track.models import StationResult, TraceabilityData
+from track.part_cache import PartStateCache
+
+PART = "PDU-S-10594-1-24032500001"
+
+
+class PartStateCacheTests(TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        clock = mock.patch("track.part_cache.time.monotonic", side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        writer = mock.patch("track.part_cache.db_writer")
+        self.writer = writer.start()
+        self.addCleanup(writer.stop)
+        self.cache = PartStateCache(max_parts=2, ttl=60)
+
+    def submitted(self):
+        return [call.args[0] for call in self.writer.submit.call_args_list]
+
+    def create(self, part_number, **kwargs):
+        """First get() of a new part, which queues its record."""
+        with self.assertLogs("track.part_cache", "INFO"):
+            return self.cache.get(part_number, **kwargs)
+
+    def test_first_sight_queues_record(self):
+        state = self.create(PART, get_shift=lambda: "Shift 2")
+        self.assertIsNone(state.result("st1"))
+        [item] = self.submitted()
+        self.assertIsInstance(item, PartCreate)
+        self.assertEqual((item.part_number, item.shift), (PART, "Shift 2"))
+
+    def test_known_part_is_loaded(self):
+        part = TraceabilityData.objects.create(part_number=PART, date=date(2025, 3, 24), time=time(8))
+        StationResult.objects.create(part=part, station="st1", result="OK", timestamp=timezone.now())
+        self.assertEqual(self.cache.get(PART).result("st1"), "OK")
+        self.assertEqual(self.submitted(), [])
+
+    def test_hit_skips_database(self):
+        self.create(PART)
+        with self.assertNumQueries(0):
+            self.cache.get(PART)
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1, "evictions": 0, "size": 1})
+
+    def test_record_updates_memory_and_queues_write(self):
+        self.create(PART)
+        with self.assertNumQueries(0):
+            self.cache.record(PART, "st1", "OK")
+        self.assertEqual(self.cache.get(PART).result("st1"), "OK")
+        item = self.submitted()[-1]
+        self.assertIsInstance(item, StationUpdate)
+        self.assertEqual(item[:3], (PART, "st1", "OK"))
+
+    def test_entries_expire_after_ttl(self):
+        part = TraceabilityData.objects.create(part_number=PART, date=date(2025, 3, 24), time=time(8))
+        self.cache.get(PART)
+        StationResult.objects.create(part=part, station="st1", result="NOT OK", timestamp=timezone.now())  # e.g. admin
+        self.now += 59
+        self.assertIsNone(self.cache.get(PART).result("st1"))
+        self.now += 2
+        self.assertEqual(self.cache.get(PART).result("st1"), "NOT OK")
+        self.assertEqual(self.cache.stats()["misses"], 2)
+
+    def test_least_recently_used_is_evicted(self):
+        parts = [f"PDU-S-10594-1-2403250000{n}" for n in range(1, 4)]
+        self.create(parts[0])
+        self.create(parts[1])
+        self.cache.get(parts[0])  # parts[1] is now the oldest
+        self.create(parts[2])
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+        with self.assertNumQueries(0):
+            self.cache.get(parts[0])
+            self.cache.get(parts[2])
+        with self.assertLogs("track.part_cache", "INFO"), self.assertNumQueries(1):
+            self.cache.get(parts[1])
+
+    def test_invalidate(self):
+        self.create(PART)
+        self.cache.invalidate(PART)
+        with self.assertLogs("track.part_cache", "INFO"), self.assertNumQueries(1):
+            self.cache.get(PART)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_refresh_reloads_remote_stations(self):
+        part = TraceabilityData.objects.create(part_number=PART, date=date(2025, 3, 24), time=time(8))
+        self.cache.get(PART)
+        StationResult.objects.create(part=part, station="st3", result="OK", timestamp=timezone.now())  # Other worker
+        self.assertIsNone(self.cache.get(PART).result("st3"))
+        self.assertEqual(self.cache.refresh(PART, ["st3", "st4"]).result("st3"), "OK")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cache.get(PART).result("st3"), "OK")
+
+    def test_record_after_expiry_keeps_the_shift(self):
+        self.create(PART, get_shift=lambda: "Shift 2")
+        self.now += 61  # Expired between resolve_scan's read and its record
+        with self.assertLogs("track.part_cache", "INFO"):
+            self.cache.record(PART, "st1", "OK", get_shift=lambda: "Shift 2")
+        creates = [item for item in self.submitted() if isinstance(item, PartCreate)]
+        self.assertEqual([item.shift for item in creates], ["Shift 2", "Shift 2"])
+
+    def test_refresh_after_eviction_keeps_the_shift(self):
+        with self.assertLogs("track.part_cache", "INFO"):
+            self.cache.refresh(PART, ["st1"], get_shift=lambda: "Shift 3")
+        [item] = self.submitted()
+        self.assertEqual(item.shift, "Shift 3")
@@ -0,0 +1,113 @@
+from datetime import date, time
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from track.db_writer import PartCreate, apply_batch
+from track.models import PartNumberIndex, PartNumberTrigram, TraceabilityData
+from track.part_search import parse_part_number, search_part_numbers, trigrams
+
+PART_NUMBERS = (
+    "PDU-S-10594-1-24032500001",
+    "PDU-S-10594-1-24032500002",
+    "PDU-S-10595-2-25032500017",
+    "ABC-S-20001-1-24032500003",
+)
+
+
+class ParseTests(TestCase):
+    def test_components(self):
+        self.assertEqual(
+            parse_part_number("PDU-S-10594-1-24032500012"),
+            {
+                "prefix": "PDU-S-10594-1",
+                "family": "PDU",
+                "model_number": "10594",
+                "revision": "1",
+                "code_date": date(2025, 3, 24),
+                "serial": "00012",
+            },
+        )
+
+    def test_bad_date_still_parses(self):
+        self.assertIsNone(parse_part_number("PDU-S-10594-1-99999900012")["code_date"])
+
+    def test_not_a_qr(self):
+        self.assertIsNone(parse_part_number("hello"))
+        self.assertIsNone(parse_part_number("PDU-S-10594-1-2403250001"))  # One digit short
+
+    def test_trigrams(self):
+        self.assertEqual(trigrams("abcd"), {"ABC", "BCD"})
+        self.assertEqual(trigrams("ab"), set())
+
+
+class SearchPartNumbersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for part_number in PART_NUMBERS:
+            TraceabilityData.objects.create(part_number=part_number, date=date(2025, 3, 24), time=time(8, 0))
+
+    def search(self, query):
+        return sorted(search_part_numbers(TraceabilityData.objects.all(), query).values_list("part_number", flat=True))
+
+    def test_full_qr_is_exact(self):
+        self.assertEqual(self.search("pdu-s-10594-1-24032500002 "), ["PDU-S-10594-1-24032500002"])
+        self.assertEqual(self.search("PDU-S-10594-1-24032500009"), [])
+
+    def test_leading_fragment(self):
+        self.assertEqual(self.search("PDU-S-10594"), ["PDU-S-10594-1-24032500001", "PDU-S-10594-1-24032500002"])
+        self.assertEqual(len(self.search("PDU")), 3)
+
+    def test_trigram_fragment(self):
+        self.assertEqual(
+            self.search("240325"),
+            ["ABC-S-20001-1-24032500003", "PDU-S-10594-1-24032500001", "PDU-S-10594-1-24032500002"],
+        )
+        self.assertEqual(self.search("0017"), ["PDU-S-10595-2-25032500017"])
+        self.assertEqual(self.search("99999"), [])
+
+    def test_trigram_candidates_are_confirmed(self):
+        # Every trigram of "2500001" occurs in ...2500017, but not the whole string
+        self.assertEqual(self.search("2500001"), ["PDU-S-10594-1-24032500001"])
+
+    def test_short_query(self):
+        self.assertEqual(self.search("17"), ["PDU-S-10595-2-25032500017"])
+
+    def test_blank_query_matches_all(self):
+        self.assertEqual(len(self.search("  ")), 4)
+
+    def test_index_follows_renames(self):
+        part = TraceabilityData.objects.get(part_number="ABC-S-20001-1-24032500003")
+        part.part_number = "ABC-S-20001-1-24032500777"
+        part.save()
+        self.assertEqual(self.search("0777"), ["ABC-S-20001-1-24032500777"])
+        self.assertEqual(self.search("500003"), [])
+        self.assertEqual(part.number_index.serial, "00777")
+
+    def test_parts_created_by_db_writer_are_indexed(self):
+        with transaction.atomic():
+            apply_batch([PartCreate("XYZ-S-30000-4-01012500042", date(2025, 1, 1), time(8), "Shift 1")])
+        self.assertEqual(self.search("500042"), ["XYZ-S-30000-4-01012500042"])
+
+    def test_search_page_filters(self):
+        response = self.client.get(reverse("search_parts"), {"part_number": "0594"})
+        self.assertEqual(len(response.context["page"].rows), 2)
+        response = self.client.get(reverse("search_parts"), {"code_date": "2025-03-25"})
+        self.assertEqual([part.part_number for part in response.context["page"].rows], ["PDU-S-10595-2-25032500017"])
+
+
+class RebuildIndexCommandTests(TestCase):
+    def test_rebuild(self):
+        for part_number in PART_NUMBERS:
+            TraceabilityData.objects.create(part_number=part_number, date=date(2025, 3, 24), time=time(8, 0))
+        expected = set(PartNumberTrigram.objects.values_list("part_id", "trigram"))
+        PartNumberIndex.objects.all().delete()
+        PartNumberTrigram.objects.filter(part__part_number=PART_NUMBERS[0]).delete()
+        out = StringIO()
+        call_command("rebuild_part_search_index", "--batch-size", "3", stdout=out)
+        self.assertIn("Indexed 4 part numbers", out.getvalue())
+        self.assertEqual(PartNumberIndex.objects.count(), 4)
+        self.assertEqual(set(PartNumberTrigram.objects.values_list("part_id", "trigram")), expected)
@@ -0,0 +1,126 @@
+import socket
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from track.models import BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN
+from track.plc_breaker import BreakerBoard, CircuitBreaker, CircuitOpenError
+from track.plc_utils import connect_to_plc
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("track.plc_breaker.time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker("192.168.1.99", failure_threshold=3, base_delay=1.0, max_delay=4.0, jitter=0)
+
+    def trip(self):
+        with self.assertLogs("track.plc_breaker", "WARNING"):
+            for _ in range(self.breaker.failure_threshold):
+                self.breaker.failure("timed out")
+
+    def test_opens_after_threshold(self):
+        self.breaker.failure("timed out")
+        self.breaker.failure("timed out")
+        self.assertEqual(self.breaker.state, BREAKER_CLOSED)
+        self.assertTrue(self.breaker.allow())
+        with self.assertLogs("track.plc_breaker", "WARNING"):
+            self.breaker.failure("timed out")
+        self.assertEqual(self.breaker.state, BREAKER_OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.retry_in(), 1.0)
+
+    def test_success_resets_failure_count(self):
+        self.breaker.failure("timed out")
+        self.breaker.failure("timed out")
+        self.breaker.success()
+        self.breaker.failure("timed out")
+        self.assertEqual(self.breaker.state, BREAKER_CLOSED)
+
+    def test_check_fails_fast_while_open(self):
+        self.trip()
+        self.now += 0.4
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.breaker.check()
+        self.assertAlmostEqual(raised.exception.retry_in, 0.6)
+        self.assertIsInstance(raised.exception, ConnectionError)
+
+    def test_half_open_admits_one_trial(self):
+        self.trip()
+        self.now += 1.0
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, BREAKER_HALF_OPEN)
+        self.assertFalse(self.breaker.allow())  # Others wait for the trial's result
+
+    def test_trial_success_closes(self):
+        self.trip()
+        self.now += 1.0
+        self.breaker.allow()
+        with self.assertLogs("track.plc_breaker", "INFO"):
+            self.breaker.success()
+        self.assertEqual(self.breaker.state, BREAKER_CLOSED)
+        self.assertEqual(self.breaker.retry_in(), 0.0)
+        self.assertTrue(self.breaker.allow())
+
+    def test_trial_failure_doubles_delay_up_to_max(self):
+        self.trip()
+        delays = []
+        for _ in range(4):
+            self.now += self.breaker.retry_in()
+            self.assertTrue(self.breaker.allow())
+            with self.assertLogs("track.plc_breaker", "WARNING"):
+                self.breaker.failure("refused")
+            self.assertEqual(self.breaker.state, BREAKER_OPEN)
+            delays.append(self.breaker.retry_in())
+        self.assertEqual(delays, [2.0, 4.0, 4.0, 4.0])
+
+    def test_lost_trial_lets_another_caller_try(self):
+        self.trip()
+        self.now += 1.0
+        self.assertTrue(self.breaker.allow())
+        self.now += 1.0  # The trial never reported back
+        self.assertTrue(self.breaker.allow())
+
+    def test_jitter_shortens_delay(self):
+        breaker = CircuitBreaker("192.168.1.98", failure_threshold=1, base_delay=2.0, jitter=0.5)
+        with mock.patch("track.plc_breaker.random.uniform", return_value=0.5), self.assertLogs("track.plc_breaker"):
+            breaker.failure("refused")
+        self.assertEqual(breaker.retry_in(), 1.0)
+
+
+class BreakerBoardTests(SimpleTestCase):
+    def test_one_breaker_per_controller(self):
+        with self.settings(PLC_BREAKER={"failure_threshold": 7}):
+            board = BreakerBoard()
+            breaker = board.get("192.168.1.10")
+        self.assertIs(board.get("192.168.1.10"), breaker)
+        self.assertIsNot(board.get("192.168.1.11"), breaker)
+        self.assertEqual(breaker.failure_threshold, 7)
+
+
+class ConnectThroughBreakerTests(SimpleTestCase):
+    def setUp(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]  # Nothing listens here once closed
+        self.board = BreakerBoard()
+        for patcher in (
+            mock.patch("track.plc_utils.plc_breakers", self.board),
+            mock.patch("track.plc_utils.plc_port", return_value=port),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_open_breaker_fails_fast(self):
+        with self.settings(PLC_BREAKER={"failure_threshold": 2, "jitter": 0}):
+            with self.assertLogs("track", "ERROR"):
+                for _ in range(2):
+                    with self.assertRaises(ConnectionError):
+                        connect_to_plc("127.0.0.1", attempts=1)
+        self.assertEqual(self.board.get("127.0.0.1").state, BREAKER_OPEN)
+        with mock.patch("track.plc_utils.pymcprotocol.Type3E") as client:
+            with self.assertRaises(CircuitOpenError):
+                connect_to_plc("127.0.0.1", attempts=1)
+        client.assert_not_called()
@@ -0,0 +1,177 @@
+import asyncio
+import struct
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from track.db_writer import ScanLog
+from track.plc_engine import PollingEngine, StationSchedule
+from track.plc_utils import TRIGGER_CLEARED, read_station, resolve_scan, send_ack
+from track.station_registry import RegistrySnapshot, StationConfig
+
+PART = "PDU-S-10594-1-24032500001"
+REGISTRY = RegistrySnapshot.build(1, [
+    StationConfig("st1", "192.168.1.100", 5007, qr=5100, result=5154, scan_trigger=5156, write_signal=5158),
+    StationConfig("st3", "192.168.1.20", 5007, qr=5300, result=5354, scan_trigger=5356, write_signal=5358),
+    StationConfig("st4", "192.168.1.20", 5007, qr=5400, result=5454, scan_trigger=5456, write_signal=5458),
+])
+
+
+def qr_words(text):
+    data = text.encode("ascii").ljust(60, b"\x00")
+    return list(struct.unpack("<30H", data))
+
+
+class StationScheduleTests(SimpleTestCase):
+    def setUp(self):
+        self.schedule = StationSchedule(min_interval=0.05, max_interval=0.5, backoff=2, active_hold=10)
+
+    def test_rising_edge_only(self):
+        self.assertFalse(self.schedule.observe(0, now=0))
+        self.assertTrue(self.schedule.observe(1, now=1))
+        self.assertFalse(self.schedule.observe(1, now=2))  # Still the same scan
+        self.assertFalse(self.schedule.observe(0, now=3))
+        self.assertTrue(self.schedule.observe(1, now=4))
+
+    def test_handled_rearms_edge(self):
+        self.assertTrue(self.schedule.observe(1, now=0))
+        self.schedule.handled(now=1)
+        self.assertTrue(self.schedule.observe(1, now=2))  # A new scan raised before we saw the 0
+
+    def test_backs_off_when_idle_up_to_max(self):
+        intervals = [self.schedule.next_interval(now) for now in range(5)]
+        self.assertEqual(intervals, [0.1, 0.2, 0.4, 0.5, 0.5])
+
+    def test_min_interval_while_active(self):
+        for now in range(4):
+            self.schedule.next_interval(now)
+        self.schedule.observe(1, now=100)
+        self.assertEqual(self.schedule.next_interval(105), 0.05)
+        self.schedule.handled(now=106)
+        self.assertEqual(self.schedule.next_interval(115), 0.05)
+        self.assertEqual(self.schedule.next_interval(117), 0.1)  # Hold over, backing off again
+
+    def test_station_rates_override_default(self):
+        rates = {"default": {"min": 0.1, "max": 1.0}, "st3": {"max": 0.2}}
+        with self.settings(PLC_POLL_RATES=rates):
+            st1 = StationSchedule.for_station("st1")
+            st3 = StationSchedule.for_station("st3")
+        self.assertEqual((st1.min_interval, st1.max_interval), (0.1, 1.0))
+        self.assertEqual((st3.min_interval, st3.max_interval), (0.1, 0.2))
+
+    def test_default_idle_interval_keeps_ack_under_200ms(self):
+        self.assertLessEqual(StationSchedule.for_station("st1").max_interval, 0.15)
+
+
+class ScriptedEngine(PollingEngine):
+    """PollingEngine whose PLC and DB calls return scripted results instead of doing I/O."""
+
+    def __init__(self, results):
+        super().__init__({})
+        self.results = results
+        self.calls = []
+
+    async def call_io(self, plc_ip, func, *args):
+        return self.answer(func)
+
+    async def call_db(self, func, *args):
+        return self.answer(func)
+
+    def answer(self, func):
+        self.calls.append(func)
+        result = self.results[func]
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+
+@mock.patch("track.plc_engine.current_registry", mock.Mock(return_value=REGISTRY))
+class HandshakeLogTests(SimpleTestCase):
+    def handle(self, results):
+        engine = ScriptedEngine(results)
+        self.addCleanup(engine._db_executor.shutdown)
+        with mock.patch("track.plc_engine.db_writer") as writer:
+            asyncio.run(engine.handle_station("192.168.1.100", "st1"))
+        [item] = [call.args[0] for call in writer.submit.call_args_list]
+        self.assertIsInstance(item, ScanLog)
+        return engine, item
+
+    def test_saved_scan(self):
+        engine, item = self.handle({read_station: (qr_words(PART), 1), resolve_scan: 4, send_ack: True})
+        self.assertEqual(engine.calls, [read_station, resolve_scan, send_ack])
+        self.assertEqual((item.station, item.part_number, item.result_word), ("st1", PART, 1))
+        self.assertEqual((item.signal, item.outcome), (4, "ok"))
+        for timing in (item.read_ms, item.resolve_ms, item.ack_ms, item.total_ms):
+            self.assertGreaterEqual(timing, 0)
+
+    def test_outcome_follows_signal(self):
+        _, item = self.handle({read_station: (qr_words(PART), 0), resolve_scan: 5, send_ack: True})
+        self.assertEqual((item.signal, item.outcome), (5, "interlock"))
+
+    def test_read_failed(self):
+        engine, item = self.handle({read_station: None})
+        self.assertEqual(engine.calls, [read_station])
+        self.assertEqual((item.outcome, item.part_number, item.resolve_ms), ("no_read", "", None))
+
+    def test_trigger_cleared_is_not_a_read_error(self):
+        errors = mock.Mock()
+        with mock.patch("track.plc_engine.PLC_READ_ERRORS", errors):
+            engine, item = self.handle({read_station: TRIGGER_CLEARED})
+        self.assertEqual(engine.calls, [read_station])
+        self.assertEqual((item.outcome, item.signal), ("cleared", None))
+        errors.inc.assert_not_called()
+
+    def test_ack_failed(self):
+        _, item = self.handle({read_station: (qr_words(PART), 1), resolve_scan: 4, send_ack: False})
+        self.assertEqual((item.signal, item.outcome), (4, "ack_failed"))
+
+    def test_timeout_outcome(self):
+        engine = ScriptedEngine({read_station: asyncio.TimeoutError()})
+        self.addCleanup(engine._db_executor.shutdown)
+        with mock.patch("track.plc_engine.db_writer") as writer, self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(engine.handle_station("192.168.1.100", "st1"))
+        self.assertEqual(writer.submit.call_args.args[0].outcome, "timeout")
+
+
+@mock.patch("track.plc_engine.plc_pool")
+@mock.patch("track.plc_engine.current_registry", mock.Mock(return_value=REGISTRY))
+class EngineUpdateTests(SimpleTestCase):
+    def run_update(self, groups, new_groups):
+        """Start tasks for `groups`, switch to `new_groups`; returns the tasks before and after."""
+        engine = PollingEngine(groups)
+        self.addCleanup(engine._db_executor.shutdown)
+
+        async def poll_forever(plc_ip, stations):
+            await asyncio.Event().wait()
+
+        async def scenario():
+            engine._loop = asyncio.get_running_loop()
+            engine._reconcile()
+            before = dict(engine._tasks)
+            engine.update(new_groups)
+            await asyncio.sleep(0)  # Let the scheduled _reconcile run
+            await asyncio.sleep(0)  # and the cancelled tasks finish
+            after = dict(engine._tasks)
+            for task in after.values():
+                task.cancel()
+            await asyncio.gather(*after.values(), return_exceptions=True)
+            return before, after
+
+        with mock.patch.object(engine, "poll_controller", poll_forever), self.assertLogs("track.plc_engine", "INFO"):
+            return asyncio.run(scenario())
+
+    def test_only_changed_controllers_restart(self, pool):
+        before, after = self.run_update(
+            {"192.168.1.100": ["st1"], "192.168.1.20": ["st3", "st4"]},
+            {"192.168.1.100": ["st1"], "192.168.1.20": ["st3"]},
+        )
+        self.assertIs(after["192.168.1.100"], before["192.168.1.100"])
+        self.assertIsNot(after["192.168.1.20"], before["192.168.1.20"])
+        self.assertTrue(before["192.168.1.20"].cancelled())
+        pool.abort.assert_called_once_with("192.168.1.20")
+
+    def test_removed_controller_stops(self, pool):
+        groups = {"192.168.1.100": ["st1"], "192.168.1.20": ["st3", "st4"]}
+        before, after = self.run_update(groups, {"192.168.1.100": ["st1"]})
+        self.assertEqual(list(after), ["192.168.1.100"])
+        self.assertTrue(before["192.168.1.20"].cancelled())
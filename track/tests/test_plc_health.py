@@ -0,0 +1,163 @@
+import socket
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from track.models import BREAKER_CLOSED, BREAKER_OPEN, PLC_CONNECTED, PLC_DISCONNECTED, PLCStatus
+from track.plc_breaker import BreakerBoard
+from track.plc_health import PLCHealthProber, probe_plc, start_health_prober
+from track.station_registry import current_registry
+
+
+def listening_socket():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen()
+    return sock
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def private_breakers(test):
+    """Give the test its own circuit breakers instead of those shared by this process."""
+    board = BreakerBoard()
+    patcher = mock.patch("track.plc_health.plc_breakers", board)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return board
+
+
+class ProbeTests(TestCase):
+    def setUp(self):
+        self.breakers = private_breakers(self)
+
+    def test_reachable(self):
+        with listening_socket() as sock:
+            connected, rtt_ms, error = probe_plc("127.0.0.1", sock.getsockname()[1], timeout=1)
+        self.assertTrue(connected)
+        self.assertGreaterEqual(rtt_ms, 0)
+        self.assertEqual(error, "")
+
+    def test_unreachable(self):
+        connected, rtt_ms, error = probe_plc("127.0.0.1", closed_port(), timeout=1)
+        self.assertEqual((connected, rtt_ms), (False, None))
+        self.assertTrue(error)
+
+    def test_probe_all_probes_every_controller(self):
+        prober = PLCHealthProber({"127.0.0.1": ["st1"], "127.0.0.2": ["st2"]}, timeout=1)
+        self.addCleanup(prober.stop)
+        with listening_socket() as sock:
+            ports = {"127.0.0.1": sock.getsockname()[1], "127.0.0.2": closed_port()}
+            with mock.patch("track.plc_health.plc_port", ports.get):
+                results = prober.probe_all()
+        self.assertTrue(results["127.0.0.1"][0])
+        self.assertFalse(results["127.0.0.2"][0])
+
+    def test_open_breaker_skips_the_probe(self):
+        prober = PLCHealthProber({"127.0.0.1": ["st1"]}, timeout=1)
+        self.addCleanup(prober.stop)
+        breaker = self.breakers.get("127.0.0.1")
+        with self.assertLogs("track.plc_breaker", "WARNING"):
+            for _ in range(breaker.failure_threshold):
+                breaker.failure("refused")
+        with mock.patch("track.plc_health.probe_plc") as probe:
+            self.assertEqual(prober.probe("127.0.0.1"), (False, None, "refused"))
+        probe.assert_not_called()
+
+    def test_successful_trial_closes_the_breaker(self):
+        prober = PLCHealthProber({"127.0.0.1": ["st1"]}, timeout=1)
+        self.addCleanup(prober.stop)
+        breaker = self.breakers.get("127.0.0.1")
+        with self.assertLogs("track.plc_breaker", "WARNING"):
+            for _ in range(breaker.failure_threshold):
+                breaker.failure("refused")
+        breaker.retry_at = 0.0  # Trial due
+        with listening_socket() as sock, mock.patch("track.plc_health.plc_port", return_value=sock.getsockname()[1]):
+            with self.assertLogs("track.plc_breaker", "INFO"):
+                self.assertTrue(prober.probe("127.0.0.1")[0])
+        self.assertEqual(breaker.state, BREAKER_CLOSED)
+
+
+class StartHealthProberTests(TestCase):
+    @mock.patch.object(PLCHealthProber, "start")
+    def test_probes_the_given_shard_only(self, start):
+        with self.assertLogs("track.plc_health", "INFO"):
+            prober = start_health_prober({"192.168.1.20": ["st3", "st4"]})
+        self.addCleanup(prober.stop)
+        self.assertEqual(prober.groups, {"192.168.1.20": ["st3", "st4"]})
+        start.assert_called_once_with()
+
+    @mock.patch.object(PLCHealthProber, "start")
+    def test_defaults_to_the_whole_registry(self, start):
+        with self.assertLogs("track.plc_health", "INFO"):
+            prober = start_health_prober()
+        self.addCleanup(prober.stop)
+        self.assertEqual(prober.groups, current_registry().groups())
+
+
+class RecordTests(TestCase):
+    def setUp(self):
+        self.breakers = private_breakers(self)
+        self.prober = PLCHealthProber({"192.168.1.20": ["st3", "st4"]})
+        self.addCleanup(self.prober.stop)
+
+    def test_creates_then_updates_row(self):
+        self.prober.record({"192.168.1.20": (True, 1.5, "")})
+        row = PLCStatus.objects.get()
+        self.assertEqual((row.state, row.stations, row.rtt_ms), (PLC_CONNECTED, "st3,st4", 1.5))
+        self.assertEqual(row.station_list(), ["st3", "st4"])
+        first_change = row.last_change
+
+        self.prober.record({"192.168.1.20": (True, 2.0, "")})
+        row.refresh_from_db()
+        self.assertEqual(row.last_change, first_change)  # No flip, no new last_change
+        self.assertEqual(row.rtt_ms, 2.0)
+
+    def test_state_flip_stamps_last_change(self):
+        self.prober.record({"192.168.1.20": (True, 1.5, "")})
+        first_change = PLCStatus.objects.get().last_change
+        with self.assertLogs("track.plc_health", "WARNING"):
+            self.prober.record({"192.168.1.20": (False, None, "timed out")})
+        row = PLCStatus.objects.get()
+        self.assertEqual((row.state, row.error), (PLC_DISCONNECTED, "timed out"))
+        self.assertGreater(row.last_change, first_change)
+        with self.assertLogs("track.plc_health", "INFO"):
+            self.prober.record({"192.168.1.20": (True, 1.0, "")})
+        self.assertEqual(PLCStatus.objects.get().state, PLC_CONNECTED)
+
+    def test_breaker_state_is_recorded(self):
+        breaker = self.breakers.get("192.168.1.20")
+        with self.assertLogs("track.plc_breaker", "WARNING"):
+            for _ in range(breaker.failure_threshold):
+                breaker.failure("refused")
+        self.prober.record({"192.168.1.20": (False, None, "refused")})
+        row = PLCStatus.objects.get()
+        self.assertEqual(row.breaker, BREAKER_OPEN)
+        self.assertGreater(row.retry_at, row.last_checked)
+
+
+class PLCStatusViewTests(TestCase):
+    def status(self, ip, state, age=0):
+        checked = timezone.now() - timedelta(seconds=age)
+        PLCStatus.objects.create(plc_ip=ip, stations="", state=state, last_change=checked, last_checked=checked)
+
+    def test_reads_table_without_probing(self):
+        registry = current_registry()
+        self.status(registry.station("st1").plc_ip, PLC_CONNECTED)
+        self.status(registry.station("st3").plc_ip, PLC_CONNECTED, age=60)  # Prober stopped writing
+        with mock.patch("track.plc_health.socket.create_connection") as connect:
+            data = self.client.get(reverse("plc_statuses")).json()
+        connect.assert_not_called()
+        self.assertEqual(data["plc_statuses"]["St 1"], PLC_CONNECTED)
+        self.assertEqual(data["plc_statuses"]["St 3 & 4"], PLC_DISCONNECTED)
+        self.assertTrue(data["details"]["St 3 & 4"]["stale"])
+        self.assertIsNone(data["details"]["St 2"]["last_checked"])  # Never probed
+        self.assertEqual(data["connected_count"], 1)
+        self.assertEqual(data["connected_count"] + data["disconnected_count"], len(data["plc_statuses"]))
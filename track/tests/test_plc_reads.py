@@ -0,0 +1,134 @@
+from django.test import SimpleTestCase, TestCase
+
+from track.plc_utils import (
+    TRIGGER_CLEARED,
+    RegisterBlock,
+    plan_reads,
+    read_blocks,
+    read_station,
+    station_read_plan,
+    write_registers,
+)
+from track.station_registry import StationConfig, current_registry
+
+
+class FakeMC:
+    """D register memory answering like pymcprotocol.Type3E; records each request."""
+
+    def __init__(self, words=None, short_reads=(), failing_reads=()):
+        self.words = dict(words or {})
+        self.short_reads = set(short_reads)
+        self.failing_reads = set(failing_reads)
+        self.reads = []
+        self.writes = []
+
+    def batchread_wordunits(self, headdevice, readsize):
+        start = int(headdevice[1:])
+        self.reads.append((start, readsize))
+        if start in self.failing_reads:
+            raise OSError("connection reset")
+        if start in self.short_reads:
+            readsize -= 1
+        return [self.words.get(start + i, 0) for i in range(readsize)]
+
+    def batchwrite_wordunits(self, headdevice, values):
+        start = int(headdevice[1:])
+        self.writes.append(("batch", start, list(values)))
+        self.words.update((start + i, value) for i, value in enumerate(values))
+
+    def randomwrite(self, word_devices, word_values, dword_devices, dword_values):
+        self.writes.append(("random", list(word_devices), list(word_values)))
+        self.words.update((int(device[1:]), value) for device, value in zip(word_devices, word_values))
+
+
+class PlanReadsTests(SimpleTestCase):
+    def test_merges_fields_within_gap(self):
+        blocks = plan_reads({"qr": (100, 30), "result": (130, 1), "scan_trigger": (132, 1)}, max_gap=4)
+        self.assertEqual(blocks, [RegisterBlock(100, 33, {"qr": (0, 30), "result": (30, 1), "scan_trigger": (32, 1)})])
+
+    def test_splits_on_gap(self):
+        blocks = plan_reads({"a": (0, 2), "b": (10, 1)}, max_gap=4)
+        self.assertEqual(blocks, [RegisterBlock(0, 2, {"a": (0, 2)}), RegisterBlock(10, 1, {"b": (0, 1)})])
+
+    def test_splits_on_max_words(self):
+        blocks = plan_reads({"a": (0, 8), "b": (8, 8)}, max_gap=4, max_words=10)
+        self.assertEqual([(block.start, block.size) for block in blocks], [(0, 8), (8, 8)])
+
+    def test_orders_by_address_and_handles_overlap(self):
+        blocks = plan_reads({"late": (20, 2), "inner": (2, 1), "outer": (0, 10)}, max_gap=20)
+        self.assertEqual(blocks, [RegisterBlock(0, 22, {"outer": (0, 10), "inner": (2, 1), "late": (20, 2)})])
+
+    def test_empty(self):
+        self.assertEqual(plan_reads({}), [])
+
+
+
+class StationReadPlanTests(TestCase):
+    def test_station_is_one_read(self):
+        for config in current_registry().stations.values():
+            self.assertEqual(len(station_read_plan(config)), 1, config.name)
+
+    def test_plan_follows_register_edits(self):
+        config = StationConfig("st1", "192.168.1.100", 5007, qr=5100, result=5154, scan_trigger=5156, write_signal=5158)
+        self.assertEqual(station_read_plan(config)[0].start, 5100)
+        moved = config._replace(qr=6100, result=6154, scan_trigger=6156)
+        self.assertEqual(station_read_plan(moved)[0].start, 6100)
+
+
+class ReadStationTests(TestCase):
+    def setUp(self):
+        self.config = current_registry().station("st1")
+
+    def test_triggered_scan(self):
+        mc = FakeMC({self.config.qr: 0x4450, self.config.result: 1, self.config.scan_trigger: 1})
+        qr, result = read_station(mc, self.config.plc_ip, "st1")
+        self.assertEqual((qr[:2], result), ([0x4450, 0], 1))
+        self.assertEqual(mc.writes, [])
+
+    def test_trigger_withdrawn_before_the_read(self):
+        mc = FakeMC({self.config.result: 1})
+        with self.assertLogs("track.plc_utils", "INFO"):
+            self.assertIs(read_station(mc, self.config.plc_ip, "st1"), TRIGGER_CLEARED)
+        self.assertEqual(mc.writes, [])  # Nothing to clear
+
+    def test_failed_read_clears_the_trigger(self):
+        mc = FakeMC({self.config.scan_trigger: 1}, failing_reads={self.config.qr})
+        with self.assertLogs("track.plc_utils", "WARNING"):
+            self.assertIsNone(read_station(mc, self.config.plc_ip, "st1"))
+        self.assertEqual(mc.words[self.config.scan_trigger], 0)
+
+
+class ReadBlocksTests(SimpleTestCase):
+    def setUp(self):
+        self.blocks = plan_reads({"qr": (100, 3), "result": (103, 1), "scan_trigger": (200, 1)}, max_gap=4)
+
+    def test_slices_fields_out_of_blocks(self):
+        mc = FakeMC({100: 65, 101: 66, 102: 67, 103: 1, 200: 1})
+        values = read_blocks(mc, self.blocks)
+        self.assertEqual(values, {"qr": [65, 66, 67], "result": [1], "scan_trigger": [1]})
+        self.assertEqual(mc.reads, [(100, 4), (200, 1)])
+
+    def test_short_read_fails_whole_plan(self):
+        self.assertIsNone(read_blocks(FakeMC(short_reads={200}), self.blocks))
+
+    def test_read_error_fails_whole_plan(self):
+        with self.assertLogs("track.plc_utils", "ERROR"):
+            self.assertIsNone(read_blocks(FakeMC(failing_reads={100}), self.blocks))
+
+
+class WriteRegistersTests(SimpleTestCase):
+    def test_contiguous_words_are_one_batch_write(self):
+        mc = FakeMC()
+        self.assertTrue(write_registers(mc, {11: 0, 10: 4}))
+        self.assertEqual(mc.writes, [("batch", 10, [4, 0])])
+
+    def test_scattered_words_are_one_random_write(self):
+        mc = FakeMC()
+        self.assertTrue(write_registers(mc, {5158: 4, 5156: 0}))
+        self.assertEqual(mc.writes, [("random", ["D5158", "D5156"], [4, 0])])
+
+    def test_write_error(self):
+        mc = FakeMC()
+        mc.randomwrite = None
+        with self.assertLogs("track.plc_utils", "ERROR"):
+            self.assertFalse(write_registers(mc, {5158: 4, 5156: 0}))
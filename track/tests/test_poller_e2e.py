@@ -0,0 +1,83 @@
+import socket
+import time
+from collections import Counter
+from unittest import mock
+
+from django.test import TransactionTestCase
+
+from track import station_registry
+from track.db_writer import db_writer
+from track.models import LINE_STATIONS, Controller, Station, StationResult, TraceabilityData
+from track.plc_engine import PollingEngine
+from track.plc_simulator import LineSimulator
+from track.plc_utils import controller_groups
+from track.station_registry import current_registry, reload_registry
+
+
+def free_port(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class PollerEndToEndTests(TransactionTestCase):
+    """Runs the simulated line against the polling engine and checks what reached the database."""
+
+    serialized_rollback = True  # Keep the registry seeded by the migrations for later tests
+    stations = LINE_STATIONS[:3]
+
+    def setUp(self):
+        # The engine reads the registry snapshot of this process; give the test its own
+        patcher = mock.patch.object(station_registry, "_snapshot", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        Station.objects.exclude(name__in=self.stations).update(enabled=False)
+        port = free_port("127.0.0.2")
+        controllers = Controller.objects.filter(stations__name__in=self.stations).distinct().order_by("pk")
+        for i, controller in enumerate(controllers, start=2):
+            controller.ip, controller.port = f"127.0.0.{i}", port
+            controller.save()
+        with self.assertLogs("track.station_registry", "INFO"):
+            reload_registry()
+        registry = current_registry()
+        self.addresses = {
+            tuple(group): (plc_ip, registry.port(plc_ip)) for plc_ip, group in registry.groups(self.stations).items()
+        }
+
+    def run_line(self, profile, duration):
+        simulator = LineSimulator(self.addresses, self.stations, profile, seed=7)
+        simulator.start()
+        engine = PollingEngine(controller_groups(self.stations))
+        engine.start()
+        try:
+            time.sleep(duration)
+            simulator.profile["rate"] = 1e-6  # Stop feeding and let the parts in flight finish the line
+            time.sleep(3)
+        finally:
+            engine.stop(30)  # Also drains the DB writer
+            simulator.stop(10)
+        return simulator.stats()
+
+    def test_scans_are_acked_and_stored(self):
+        with self.assertLogs("track", "INFO"):
+            stats = self.run_line({"rate": 4, "ok_ratio": 0.8, "invalid_ratio": 0}, duration=3)
+
+        self.assertGreater(stats["parts_entered"], 0)
+        self.assertEqual(db_writer.stats()["pending"], 0)
+        self.assertEqual(TraceabilityData.objects.count(), stats["parts_entered"])
+        stored = Counter(StationResult.objects.values_list("station", "result"))
+        for station in self.stations:
+            acks = stats["stations"][station]
+            self.assertEqual(acks["timeouts"], 0, station)
+            self.assertEqual(acks["waiting"], 0, station)
+            # Every scan was saved (4 OK, 1 NOT OK); parts failing a station go no further
+            self.assertEqual(set(acks["signals"]) - {1, 4}, set(), station)
+            self.assertEqual(stored[(station, "OK")], acks["signals"].get(4, 0), station)
+            self.assertEqual(stored[(station, "NOT OK")], acks["signals"].get(1, 0), station)
+        first = stats["stations"][self.stations[0]]["signals"]
+        self.assertEqual(sum(first.values()), stats["parts_entered"])
+        last = self.stations[-1]
+        self.assertEqual(
+            TraceabilityData.objects.filter(station_results__station=last, station_results__result="OK").count(),
+            stats["stations"][last]["signals"].get(4, 0),
+        )
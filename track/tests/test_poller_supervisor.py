@@ -0,0 +1,158 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from track.metrics import MetricsRegistry
+from track.poller_supervisor import PollerSupervisor, shard_controllers
+
+GROUPS = {
+    "192.168.1.100": ["st1"],
+    "192.168.1.130": ["st2"],
+    "192.168.1.150": ["st3", "st4"],
+    "192.168.1.160": ["st5", "st6", "st7"],
+}
+
+
+class FakeProcess:
+    def __init__(self, alive=True, exitcode=None):
+        self.alive = alive
+        self.exitcode = exitcode
+        self.pid = 4242
+        self.killed = False
+
+    def is_alive(self):
+        return self.alive
+
+    def join(self, timeout=None):
+        pass
+
+    def kill(self):
+        self.killed = True
+        self.alive = False
+
+
+class ShardControllersTests(SimpleTestCase):
+    def test_balanced_by_station_count(self):
+        shards = shard_controllers(GROUPS, 2)
+        self.assertEqual(shards, [
+            {"192.168.1.160": ["st5", "st6", "st7"], "192.168.1.130": ["st2"]},
+            {"192.168.1.150": ["st3", "st4"], "192.168.1.100": ["st1"]},
+        ])
+
+    def test_controllers_are_never_split(self):
+        for workers in range(1, 6):
+            shards = shard_controllers(GROUPS, workers)
+            self.assertEqual({ip: group for shard in shards for ip, group in shard.items()}, GROUPS)
+            self.assertEqual(len(shards), min(workers, len(GROUPS)))
+
+    def test_current_shards_are_kept(self):
+        current = [{"192.168.1.100": ["st1"], "192.168.1.150": ["st3", "st4"]}, {"192.168.1.130": ["st2"]}]
+        groups = {**GROUPS, "192.168.1.150": ["st3"]}  # st4 disabled
+        del groups["192.168.1.100"]  # Controller removed
+        self.assertEqual(shard_controllers(groups, 2, current), [
+            {"192.168.1.150": ["st3"], "192.168.1.160": ["st5", "st6", "st7"]},  # Ties go to the first shard
+            {"192.168.1.130": ["st2"]},
+        ])
+
+    def test_at_least_one_worker(self):
+        self.assertEqual(shard_controllers(GROUPS, 0), [GROUPS])
+        self.assertEqual(shard_controllers({}, 2), [{}])
+
+
+@mock.patch("track.poller_supervisor.time.monotonic")
+class RestartBackoffTests(SimpleTestCase):
+    def setUp(self):
+        self.supervisor = PollerSupervisor(GROUPS, workers=1, restart_delay=1.0, max_restart_delay=4.0, stable_after=60)
+        [self.worker] = self.supervisor.workers
+        self.started = []
+        start = mock.patch.object(self.supervisor, "start_worker", side_effect=self.start_worker)
+        start.start()
+        self.addCleanup(start.stop)
+        metrics = MetricsRegistry()
+        patcher = mock.patch("track.poller_supervisor.POLLER_WORKER_RESTARTS", metrics.counter("r", "R.", ["worker"]))
+        self.restarts = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def start_worker(self, worker):
+        self.started.append(self.now)
+        worker.process = FakeProcess()
+        worker.started_at = self.now
+        worker.restart_at = None
+
+    def tick(self, monotonic, now):
+        self.now = monotonic.return_value = now
+        self.supervisor.check()
+
+    def crash(self, monotonic, now):
+        self.worker.process.alive, self.worker.process.exitcode = False, 1
+        with self.assertLogs("track.poller_supervisor", "ERROR"):
+            self.tick(monotonic, now)
+
+    def test_delay_doubles_up_to_the_maximum(self, monotonic):
+        self.now = 0.0
+        self.start_worker(self.worker)
+        delays = []
+        for crash_at in (10.0, 20.0, 30.0, 40.0):
+            self.crash(monotonic, crash_at)
+            delays.append(self.worker.restart_at - crash_at)
+            self.tick(monotonic, crash_at + 5)
+        self.assertEqual(delays, [1.0, 2.0, 4.0, 4.0])
+        self.assertEqual(self.started, [0.0, 15.0, 25.0, 35.0, 45.0])
+        self.assertEqual(self.worker.restarts, 4)
+        self.assertEqual(self.restarts.dump()["values"], [[["poller-1"], 4]])
+
+    def test_restart_waits_for_the_delay(self, monotonic):
+        self.now = 0.0
+        self.start_worker(self.worker)
+        self.worker.delay = 2.0
+        self.crash(monotonic, 10.0)
+        self.assertEqual(self.worker.restart_at, 12.0)
+        self.tick(monotonic, 11.9)
+        self.assertEqual(self.started, [0.0])
+        self.tick(monotonic, 12.0)
+        self.assertEqual(self.started, [0.0, 12.0])
+        self.assertEqual(self.worker.delay, 4.0)
+
+    def test_delay_resets_once_stable(self, monotonic):
+        self.now = 0.0
+        self.start_worker(self.worker)
+        self.worker.delay = 4.0
+        self.tick(monotonic, 59.0)
+        self.assertEqual(self.worker.delay, 4.0)
+        self.tick(monotonic, 60.0)
+        self.assertEqual(self.worker.delay, 1.0)
+
+
+class ShutdownTests(SimpleTestCase):
+    def test_stops_workers_and_kills_stragglers(self):
+        supervisor = PollerSupervisor(GROUPS, workers=3, shutdown_timeout=0)
+        processes = [FakeProcess(), FakeProcess(), FakeProcess(alive=False)]
+        for worker, process in zip(supervisor.workers, processes):
+            worker.process, worker.conn = process, mock.Mock()
+        processes[0].join = lambda timeout=None: setattr(processes[0], "alive", False)  # Drains in time
+        with self.assertLogs("track.poller_supervisor", "INFO") as logs:
+            supervisor.shutdown()
+        self.assertEqual([w.conn.send.called for w in supervisor.workers], [True, True, False])
+        self.assertEqual([p.killed for p in processes], [False, True, False])
+        self.assertIn("Stopped 2 poller workers", logs.output[-1])
+
+    def test_update_sends_every_worker_its_groups(self):
+        supervisor = PollerSupervisor(GROUPS, workers=2)
+        for worker in supervisor.workers:
+            worker.conn = mock.Mock()
+        groups = {**GROUPS, "192.168.1.170": ["st8"]}
+        with self.assertLogs("track.poller_supervisor", "INFO"):
+            supervisor.update(groups)
+        sent = [worker.conn.send.call_args.args[0] for worker in supervisor.workers]
+        self.assertEqual(sent, [worker.groups for worker in supervisor.workers])
+        self.assertEqual(sent[1]["192.168.1.170"], ["st8"])  # The less loaded worker
+
+    def test_collect_sets_worker_gauges(self):
+        supervisor = PollerSupervisor(GROUPS, workers=2)
+        supervisor.workers[0].process = FakeProcess()
+        metrics = MetricsRegistry()
+        up, stations = metrics.gauge("up", "U.", ["worker"]), metrics.gauge("stations", "S.", ["worker"])
+        with mock.patch.multiple("track.poller_supervisor", POLLER_WORKER_UP=up, POLLER_WORKER_STATIONS=stations):
+            supervisor.collect()
+        self.assertEqual(up.dump()["values"], [[["poller-1"], 1], [["poller-2"], 0]])
+        self.assertEqual(stations.dump()["values"], [[["poller-1"], 4], [["poller-2"], 3]])
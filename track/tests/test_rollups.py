@@ -0,0 +1,160 @@
+from datetime import date, datetime, time
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from track.db_writer import PartCreate, StationUpdate, apply_batch
+from track.models import LINE_STATIONS, ShiftRollup, ShiftStationRollup
+from track.rollups import rebuild_rollups, rollup_report
+from track.shifts import ShiftCalendar, shift_calendar
+
+P1 = "PDU-S-10594-1-24032500001"
+P2 = "PDU-S-10594-1-24032500002"
+DAY = date(2025, 3, 24)
+
+
+def local(day, hour, minute=0):
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+def apply(*items):
+    with transaction.atomic():
+        apply_batch(list(items))
+
+
+def station_counts(shift_date, shift, station):
+    return ShiftStationRollup.objects.filter(shift_date=shift_date, shift=shift, station=station).values(
+        "ok_count", "not_ok_count", "first_pass_count", "first_pass_ok", "retest_count"
+    ).get()
+
+
+def started(shift_date, shift):
+    return ShiftRollup.objects.get(shift_date=shift_date, shift=shift).parts_started
+
+
+class ShiftCalendarTests(SimpleTestCase):
+    def setUp(self):
+        self.calendar = ShiftCalendar([("Shift 2", "15:30"), ("Shift 1", "07:00"), ("Shift 3", "23:59")])
+
+    def test_shift_name_boundaries(self):
+        self.assertEqual(self.calendar.shift_name(time(7, 0)), "Shift 1")
+        self.assertEqual(self.calendar.shift_name(time(15, 29)), "Shift 1")
+        self.assertEqual(self.calendar.shift_name(time(15, 30)), "Shift 2")
+        self.assertEqual(self.calendar.shift_name(time(23, 59)), "Shift 3")
+        self.assertEqual(self.calendar.shift_name(time(3, 0)), "Shift 3")
+        self.assertEqual(self.calendar.shift_name(time(6, 59)), "Shift 3")
+
+    def test_night_shift_counts_towards_previous_day(self):
+        self.assertEqual(self.calendar.shift_at(datetime(2025, 3, 25, 2, 0)), (date(2025, 3, 24), "Shift 3"))
+        self.assertEqual(self.calendar.shift_at(datetime(2025, 3, 24, 23, 59)), (date(2025, 3, 24), "Shift 3"))
+        self.assertEqual(self.calendar.shift_at(datetime(2025, 3, 25, 7, 0)), (date(2025, 3, 25), "Shift 1"))
+
+    def test_aware_datetimes_use_local_time(self):
+        utc = datetime(2025, 3, 24, 2, 0, tzinfo=timezone.utc)  # 07:30 in Asia/Kolkata
+        self.assertEqual(self.calendar.shift_at(utc), (date(2025, 3, 24), "Shift 1"))
+
+
+class IncrementalRollupTests(TestCase):
+    def test_parts_started_once_per_part(self):
+        apply(PartCreate(P1, DAY, time(8), "Shift 1"), PartCreate(P1, DAY, time(8), "Shift 1"))
+        apply(PartCreate(P1, DAY, time(8), "Shift 1"), PartCreate(P2, date(2025, 3, 25), time(1), "Shift 3"))
+        self.assertEqual(started(DAY, "Shift 1"), 1)
+        self.assertEqual(started(DAY, "Shift 3"), 1)  # 01:00 on the 25th is the night shift of the 24th
+
+    def test_station_results_first_pass_and_retests(self):
+        apply(PartCreate(P1, DAY, time(8), "Shift 1"), PartCreate(P2, DAY, time(8), "Shift 1"))
+        apply(StationUpdate(P1, "st1", "OK", local(DAY, 8, 5)), StationUpdate(P2, "st1", "NOT OK", local(DAY, 8, 6)))
+        apply(StationUpdate(P2, "st1", "OK", local(DAY, 16)))  # Retest in the next shift
+        self.assertEqual(
+            station_counts(DAY, "Shift 1", "st1"),
+            {"ok_count": 1, "not_ok_count": 1, "first_pass_count": 2, "first_pass_ok": 1, "retest_count": 0},
+        )
+        self.assertEqual(
+            station_counts(DAY, "Shift 2", "st1"),
+            {"ok_count": 1, "not_ok_count": 0, "first_pass_count": 0, "first_pass_ok": 0, "retest_count": 1},
+        )
+
+    def test_finished_parts_counted_in_current_shift(self):
+        apply(PartCreate(P1, DAY, time(8), "Shift 1"), PartCreate(P2, DAY, time(8), "Shift 1"))
+        apply(*[StationUpdate(P1, station, "OK", local(DAY, 9)) for station in LINE_STATIONS])
+        apply(StationUpdate(P2, "st1", "NOT OK", local(DAY, 9)))
+        apply(StationUpdate(P2, "st2", "NOT OK", local(DAY, 9)))  # Already failed, not counted again
+        shift_date, shift = shift_calendar.shift_at(timezone.now())
+        row = ShiftRollup.objects.get(shift_date=shift_date, shift=shift)
+        self.assertEqual((row.parts_completed, row.parts_failed), (1, 1))
+
+
+class RebuildRollupTests(TestCase):
+    def setUp(self):
+        apply(PartCreate(P1, DAY, time(8), "Shift 1"), PartCreate(P2, date(2025, 3, 26), time(8), "Shift 1"))
+        apply(
+            StationUpdate(P1, "st1", "OK", local(DAY, 8, 5)),
+            StationUpdate(P1, "st2", "NOT OK", local(DAY, 16)),
+            StationUpdate(P2, "st1", "OK", local(date(2025, 3, 26), 8, 5)),
+        )
+        self.started = self.parts_started()
+        self.stations = self.station_rows()
+
+    def parts_started(self):
+        return set(ShiftRollup.objects.filter(parts_started__gt=0).values_list("shift_date", "shift", "parts_started"))
+
+    def station_rows(self):
+        return set(ShiftStationRollup.objects.values_list("shift_date", "shift", "station", "ok_count", "not_ok_count"))
+
+    def test_rebuild_matches_incremental_counts(self):
+        ShiftRollup.objects.all().delete()
+        ShiftStationRollup.objects.all().delete()
+        rebuild_rollups()
+        self.assertEqual(self.parts_started(), self.started)
+        self.assertEqual(self.station_rows(), self.stations)
+        # A rebuild dates the failure by its result rather than by when it was applied
+        failed = ShiftRollup.objects.get(shift_date=DAY, shift="Shift 2")
+        self.assertEqual(failed.parts_failed, 1)
+
+    def test_rebuild_range_leaves_other_days(self):
+        ShiftStationRollup.objects.update(ok_count=99)
+        out = StringIO()
+        call_command("rebuild_shift_rollups", "--start", "2025-03-26", "--end", "2025-03-26", stdout=out)
+        self.assertIn("Wrote", out.getvalue())
+        self.assertEqual(ShiftStationRollup.objects.get(shift_date=DAY, station="st1").ok_count, 99)
+        self.assertEqual(ShiftStationRollup.objects.get(shift_date=date(2025, 3, 26), station="st1").ok_count, 1)
+
+    def test_bad_date(self):
+        with self.assertRaises(CommandError):
+            call_command("rebuild_shift_rollups", "--start", "yesterday", stdout=StringIO())
+
+
+class RollupReportTests(TestCase):
+    def setUp(self):
+        ShiftRollup.objects.create(shift_date=DAY, shift="Shift 1", parts_started=10, parts_completed=7, parts_failed=2)
+        ShiftStationRollup.objects.create(
+            shift_date=DAY, shift="Shift 1", station="st1", ok_count=9, not_ok_count=3, first_pass_count=10,
+            first_pass_ok=8, retest_count=2,
+        )
+        ShiftStationRollup.objects.create(shift_date=DAY, shift="Shift 2", station="st2", ok_count=1)
+
+    def test_report(self):
+        [shift1, shift2] = rollup_report(DAY, DAY)
+        self.assertEqual((shift1["shift"], shift1["parts_started"], shift1["parts_failed"]), ("Shift 1", 10, 2))
+        self.assertEqual(
+            shift1["stations"]["st1"],
+            {"ok": 9, "not_ok": 3, "retests": 2, "not_ok_rate": 0.25, "first_pass_yield": 0.8},
+        )
+        self.assertEqual(shift2["parts_started"], 0)  # No part rollup row, station results only
+        self.assertIsNone(shift2["stations"]["st2"]["first_pass_yield"])
+
+    def test_view(self):
+        params = {"start": "2025-03-24", "end": "2025-03-24", "station": "st2"}
+        response = self.client.get(reverse("shift_rollups"), params)
+        data = response.json()
+        self.assertEqual((data["start"], data["end"]), ("2025-03-24", "2025-03-24"))
+        self.assertEqual([list(shift["stations"]) for shift in data["shifts"]], [[], ["st2"]])
+
+    def test_view_rejects_bad_ranges(self):
+        self.assertEqual(self.client.get(reverse("shift_rollups"), {"start": "24-03-2025"}).status_code, 400)
+        response = self.client.get(reverse("shift_rollups"), {"start": "2023-01-01", "end": "2025-03-24"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,55 @@
+from datetime import datetime, time, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from track.models import ScanEvent
+
+
+def log_scan(day):
+    timestamp = timezone.make_aware(datetime.combine(day, time(12)))
+    return ScanEvent.objects.create(timestamp=timestamp, day=day, station="st1", outcome="ok")
+
+
+class PruneScanEventsTests(TestCase):
+    def setUp(self):
+        today = timezone.localdate()
+        for age in (1, 5, 10, 10, 30):
+            log_scan(today - timedelta(days=age))
+
+    def prune(self, *args):
+        out = StringIO()
+        call_command("prune_scan_events", *args, stdout=out)
+        return out.getvalue()
+
+    def test_deletes_days_past_retention(self):
+        output = self.prune("--days", "7")
+        self.assertIn("Deleted 3 scan events", output)
+        self.assertEqual(ScanEvent.objects.count(), 2)
+        self.assertTrue(all(event.day >= timezone.localdate() - timedelta(days=7) for event in ScanEvent.objects.all()))
+
+    def test_dry_run(self):
+        output = self.prune("--days", "7", "--dry-run")
+        self.assertIn("Would delete 3 scan events", output)
+        self.assertEqual(ScanEvent.objects.count(), 5)
+
+    def test_default_retention_from_settings(self):
+        with self.settings(SCAN_EVENTS={"retention_days": 20}):
+            self.assertIn("Deleted 1 scan events", self.prune())
+
+
+class ScanEventQueryTests(TestCase):
+    def test_for_part_and_between(self):
+        day = timezone.localdate()
+        first = ScanEvent.objects.create(
+            timestamp=timezone.now() - timedelta(minutes=5), day=day, station="st1", part_number="P1", outcome="ok"
+        )
+        second = ScanEvent.objects.create(
+            timestamp=timezone.now(), day=day, station="st2", part_number="P1", outcome="ok"
+        )
+        ScanEvent.objects.create(timestamp=timezone.now(), day=day, station="st1", part_number="P2", outcome="ok")
+        self.assertEqual(list(ScanEvent.objects.for_part("P1")), [first, second])
+        window = ScanEvent.objects.between(first.timestamp, second.timestamp)
+        self.assertEqual(list(window), [first])
@@ -0,0 +1,103 @@
+import copy
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+from Traceability.sqlite_backend.base import DatabaseWrapper
+
+
+class SqliteBackendTests(SimpleTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        self.addCleanup(self.remove_files)
+        self.wrappers = []
+
+    def remove_files(self):
+        for wrapper in self.wrappers:
+            wrapper.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def wrapper(self, **options):
+        settings_dict = copy.deepcopy(connection.settings_dict)
+        settings_dict.update(NAME=self.path, OPTIONS=options)
+        wrapper = DatabaseWrapper(settings_dict, alias="backend_test")
+        self.wrappers.append(wrapper)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_default_pragmas(self):
+        wrapper = self.wrapper()
+        self.assertEqual(self.pragma(wrapper, "journal_mode"), "wal")
+        self.assertEqual(self.pragma(wrapper, "synchronous"), 1)  # NORMAL
+        self.assertEqual(self.pragma(wrapper, "busy_timeout"), 5000)
+        self.assertEqual(self.pragma(wrapper, "cache_size"), -32000)
+        self.assertEqual(self.pragma(wrapper, "temp_store"), 2)  # MEMORY
+
+    def test_configured_pragmas_override_defaults(self):
+        wrapper = self.wrapper(pragmas={"synchronous": "FULL", "busy_timeout": 250})
+        self.assertEqual(self.pragma(wrapper, "synchronous"), 2)
+        self.assertEqual(self.pragma(wrapper, "busy_timeout"), 250)
+        self.assertEqual(self.pragma(wrapper, "journal_mode"), "wal")
+
+    def test_extra_options_are_not_passed_to_connect(self):
+        wrapper = self.wrapper(pragmas={}, checkpoint_interval=0, transaction_mode="IMMEDIATE", timeout=7)
+        params = wrapper.get_connection_params()
+        for key in ("pragmas", "checkpoint_interval", "checkpoint_mode", "transaction_mode"):
+            self.assertNotIn(key, params)
+        self.assertEqual(params["timeout"], 7)
+
+    def test_immediate_transaction_takes_write_lock_at_begin(self):
+        wrapper = self.wrapper(transaction_mode="IMMEDIATE")
+        with wrapper.cursor() as cursor:
+            cursor.execute("CREATE TABLE t (x INTEGER)")
+        wrapper.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        wrapper.cursor().execute("SELECT 1")  # Read only, yet the lock is already held
+        other = sqlite3.connect(self.path, timeout=0)
+        self.addCleanup(other.close)
+        with self.assertRaisesMessage(sqlite3.OperationalError, "locked"):
+            other.execute("BEGIN IMMEDIATE")
+        wrapper.rollback()
+        wrapper.set_autocommit(True)
+        other.execute("BEGIN IMMEDIATE")
+
+    def test_deferred_transaction_without_mode(self):
+        wrapper = self.wrapper()
+        with wrapper.cursor() as cursor:
+            cursor.execute("CREATE TABLE t (x INTEGER)")
+        wrapper.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        wrapper.cursor().execute("SELECT 1")
+        other = sqlite3.connect(self.path, timeout=0)
+        self.addCleanup(other.close)
+        other.execute("BEGIN IMMEDIATE")
+        other.rollback()
+        wrapper.rollback()
+        wrapper.set_autocommit(True)
+
+    def test_checkpoint_after_interval(self):
+        now = [1000.0]
+        with mock.patch("Traceability.sqlite_backend.base.time.monotonic", side_effect=lambda: now[0]):
+            wrapper = self.wrapper(checkpoint_interval=60)
+            with wrapper.cursor() as cursor:
+                cursor.execute("CREATE TABLE t (x INTEGER)")
+            wrapper.set_autocommit(False)
+            wrapper.cursor().execute("INSERT INTO t VALUES (1)")
+            wrapper.commit()
+            self.assertEqual(wrapper._last_checkpoint, 1000.0)  # Interval not over yet
+            now[0] += 61
+            wrapper.cursor().execute("INSERT INTO t VALUES (2)")
+            with self.assertLogs("Traceability.sqlite_backend.base", "DEBUG") as logs:
+                wrapper.commit()
+            wrapper.set_autocommit(True)
+        self.assertEqual(wrapper._last_checkpoint, 1061.0)
+        self.assertIn("WAL checkpoint", logs.output[0])
@@ -0,0 +1,112 @@
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+
+from track import station_registry
+from track.models import PLC_PORT, Controller, Station, bump_registry_version
+from track.station_registry import (
+    RegistryError,
+    RegistryWatcher,
+    StationConfig,
+    current_registry,
+    load_registry,
+    register_overlaps,
+    reload_registry,
+)
+
+
+def config(name, plc_ip="192.168.1.20", base=5300):
+    registers = {"qr": base, "result": base + 54, "scan_trigger": base + 56, "write_signal": base + 58}
+    return StationConfig(name, plc_ip, PLC_PORT, **registers)
+
+
+class RegisterOverlapTests(SimpleTestCase):
+    def test_separate_registers(self):
+        self.assertEqual(register_overlaps([config("st3"), config("st4", base=5400)]), [])
+
+    def test_same_registers_on_other_controllers(self):
+        self.assertEqual(register_overlaps([config("st3"), config("st4", plc_ip="192.168.1.40")]), [])
+
+    def test_overlap_inside_the_qr_words(self):
+        problems = register_overlaps([config("st3"), config("st4", base=5320)])
+        self.assertEqual(problems, ["192.168.1.20: st4 qr (D5320-D5349) overlaps st3 qr (D5300-D5329)"])
+
+    def test_field_of_the_same_station(self):
+        station = config("st3")._replace(result=5310)
+        self.assertEqual(
+            register_overlaps([station]), ["192.168.1.20: st3 result (D5310-D5310) overlaps st3 qr (D5300-D5329)"]
+        )
+
+
+class RegistryTests(TestCase):
+    def setUp(self):
+        # Each test gets its own snapshot of the registry, as a poller process would
+        patcher = mock.patch.multiple(station_registry, _snapshot=None, _rejected_version=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_seeded_layout(self):
+        registry = current_registry()
+        self.assertEqual(list(registry.stations), [f"st{n}" for n in range(1, 9)])
+        self.assertEqual(
+            registry.groups(["st3", "st4", "st1"]), {"192.168.1.20": ["st3", "st4"], "192.168.1.100": ["st1"]}
+        )
+        self.assertEqual(registry.station("st7").scan_trigger, 5760)
+        self.assertEqual((registry.port("192.168.1.20"), registry.port("10.0.0.1")), (PLC_PORT, PLC_PORT))
+
+    def test_disabled_stations_and_controllers_are_left_out(self):
+        Station.objects.filter(name="st2").update(enabled=False)
+        Controller.objects.filter(ip="192.168.1.20").update(enabled=False)
+        self.assertEqual(list(load_registry().stations), ["st1", "st5", "st6", "st7", "st8"])
+
+    def test_snapshot_is_read_only(self):
+        with self.assertRaises(TypeError):
+            current_registry().stations["st9"] = config("st9")
+
+    def test_reload_only_after_a_change(self):
+        first = current_registry()
+        self.assertIsNone(reload_registry())
+        controller = Controller.objects.get(ip="192.168.1.20")
+        controller.port = 15007
+        controller.save()
+        with self.assertLogs("track.station_registry", "INFO"):
+            second = reload_registry()
+        self.assertGreater(second.version, first.version)
+        self.assertEqual(second.port("192.168.1.20"), 15007)
+        self.assertIs(current_registry(), second)
+
+    def test_invalid_registry_keeps_the_current_snapshot(self):
+        first = current_registry()
+        Station.objects.filter(name="st4").update(qr_register=5310)  # Bypasses clean(), like a bad import
+        bump_registry_version()
+        with self.assertLogs("track.station_registry", "ERROR") as logs:
+            self.assertIsNone(reload_registry())
+        self.assertIn("st4 qr (D5310-D5339) overlaps st3 qr", logs.output[0])
+        self.assertIs(current_registry(), first)
+        self.assertIsNone(reload_registry())  # Rejected once per version, without logging again
+
+    def test_invalid_registry_at_startup_raises(self):
+        Station.objects.filter(name="st4").update(qr_register=5310)
+        with self.assertRaises(RegistryError):
+            current_registry()
+
+    def test_clean_rejects_overlapping_registers(self):
+        station = Station.objects.get(name="st4")
+        station.qr_register = 5320
+        with self.assertRaises(ValidationError):
+            station.full_clean()
+        station.enabled = False
+        station.full_clean()  # A disabled station may keep conflicting numbers
+
+    def test_watcher_hands_new_snapshots_to_callbacks(self):
+        current_registry()
+        seen = []
+        watcher = RegistryWatcher(on_change=[seen.append])
+        watcher.check()
+        self.assertEqual(seen, [])
+        Station.objects.get(name="st8").delete()
+        with self.assertLogs("track.station_registry", "INFO"):
+            watcher.check()
+        [snapshot] = seen
+        self.assertNotIn("st8", snapshot.stations)
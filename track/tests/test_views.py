@@ -0,0 +1,117 @@
+from datetime import date, time, timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from track.models import (
+    STATUS_COMPLETE,
+    STATUS_FAILED,
+    STATUS_IN_PROGRESS,
+    TraceabilityData,
+    current_change_version,
+)
+from track.views import dashboard_changes
+
+
+def make_part(serial, day, moment, status):
+    return TraceabilityData.objects.create(
+        part_number=f"PDU-S-10594-1-{day:%d%m%y}{serial:05d}", date=day, time=moment, overall_status=status
+    )
+
+
+class FetchTorqueDataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        old = date.today() - timedelta(days=60)
+        cls.today = make_part(1, date.today(), time(0, 0), STATUS_COMPLETE)
+        cls.complete = [make_part(n, old, time(8, n), STATUS_COMPLETE) for n in range(12)]
+        cls.failed = make_part(100, old - timedelta(days=1), time(9), STATUS_FAILED)
+        cls.in_progress = make_part(101, old - timedelta(days=2), time(9), STATUS_IN_PROGRESS)
+
+    def test_today_open_parts_and_latest_ten(self):
+        response = self.client.get(reverse("fetch_torque_data"))
+        rows = response.json()["data"]
+        expected = [self.today, *self.complete[:2:-1], self.failed, self.in_progress]
+        self.assertEqual([row["part_number"] for row in rows], [part.part_number for part in expected])
+        self.assertEqual(rows[-2]["overall_status"], STATUS_FAILED)
+        self.assertEqual(response.json()["version"], current_change_version())
+
+
+class FetchTorqueDeltaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        old = date.today() - timedelta(days=60)
+        cls.complete = [make_part(n, old, time(8, n), STATUS_COMPLETE) for n in range(12)]
+        cls.failed = make_part(100, old - timedelta(days=1), time(9), STATUS_FAILED)
+
+    def delta(self, since):
+        response = self.client.get(reverse("fetch_torque_delta"), {"since": since})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_since_zero_is_the_full_set(self):
+        self.assertEqual(self.delta(0), self.client.get(reverse("fetch_torque_data")).json())
+
+    def test_bad_since(self):
+        response = self.client.get(reverse("fetch_torque_delta"), {"since": "abc"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_no_changes(self):
+        version = self.delta(0)["version"]
+        self.assertEqual(self.delta(version), {"rows": [], "version": version})
+
+    def test_changed_rows_only(self):
+        version = self.delta(0)["version"]
+        self.failed.shift = "Shift 2"
+        self.failed.save()
+        delta = self.delta(version)
+        rows = [(row["part_number"], row["visible"]) for row in delta["rows"]]
+        self.assertEqual(rows, [(self.failed.part_number, True)])
+        self.assertEqual(delta["rows"][0]["shift"], "Shift 2")
+        self.assertEqual(delta["version"], self.failed.version)
+        self.assertEqual(self.delta(delta["version"])["rows"], [])
+
+    def test_row_leaving_the_dashboard_is_not_visible(self):
+        version = self.delta(0)["version"]
+        self.failed.overall_status = STATUS_COMPLETE  # Old, complete and not among the latest 10
+        self.failed.save()
+        oldest_shown = self.complete[2]  # Still among the latest 10
+        oldest_shown.save()
+        rows = {row["part_number"]: row["visible"] for row in self.delta(version)["rows"]}
+        self.assertEqual(rows, {self.failed.part_number: False, oldest_shown.part_number: True})
+
+    def test_new_part_pushes_oldest_out_of_latest_ten(self):
+        version = self.delta(0)["version"]
+        new = make_part(1, date.today(), time(0, 0), STATUS_COMPLETE)
+        rows = {row["part_number"]: row["visible"] for row in self.delta(version)["rows"]}
+        # Only changed rows are sent; the displaced row stays until the client's next full sync
+        self.assertEqual(rows, {new.part_number: True})
+
+    def test_since_is_exclusive_and_rows_come_in_version_order(self):
+        version = self.delta(0)["version"]
+        self.complete[5].save()
+        self.failed.save()
+        self.complete[0].overall_status = STATUS_FAILED  # Open again, so back on the dashboard
+        self.complete[0].save()
+        changes = dashboard_changes(version)
+        self.assertEqual(
+            [row["part_number"] for row in changes["rows"]],
+            [part.part_number for part in (self.complete[5], self.failed, self.complete[0])],
+        )
+        self.assertTrue(all(row["visible"] for row in changes["rows"]))
+        self.assertEqual(changes["version"], self.complete[0].version)
+        # A client that has seen the second change only gets the third
+        rows = dashboard_changes(self.failed.version)["rows"]
+        self.assertEqual([row["part_number"] for row in rows], [self.complete[0].part_number])
+
+    def test_changes_query_uses_the_version_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            dashboard_changes(current_change_version())
+        [sql] = [query["sql"] for query in queries if "track_traceabilitydata" in query["sql"]]
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            plan = " | ".join(row[-1] for row in cursor.fetchall())
+        self.assertRegex(plan, r"SEARCH track_traceabilitydata USING INDEX \w*version\w* \(version>\?\)")
+        self.assertNotIn("TEMP B-TREE FOR ORDER BY", plan)
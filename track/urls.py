@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import plc_status, generate_qr_code_view, fetch_torque_data, combined_page,search_parts, export_parts_to_excel
+from .views import plc_status, generate_qr_code_view, fetch_torque_data, fetch_torque_delta, dashboard_events, combined_page,search_parts, export_parts_to_excel, shift_rollups, station_analytics_view, metrics_view
 
 urlpatterns = [
     path('', combined_page, name='combined_page'),
@@ -8,4 +8,9 @@ urlpatterns = [
     path('plc_statuses/', plc_status, name='plc_statuses'),  # ✅ Ensure this matches JS
     path('generate_qr_code/', generate_qr_code_view, name='generate_qr_codes'),  # ✅ Ensure this matches JS
     path('fetch_torque_data/', fetch_torque_data, name='fetch_torque_data'),  # ✅ Ensure this matches JS
+    path('fetch_torque_delta/', fetch_torque_delta, name='fetch_torque_delta'),
+    path('events/', dashboard_events, name='dashboard_events'),
+    path('shift_rollups/', shift_rollups, name='shift_rollups'),
+    path('station_analytics/', station_analytics_view, name='station_analytics'),
+    path('metrics/', metrics_view, name='metrics'),
 ]
@@ -1,76 +1,81 @@
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponse
-from .models import TraceabilityData
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from .models import (
+    BREAKER_CLOSED,
+    PLC_CONNECTED,
+    PLC_DISCONNECTED,
+    LINE_STATIONS,
+    STATUS_FAILED,
+    STATUS_IN_PROGRESS,
+    PLCStatus,
+    TraceabilityData,
+    current_change_version,
+)
 import logging
 from .qr_utils import generate_qr_code  # ✅ Using latest QR code function
 import random
 import datetime
-from pymodbus.client import ModbusTcpClient
-import time
-import threading
-from .plc_utils import PLC_MAPPING 
-import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+from .plc_health import health_options
+from .plc_utils import controller_groups
+from .station_registry import reload_registry
+from .events import DashboardHub, sse_event
+import asyncio
+from functools import partial
 
 logger = logging.getLogger(__name__)
-# Shared dictionary for storing PLC statuses
-plc_statuses = {}
 
-def monitor_plcs():
-    """Continuously monitor PLC connections in a background thread."""
-    global plc_statuses
-    while True:
-        temp_statuses = {}
-        for station, plc in PLC_MAPPING.items():
-            plc_ip = plc.get("ip")
-            if not plc_ip:
-                continue  # Skip if no IP
-
-            client = ModbusTcpClient(plc_ip, port=5007, timeout=1)
-            is_connected = client.connect()
-            client.close()
-
-            temp_statuses[station] = "connected" if is_connected else "disconnected"
+def plc_status(request):
+    """Return PLC statuses with combined stations for shared PLCs, as last seen by the health prober."""
+    return JsonResponse(current_plc_status())
 
-        plc_statuses = temp_statuses  # Update shared status dictionary
-        time.sleep(1)  # Retry every 2 seconds
+def current_plc_status(details=True):
+    """Status per physical PLC (stations sharing a controller are combined) with counts.
 
-# Start the monitoring thread once
-plc_monitor_thread = threading.Thread(target=monitor_plcs, daemon=True)
-plc_monitor_thread.start()
-
-def plc_status(request):
-    """Return PLC statuses with combined stations for shared PLCs."""
-    plc_statuses = {}
-
-    for station, plc in PLC_MAPPING.items():
-        plc_ip = plc.get("ip")  
-        if not plc_ip:
-            continue  # Skip stations with missing IPs
-
-        client = ModbusTcpClient(plc_ip, port=5007, timeout=1)
-        is_connected = client.connect()
-        client.close()
-
-        plc_statuses[station] = "connected" if is_connected else "disconnected"
-
-    # Combine shared PLCs
-    combined_statuses = {
-        "St 1": plc_statuses.get("st1", "disconnected"),
-        "St 2": plc_statuses.get("st2", "disconnected"),
-        "St 3 & 4": plc_statuses.get("st3", "disconnected"),  # Shared PLC for St3 & St4
-        "St 5 & 6": plc_statuses.get("st5", "disconnected"),  # Shared PLC for St5 & St6
-        "St 7 & 8": plc_statuses.get("st7", "disconnected"),  # Shared PLC for St7 & St8
-    }
+    Read from the PLCStatus table kept by track.plc_health, so no PLC is
+    contacted here. Rows not refreshed within `stale_after` seconds (prober
+    not running) count as disconnected. `breakers` gives the circuit breaker
+    state per PLC; `details` adds last-change time, round-trip latency and
+    the next probe of a PLC whose breaker is open.
+    """
+    reload_registry()  # Pick up controllers edited in the admin
+    rows = {row.plc_ip: row for row in PLCStatus.objects.all()}
+    cutoff = timezone.now() - datetime.timedelta(seconds=health_options()["stale_after"])
+    combined_statuses = {}
+    breakers = {}
+    plc_details = {}
+    for plc_ip, stations in controller_groups().items():
+        label = "St " + " & ".join(station[2:] for station in stations)  # e.g. "St 3 & 4" for a shared PLC
+        row = rows.get(plc_ip)
+        stale = row is None or row.last_checked < cutoff
+        combined_statuses[label] = PLC_DISCONNECTED if stale else row.state
+        breakers[label] = BREAKER_CLOSED if stale else row.breaker
+        plc_details[label] = {
+            "ip": plc_ip,
+            "last_change": row.last_change.isoformat() if row else None,
+            "last_checked": row.last_checked.isoformat() if row else None,
+            "rtt_ms": round(row.rtt_ms, 2) if row and row.rtt_ms is not None else None,
+            "retry_at": row.retry_at.isoformat() if row and row.retry_at and not stale else None,
+            "error": row.error if row else "",
+            "stale": stale,
+        }
 
     # Count connected and disconnected PLCs
-    connected_count = sum(1 for status in combined_statuses.values() if status == "connected")
-    disconnected_count = sum(1 for status in combined_statuses.values() if status == "disconnected")
+    connected_count = sum(1 for status in combined_statuses.values() if status == PLC_CONNECTED)
+    disconnected_count = sum(1 for status in combined_statuses.values() if status == PLC_DISCONNECTED)
 
-    return JsonResponse({
+    response = {
         "plc_statuses": combined_statuses,
+        "breakers": breakers,
         "connected_count": connected_count,
         "disconnected_count": disconnected_count
-    })
+    }
+    if details:
+        response["details"] = plc_details
+    return response
 
 # ✅ Render the main page
 def combined_page(request):
@@ -94,82 +99,251 @@ def generate_qr_code_view(request):
             return JsonResponse({"error": str(e)}, status=500)
 
 from datetime import date
-from django.db.models import Q
+from django.db.models import BooleanField, Case, Q, When
+
+def dashboard_filter(today):
+    """Q selecting the rows the live dashboard shows."""
+    # Retrieve the latest 10 records, ordered by date and time in descending order
+    latest_records = TraceabilityData.objects.order_by('-date', '-time').values("pk")[:10]
+
+    # Today's records, parts still in progress or failed (without date restriction;
+    # overall_status is maintained by the DB writer and indexed) and the latest 10
+    return (
+        Q(date=today)
+        | Q(overall_status__in=[STATUS_IN_PROGRESS, STATUS_FAILED])
+        | Q(pk__in=latest_records)
+    )
+
+
+def serialize_part(item):
+    return {
+        "part_number": item.part_number,
+        "date": item.date.strftime("%Y-%m-%d") if item.date else "",
+        "time": item.time.strftime("%H:%M:%S") if item.time else "",
+        "shift": item.shift,
+        "overall_status": item.overall_status,
+        "first_failed_station": item.first_failed_station,
+        "version": item.version,
+        "st1_result": item.st1_result,
+        "st2_result": item.st2_result,
+        "st3_result": item.st3_result,
+        "st4_result": item.st4_result,
+        "st5_result": item.st5_result,
+        "st6_result": item.st6_result,
+        "st7_result": item.st7_result,
+        "st8_result": item.st8_result,
+        "st9_result": item.st9_result,
+        "st10_result": item.st10_result,
+    }
+
+
+def dashboard_snapshot():
+    """Every row the dashboard shows, with the change version it reflects."""
+    version = current_change_version()
+    combined_data = (
+        TraceabilityData.objects.filter(dashboard_filter(date.today()))
+        .order_by('-date', '-time')
+        .with_station_columns()
+    )
+    return {"data": [serialize_part(item) for item in combined_data], "version": version}
+
+
+def dashboard_changes(since):
+    """Rows changed after version `since`, each flagged with whether it is still on the dashboard."""
+    # Read the counter before the rows so a concurrent commit is picked up next time
+    version = current_change_version()
+    today = date.today()
+    changed = (
+        TraceabilityData.objects.filter(version__gt=since)
+        .annotate(visible=Case(When(dashboard_filter(today), then=True), default=False, output_field=BooleanField()))
+        .order_by('version')  # Walks the version index; the client sorts rows itself
+        .with_station_columns()
+    )
+    rows = []
+    for item in changed:
+        row = serialize_part(item)
+        row["visible"] = item.visible
+        version = max(version, item.version)
+        rows.append(row)
+    return {"rows": rows, "version": version}
+
 
 def fetch_torque_data(request):
     if request.method == "GET":
-        today = date.today()  # Get today's date
-        
-        # Filter for today's records
-        today_records = TraceabilityData.objects.filter(date=today)
-
-        # Filter for "NOT OK" or NULL/blank records (without date restriction)
-        not_ok_or_null_records = TraceabilityData.objects.filter(
-            Q(st1_result="NOT OK") | Q(st2_result="NOT OK") |
-            Q(st3_result="NOT OK") | Q(st4_result="NOT OK") |
-            Q(st5_result="NOT OK") | Q(st6_result="NOT OK") |
-            Q(st7_result="NOT OK") | Q(st8_result="NOT OK") |
-            Q(st9_result="NOT OK") | Q(st10_result="NOT OK") |
-            Q(st1_result__isnull=True) | Q(st2_result__isnull=True) |
-            Q(st3_result__isnull=True) | Q(st4_result__isnull=True) |
-            Q(st5_result__isnull=True) | Q(st6_result__isnull=True) |
-            Q(st7_result__isnull=True) | Q(st8_result__isnull=True) |
-            Q(st9_result__isnull=True) | Q(st10_result__isnull=True) |
-            Q(st1_result="") | Q(st2_result="") | Q(st3_result="") |
-            Q(st4_result="") | Q(st5_result="") | Q(st6_result="") |
-            Q(st7_result="") | Q(st8_result="") | Q(st9_result="") | Q(st10_result="")
-        )
-
-        # Retrieve the latest 10 records, ordered by date and time in descending order
-        latest_records = TraceabilityData.objects.order_by('-date', '-time')[:10]
-
-        # Combine all querysets and remove duplicates
-        combined_data = (today_records | not_ok_or_null_records | latest_records).distinct().order_by('-date', '-time')
-
-        formatted_data = [
-            {
-                "part_number": item.part_number,
-                "date": item.date.strftime("%Y-%m-%d") if item.date else "",
-                "time": item.time.strftime("%H:%M:%S") if item.time else "",
-                "shift": item.shift,
-                "st1_result": item.st1_result,
-                "st2_result": item.st2_result,
-                "st3_result": item.st3_result,
-                "st4_result": item.st4_result,
-                "st5_result": item.st5_result,
-                "st6_result": item.st6_result,
-                "st7_result": item.st7_result,
-                "st8_result": item.st8_result,
-                "st9_result": item.st9_result,
-                "st10_result": item.st10_result,
-            }
-            for item in combined_data
-        ]
-        
-        return JsonResponse({"data": formatted_data})
-    
+        return JsonResponse(dashboard_snapshot())
+
+
+def fetch_torque_delta(request):
+    """Rows changed since `?since=<version>`; `since=0` (or none) returns the full dashboard set.
+
+    Each row carries `visible`: false means it has left the dashboard set and
+    the client should drop it.
+    """
+    try:
+        since = max(int(request.GET.get("since", 0)), 0)
+    except ValueError:
+        return JsonResponse({"error": "since must be an integer"}, status=400)
+
+    if since == 0:
+        return fetch_torque_data(request)
+    return JsonResponse(dashboard_changes(since))
+
+
+# Connectivity events only fire on state changes, not on every latency sample
+dashboard_hub = DashboardHub(current_change_version, dashboard_changes, partial(current_plc_status, details=False))
+
+SSE_KEEPALIVE = 15  # seconds between comment lines so proxies keep the stream open
+SSE_FULL_SYNC = 5 * 60  # seconds between fresh snapshots, which drop rows a delta can miss (deleted parts)
+
+
+def full_snapshot():
+    snapshot = dashboard_snapshot()
+    snapshot["plc"] = current_plc_status(details=False)
+    return snapshot
+
+
+async def dashboard_events(request):
+    """Server-sent events: a `snapshot` (rows and PLC status), then `rows` and `plc` events as they happen.
+
+    A fresh `snapshot` follows every SSE_FULL_SYNC seconds, like the full
+    resync of the polling client. Needs the ASGI server (daphne); under
+    WSGI the client falls back to polling.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse("Event stream requires the ASGI server", status=503)
+
+    async def stream():
+        loop = asyncio.get_running_loop()
+        # Subscribe before taking the snapshot so nothing committed in between is missed
+        queue = dashboard_hub.subscribe()
+        try:
+            next_sync = loop.time()
+            while True:
+                if loop.time() >= next_sync:
+                    yield sse_event("snapshot", await sync_to_async(full_snapshot)())
+                    next_sync = loop.time() + SSE_FULL_SYNC
+                try:
+                    message = await asyncio.wait_for(queue.get(), min(SSE_KEEPALIVE, next_sync - loop.time()))
+                except asyncio.TimeoutError:
+                    if loop.time() < next_sync:
+                        yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            dashboard_hub.unsubscribe(queue)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+from .exports import EXPORT_FORMATS, stream_export
+from .analytics import local_midnight, station_analytics
+from .rollups import rollup_report
+from .shifts import shift_calendar
 from .filters import TraceabilityDataFilter
+from .pagination import KeysetPaginator, bounded_count
+from .metrics import published_metrics, registry, render_metrics
+
+def search_page_size(request):
+    sizes = getattr(settings, "SEARCH_PAGE_SIZE", {"default": 50, "max": 500})
+    try:
+        return min(max(int(request.GET.get("page_size", sizes["default"])), 1), sizes["max"])
+    except ValueError:
+        return sizes["default"]
+
+
+def page_query(request, **cursor):
+    """The current query string with the paging cursor replaced by `cursor`."""
+    query = request.GET.copy()
+    for key in ("older_than", "newer_than", "count"):
+        query.pop(key, None)
+    query.update(cursor)
+    return query.urlencode()
+
 
 def search_parts(request):
-    queryset = TraceabilityData.objects.all()
+    queryset = TraceabilityData.objects.with_station_columns()
     filter = TraceabilityDataFilter(request.GET, queryset=queryset)
-    return render(request, 'track/search_parts.html', {'filter': filter})
+
+    # Seek pagination: each page is located by its boundary row, never by offset
+    page = KeysetPaginator(filter.qs, search_page_size(request)).page(
+        older_than=request.GET.get("older_than"), newer_than=request.GET.get("newer_than")
+    )
+    context = {
+        'filter': filter,
+        'page': page,
+        'newer_query': page_query(request, newer_than=page.newer_cursor) if page.newer_cursor else None,
+        'older_query': page_query(request, older_than=page.older_cursor) if page.older_cursor else None,
+    }
+    # Counting scans every match, so it only runs on request and stops at COUNT_LIMIT
+    if request.GET.get("count"):
+        context['result_count'], context['count_exact'] = bounded_count(filter.qs)
+    else:
+        context['count_query'] = f"{request.GET.urlencode()}&count=1" if request.GET else "count=1"
+    return render(request, 'track/search_parts.html', context)
+
+def shift_rollups(request):
+    """Per-shift yield and throughput from the rollup tables: `?start=&end=` (YYYY-MM-DD, default last 7 days), `?station=` repeatable."""
+    try:
+        start, end = parse_date_range(request, 7)
+    except ValueError:
+        return JsonResponse({"error": "start and end must be YYYY-MM-DD dates"}, status=400)
+    if (end - start).days > 366:
+        return JsonResponse({"error": "date range is limited to one year"}, status=400)
+    return JsonResponse({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "shifts": rollup_report(start, end, request.GET.getlist("station")),
+    })
+
+def parse_date_range(request, default_days):
+    """(start, end) dates from `?start=&end=` (YYYY-MM-DD, inclusive), defaulting to the last `default_days` days."""
+    end = date.fromisoformat(request.GET["end"]) if request.GET.get("end") else shift_calendar.current()[0]
+    start = date.fromisoformat(request.GET["start"]) if request.GET.get("start") else end - datetime.timedelta(days=default_days - 1)
+    return start, end
+
+def station_analytics_view(request):
+    """Cycle time, station-to-station lead time and per-shift bottlenecks for `?start=&end=` (default last 30 days)."""
+    try:
+        start, end = parse_date_range(request, 30)
+    except ValueError:
+        return JsonResponse({"error": "start and end must be YYYY-MM-DD dates"}, status=400)
+    if (end - start).days > 92:
+        return JsonResponse({"error": "date range is limited to 92 days"}, status=400)
+    stations = request.GET.getlist("station") or LINE_STATIONS
+    return JsonResponse(station_analytics(local_midnight(start), local_midnight(end + datetime.timedelta(days=1)), stations))
 
 def export_parts_to_excel(request):
+    """Stream the parts matching the search filters as `?format=xlsx` (default) or `csv`, gzipped with `?gzip=1`."""
+    export_format = request.GET.get("format", "xlsx")
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}, status=400)
+
     # Apply the same filters used on the search page
-    queryset = TraceabilityData.objects.all()
+    queryset = TraceabilityData.objects.with_station_columns()
     trace_filter = TraceabilityDataFilter(request.GET, queryset=queryset)
 
-    # Convert queryset to DataFrame
-    data = trace_filter.qs.values(
-        'sr_no', 'part_number', 'date', 'time', 'shift',
-        'st1_result', 'st2_result', 'st3_result', 'st4_result', 'st5_result', 'st6_result', 'st7_result', 'st8_result', 'st9_result', 'st10_result'
+    chunks, content_type, extension = stream_export(
+        trace_filter.qs, export_format, compress=request.GET.get("gzip") in ("1", "true")
     )
-    df = pd.DataFrame(data)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="traceability_data.{extension}"'
+    return response
 
-    # Create Excel file in memory
-    response = HttpResponse(content_type='application/vnd.ms-excel')
-    response['Content-Disposition'] = 'attachment; filename="traceability_data.xlsx"'
-    df.to_excel(response, index=False)
+DASHBOARD_SUBSCRIBERS = registry.gauge("dashboard_subscribers", "Open dashboard event streams.")
+SNAPSHOT_AGE_SECONDS = registry.gauge("metrics_snapshot_age_seconds", "Age of the published metrics snapshot.", ["snapshot"])
 
-    return response
\ No newline at end of file
+def metrics_view(request):
+    """Pipeline metrics in Prometheus text format: this web process plus the snapshots published by the pollers."""
+    snapshots = published_metrics()
+    now = timezone.now()
+    SNAPSHOT_AGE_SECONDS.clear()
+    for source, snapshot in snapshots.items():
+        SNAPSHOT_AGE_SECONDS.set(round((now - snapshot.updated_at).total_seconds(), 3), snapshot=source)
+    DASHBOARD_SUBSCRIBERS.set(dashboard_hub.stats()["subscribers"])
+    sources = {"web": registry.dump(), **{source: snapshot.data for source, snapshot in snapshots.items()}}
+    return HttpResponse(render_metrics(sources), content_type="text/plain; version=0.0.4; charset=utf-8")